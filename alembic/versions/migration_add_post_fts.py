@@ -0,0 +1,42 @@
+"""Add post_fts full-text index
+
+Revision ID: d4e6f8a0b2c4
+Revises: c3d5e7f9a1b2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd4e6f8a0b2c4'
+down_revision = 'c3d5e7f9a1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE post_fts USING fts5("
+        "text, content='post', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    op.execute(
+        "CREATE TRIGGER post_fts_insert AFTER INSERT ON post "
+        "BEGIN INSERT INTO post_fts (rowid, text) "
+        "VALUES (new.id, new.text); END")
+    op.execute(
+        "CREATE TRIGGER post_fts_delete AFTER DELETE ON post "
+        "BEGIN INSERT INTO post_fts (post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); END")
+    op.execute(
+        "CREATE TRIGGER post_fts_update AFTER UPDATE OF text ON post "
+        "BEGIN INSERT INTO post_fts (post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        "INSERT INTO post_fts (rowid, text) VALUES (new.id, new.text); END")
+    op.execute("INSERT INTO post_fts (post_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER post_fts_update')
+    op.execute('DROP TRIGGER post_fts_delete')
+    op.execute('DROP TRIGGER post_fts_insert')
+    op.execute('DROP TABLE post_fts')
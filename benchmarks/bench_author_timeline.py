@@ -0,0 +1,85 @@
+"""Задержка страницы GET /api/v1/users/{id}/posts для авторов с разным
+кол-вом постов: первая страница и страница из середины ленты. Благодаря
+keyset-пагинации по индексу (author_id, create_timestamp, id) стоимость
+страницы не должна зависеть ни от кол-ва постов автора, ни от глубины.
+
+Запуск: python -m benchmarks.bench_author_timeline [кол-во запросов]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import insert
+
+from db_layer.models import Post, User
+
+from .common import bench_app, report
+
+# id автора -> кол-во его постов
+AUTHORS = {1: 1_000, 2: 10_000, 3: 100_000}
+CHUNK_SIZE = 10_000
+START_TIMESTAMP = 1_600_000_000
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(insert(User), [
+            {
+                'id': author_id,
+                'username': f'author{author_id}',
+                'password': 'hash',
+                'name': 'Bench',
+                'surname': 'Bench',
+                'email': 'bench@example.com',
+            }
+            for author_id in AUTHORS])
+        # Посты авторов перемешаны во времени, как в настоящей ленте.
+        rows = [
+            {
+                'text': f'Пост {idx}',
+                'author_id': author_id,
+                'create_timestamp': START_TIMESTAMP + idx * len(AUTHORS),
+            }
+            for author_id, posts_num in AUTHORS.items()
+            for idx in range(posts_num)]
+        for start in range(0, len(rows), CHUNK_SIZE):
+            await session.execute(
+                insert(Post), rows[start:start + CHUNK_SIZE])
+        await session.commit()
+
+
+async def measure(client, url: str, requests: int, params: dict):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(url, params=params)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def deep_cursor(client, url: str, pages: int) -> str:
+    cursor = None
+    for _ in range(pages):
+        params = {'limit': 100}
+        if cursor:
+            params['cursor'] = cursor
+        response = await client.get(url, params=params)
+        cursor = response.json()['next_cursor']
+    return cursor
+
+
+async def main(requests: int) -> None:
+    async with bench_app() as (client, session_factory):
+        await seed(session_factory)
+        for author_id, posts_num in AUTHORS.items():
+            url = f'/api/v1/users/{author_id}/posts'
+            report(f'{posts_num} posts, first page',
+                   await measure(client, url, requests, {}))
+            cursor = await deep_cursor(client, url, posts_num // 200)
+            report(f'{posts_num} posts, middle page',
+                   await measure(client, url, requests, {'cursor': cursor}))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,67 @@
+"""Время ответа на списки из 10 тыс. строк: обычный путь FastAPI
+(валидация каждой строки Pydantic и `jsonable_encoder`) и быстрый путь
+`FAST_JSON_LISTS` (кортежи колонок сразу в JSON).
+
+Запуск: python -m benchmarks.bench_fast_json [кол-во строк]
+"""
+import os
+import sys
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+# Размер страницы проверяется при импорте роутеров.
+os.environ.setdefault('MAX_PAGE_SIZE', str(ROWS))
+
+import asyncio  # noqa: E402
+import time  # noqa: E402
+
+from sqlalchemy import insert  # noqa: E402
+
+from config import settings  # noqa: E402
+from db_layer.models import Post, User  # noqa: E402
+
+from .common import bench_app, report  # noqa: E402
+
+REQUESTS = 20
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(insert(User), [
+            {
+                'id': user_id,
+                'username': f'user{user_id}',
+                'password': 'hash',
+                'name': 'Имя',
+                'surname': 'Фамилия',
+                'email': f'user{user_id}@example.com',
+            }
+            for user_id in range(1, ROWS + 1)])
+        await session.execute(insert(Post), [
+            {'text': f'Пост номер {idx}', 'author_id': 1, 'like_count': idx}
+            for idx in range(ROWS)])
+        await session.commit()
+
+
+async def measure(client, url: str) -> list[float]:
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def main() -> None:
+    async with bench_app() as (client, session_factory):
+        await seed(session_factory)
+        for url in (f'/api/v1/posts/?limit={ROWS}', '/api/v1/users/'):
+            for fast in (False, True):
+                settings.fast_json_lists = fast
+                report(f'{url[:22]} {"fast" if fast else "pydantic"}',
+                       await measure(client, url))
+        settings.fast_json_lists = False
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
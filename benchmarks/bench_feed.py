@@ -0,0 +1,169 @@
+"""Нагрузочный тест ленты подписок со степенным распределением числа
+подписчиков: каждый пользователь подписан на `FOLLOWS_PER_USER`
+авторов, выбранных с вероятностью, обратно пропорциональной
+рангу автора (закон Ципфа), поэтому у немногих авторов тысячи
+подписчиков, а у большинства - единицы.
+
+Замеряются:
+- время публикации поста в зависимости от числа подписчиков автора
+  (рассылка по лентам выполняется в транзакции публикации);
+- сколько стоила бы рассылка поста самого популярного автора, если бы
+  у него не было `fanout_on_read`;
+- задержка первой и шестой страниц GET /api/v1/posts/feed.
+
+Запуск: python -m benchmarks.bench_feed [кол-во пользователей]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy import func, insert, select, update
+
+from business_layer.auth.jwt_handler import create_access_token
+from business_layer.schemas import PostCreate
+from config import settings
+from db_layer.crud import post_crud, timeline_crud
+from db_layer.models import Follow, Post, User
+
+from .common import bench_app, report
+
+FOLLOWS_PER_USER = 50
+ZIPF_EXPONENT = 1.1
+FANOUT_LIMIT = 1_000
+SEED_POSTS = 20_000
+POST_REQUESTS = 100
+FEED_REQUESTS = 200
+CHUNK_SIZE = 50_000
+
+
+async def seed(session_factory, users_num: int) -> dict[int, int]:
+    """Создает пользователей, подписки и посты. Возвращает число
+    подписчиков каждого автора."""
+    rnd = random.Random(1)
+    weights = [
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, users_num + 1)]
+    followers = dict.fromkeys(range(1, users_num + 1), 0)
+    follows = []
+    for follower_id in range(1, users_num + 1):
+        authors = set(rnd.choices(
+            range(1, users_num + 1), weights, k=FOLLOWS_PER_USER))
+        authors.discard(follower_id)
+        for author_id in authors:
+            followers[author_id] += 1
+            follows.append(
+                {'follower_id': follower_id, 'author_id': author_id})
+    async with session_factory() as session:
+        await session.execute(insert(User), [
+            {
+                'id': user_id,
+                'username': f'user{user_id}',
+                'password': 'hash',
+                'name': 'Bench',
+                'surname': 'Bench',
+                'email': 'bench@example.com',
+                'fanout_on_read': followers[user_id] > FANOUT_LIMIT,
+            }
+            for user_id in range(1, users_num + 1)])
+        for start in range(0, len(follows), CHUNK_SIZE):
+            await session.execute(
+                insert(Follow), follows[start:start + CHUNK_SIZE])
+        await session.commit()
+    # Посты создаются через CRUD, чтобы ленты заполнялись рассылкой.
+    async with session_factory() as session:
+        for _ in range(SEED_POSTS):
+            await post_crud.create(
+                PostCreate(
+                    text='Пост', author_id=rnd.randint(1, users_num)),
+                session)
+    return followers
+
+
+async def measure_posts(client, author_ids: list[int]) -> list[float]:
+    latencies = []
+    for idx in range(POST_REQUESTS):
+        author_id = author_ids[idx % len(author_ids)]
+        headers = {
+            'Authorization': f'Bearer {create_access_token(author_id)}'}
+        start = time.perf_counter()
+        response = await client.post(
+            '/api/v1/posts/', json={'text': 'Новый пост'}, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.text
+    return latencies
+
+
+async def measure_push_cost(session_factory, author_id: int) -> float:
+    """Время рассылки поста автора по лентам без `fanout_on_read`.
+    Изменения откатываются."""
+    async with session_factory() as session:
+        await session.execute(
+            update(User)
+            .where(User.id == author_id)
+            .values(fanout_on_read=False))
+        post = Post(text='Пост', author_id=author_id)
+        session.add(post)
+        await session.flush()
+        start = time.perf_counter()
+        await timeline_crud.fan_out(post, session)
+        elapsed = time.perf_counter() - start
+        await session.rollback()
+        return elapsed
+
+
+async def measure_feed(client, users_num: int, pages: int) -> list[float]:
+    rnd = random.Random(pages)
+    latencies = []
+    for _ in range(FEED_REQUESTS):
+        user_id = rnd.randint(1, users_num)
+        headers = {'Authorization': f'Bearer {create_access_token(user_id)}'}
+        params = {}
+        for _ in range(pages):
+            response = await client.get(
+                '/api/v1/posts/feed', params=params, headers=headers)
+            cursor = response.json()['next_cursor']
+            if cursor is None:
+                break
+            params = {'cursor': cursor}
+        start = time.perf_counter()
+        response = await client.get(
+            '/api/v1/posts/feed', params=params, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def main(users_num: int) -> None:
+    settings.timeline_fanout_limit = FANOUT_LIMIT
+    async with bench_app() as (client, session_factory):
+        followers = await seed(session_factory, users_num)
+        async with session_factory() as session:
+            timeline_rows = await session.scalar(
+                select(func.count()).select_from(timeline_crud.model))
+        by_followers = sorted(followers, key=followers.get)
+        celebrities = [
+            author_id for author_id in by_followers
+            if followers[author_id] > FANOUT_LIMIT]
+        print(f'{users_num} users, {sum(followers.values())} follows, '
+              f'{len(celebrities)} authors with fanout_on_read, '
+              f'{timeline_rows} timeline rows, '
+              f'max followers {followers[by_followers[-1]]}')
+        buckets = {
+            'post, <10 followers': [
+                a for a in by_followers if followers[a] < 10],
+            'post, 100-1000 followers': [
+                a for a in by_followers if 100 <= followers[a] <= 1000],
+            'post, fanout_on_read author': celebrities,
+        }
+        for name, author_ids in buckets.items():
+            if author_ids:
+                report(name, await measure_posts(client, author_ids))
+        top_author = by_followers[-1]
+        report(f'push to {followers[top_author]} timelines (not used)',
+               [await measure_push_cost(session_factory, top_author)])
+        report('feed, first page', await measure_feed(client, users_num, 0))
+        report('feed, 6th page', await measure_feed(client, users_num, 5))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
@@ -0,0 +1,36 @@
+"""Стоимость проверки JWT без кэша и с кэшем проверенных токенов.
+
+Запуск: python -m benchmarks.bench_jwt_decode [кол-во проверок]
+"""
+import sys
+import timeit
+
+from business_layer.auth.jwt_handler import (create_access_token,
+                                             decode_access_token,
+                                             verified_token_cache,
+                                             verify_access_token)
+
+
+def main(number: int) -> None:
+    tokens = [create_access_token(user_id) for user_id in range(1000)]
+    verified_token_cache.clear()
+
+    def cold():
+        for token in tokens:
+            decode_access_token(token)
+
+    def warm():
+        for token in tokens:
+            verify_access_token(token)
+
+    warm()
+    rounds = max(1, number // len(tokens))
+    for name, func in (('jose.jwt.decode', cold), ('cached verify', warm)):
+        seconds = timeit.timeit(func, number=rounds)
+        per_call = seconds / (rounds * len(tokens)) * 1e6
+        print(f'{name:<20} {per_call:8.2f} us/token')
+    print('cache stats:', verified_token_cache.stats())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
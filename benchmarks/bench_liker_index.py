@@ -0,0 +1,145 @@
+"""Индекс лайков в памяти: время построения, занимаемая память
+и задержка проверок по сравнению с запросами к таблице `like`.
+
+Лайки распределены по постам по закону Ципфа, поэтому у немногих постов
+десятки тысяч лайков, а у большинства - единицы. Замеряются:
+- построение индекса из таблицы `like` и его размер в байтах
+  на 1 млн лайков;
+- «лайкнул ли пользователь пост» и `liked_by_me` для страницы из 20 постов
+  в индексе и запросами к БД;
+- повторный лайк через POST /api/v1/like/{post_id} с индексом и без него.
+
+Запуск: python -m benchmarks.bench_liker_index [кол-во лайков]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy import insert, select
+
+from business_layer.auth.jwt_handler import create_access_token
+from business_layer.liker_index import liker_index
+from db_layer.crud import like_crud
+from db_layer.models import Like, Post, User
+
+from .common import bench_app, report
+
+USERS_NUM = 100_000
+POSTS_NUM = 100_000
+ZIPF_EXPONENT = 1.1
+CHECKS = 2_000
+PAGE_SIZE = 20
+REQUESTS = 200
+CHUNK_SIZE = 50_000
+
+
+async def seed(session_factory, likes_num: int) -> None:
+    rnd = random.Random(1)
+    weights = [
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, POSTS_NUM + 1)]
+    likes = set()
+    while len(likes) < likes_num:
+        post_ids = rnd.choices(
+            range(1, POSTS_NUM + 1), weights, k=likes_num - len(likes))
+        likes.update(
+            (post_id, rnd.randint(2, USERS_NUM)) for post_id in post_ids)
+    likes = list(likes)
+    async with session_factory() as session:
+        await session.execute(insert(User), [
+            {
+                'id': user_id,
+                'username': f'user{user_id}',
+                'password': 'hash',
+                'name': 'Bench',
+                'surname': 'Bench',
+                'email': 'bench@example.com',
+            }
+            for user_id in range(1, USERS_NUM + 1)])
+        await session.execute(insert(Post), [
+            {'text': 'Пост', 'author_id': 1}
+            for _ in range(POSTS_NUM)])
+        for start in range(0, len(likes), CHUNK_SIZE):
+            await session.execute(insert(Like), [
+                {'post_id': post_id, 'liker_id': liker_id}
+                for post_id, liker_id in likes[start:start + CHUNK_SIZE]])
+        await session.commit()
+
+
+async def measure_checks(session_factory) -> None:
+    rnd = random.Random(2)
+    pairs = [
+        (rnd.randint(1, 100), rnd.randint(2, USERS_NUM))
+        for _ in range(CHECKS)]
+    pages = [
+        (rnd.randint(2, USERS_NUM),
+         [rnd.randint(1, POSTS_NUM) for _ in range(PAGE_SIZE)])
+        for _ in range(CHECKS)]
+    latencies = []
+    for post_id, liker_id in pairs:
+        start = time.perf_counter()
+        liker_index.has_liked(post_id, liker_id)
+        latencies.append(time.perf_counter() - start)
+    report('has liked, index', latencies)
+    latencies = []
+    async with session_factory() as session:
+        for post_id, liker_id in pairs:
+            start = time.perf_counter()
+            await like_crud.get_like(post_id, liker_id, session)
+            latencies.append(time.perf_counter() - start)
+    report('has liked, SQLite', latencies)
+    latencies = []
+    for liker_id, post_ids in pages:
+        start = time.perf_counter()
+        liker_index.liked_post_ids(liker_id, post_ids)
+        latencies.append(time.perf_counter() - start)
+    report(f'liked_by_me for {PAGE_SIZE} posts, index', latencies)
+    latencies = []
+    async with session_factory() as session:
+        for liker_id, post_ids in pages:
+            start = time.perf_counter()
+            await like_crud.get_liked_post_ids(liker_id, post_ids, session)
+            latencies.append(time.perf_counter() - start)
+    report(f'liked_by_me for {PAGE_SIZE} posts, SQLite', latencies)
+
+
+async def measure_duplicates(client, session_factory) -> list[float]:
+    async with session_factory() as session:
+        likes = (await session.execute(
+            select(Like.post_id, Like.liker_id)
+            .where(Like.post_id <= 100)
+            .limit(REQUESTS))).all()
+    latencies = []
+    for post_id, liker_id in likes:
+        headers = {
+            'Authorization': f'Bearer {create_access_token(liker_id)}'}
+        start = time.perf_counter()
+        response = await client.post(
+            f'/api/v1/like/{post_id}', headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 403, response.text
+    return latencies
+
+
+async def main(likes_num: int) -> None:
+    async with bench_app() as (client, session_factory):
+        await seed(session_factory, likes_num)
+        start = time.perf_counter()
+        await liker_index.load(session_factory)
+        print(f'Индекс на {likes_num} лайков построен '
+              f'за {time.perf_counter() - start:.1f}s')
+        stats = liker_index.stats()
+        print(f'{stats["posts"]} posts, {stats["likes"]} likes, '
+              f'{stats["bytes"] / 2 ** 20:.1f} MiB, '
+              f'{stats["bytes_per_million_likes"] / 2 ** 20:.1f} MiB '
+              f'per 1M likes')
+        await measure_checks(session_factory)
+        report('duplicate like, index',
+               await measure_duplicates(client, session_factory))
+        liker_index.clear()
+        report('duplicate like, SQLite',
+               await measure_duplicates(client, session_factory))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
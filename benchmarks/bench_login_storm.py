@@ -0,0 +1,87 @@
+"""Задержка GET /api/v1/posts/ во время массового входа пользователей.
+
+Сравниваются три режима: без нагрузки, шторм логинов с bcrypt в пуле
+потоков и шторм логинов с bcrypt прямо в цикле событий (как было до
+выноса хэширования в пул).
+
+Запуск: python -m benchmarks.bench_login_storm [кол-во логинов]
+"""
+import asyncio
+import sys
+import time
+
+from business_layer.auth.hash_password import password_hasher
+from db_layer.models import Post, User
+
+from .common import bench_app, report
+
+PASSWORD = 'benchpassword123'
+LOGIN_FORM = {'username': 'bench', 'password': PASSWORD}
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as session:
+        session.add(User(
+            id=1,
+            username='bench',
+            password=password_hasher.create_hash(PASSWORD),
+            name='Bench',
+            surname='Bench',
+            email='bench@example.com',
+        ))
+        await session.flush()
+        session.add_all(
+            Post(text=f'Пост {idx}', author_id=1)
+            for idx in range(100))
+        await session.commit()
+
+
+async def probe_posts(client, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get('/api/v1/posts/')
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def login_storm(client, logins: int) -> None:
+    responses = await asyncio.gather(*(
+        client.post('/api/v1/users/login', data=LOGIN_FORM)
+        for _ in range(logins)))
+    codes = {response.status_code for response in responses}
+    assert codes <= {200, 503}, codes
+
+
+async def run_mode(client, logins: int | None) -> list[float]:
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_posts(client, stop))
+    if logins is None:
+        await asyncio.sleep(3)
+    else:
+        await login_storm(client, logins)
+    stop.set()
+    return await prober
+
+
+async def main(logins: int) -> None:
+    async with bench_app() as (client, session_factory):
+        await seed(session_factory)
+        report('no logins', await run_mode(client, None))
+        report(f'{logins} logins, thread pool', await run_mode(client, logins))
+
+        async def blocking_run(func, *args):
+            return func(*args)
+
+        password_hasher._run = blocking_run
+        try:
+            report(f'{logins} logins, blocking event loop',
+                   await run_mode(client, logins))
+        finally:
+            del password_hasher._run
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
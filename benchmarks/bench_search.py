@@ -0,0 +1,116 @@
+"""Задержка полнотекстового поиска GET /api/v1/posts/search на 1 млн
+постов: частые и редкие слова, префиксный запрос, несколько слов
+и вторая страница выдачи. Для сравнения замеряется наивный поиск
+`LIKE '%слово%'`, который просматривает всю таблицу `post`.
+
+Посты загружаются при выключенных триггерах, после чего индекс
+собирается целиком `rebuild_post_index` - так же, как при загрузке
+существующих данных.
+
+Запуск: python -m benchmarks.bench_search [кол-во постов] [кол-во запросов]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.sql import text
+
+from db_layer.fts import CREATE_POST_FTS, DROP_POST_FTS, rebuild_post_index
+from db_layer.models import Post, User
+
+from .common import bench_app, report
+
+CHUNK_SIZE = 50_000
+WORDS_NUM = 20_000
+WORDS_PER_POST = 12
+LIKE_REQUESTS = 3
+
+
+def make_words() -> list[str]:
+    letters = 'абвгдежзиклмнопрстуфхцчшэюя'
+    rnd = random.Random(1)
+    return [
+        ''.join(rnd.choice(letters) for _ in range(rnd.randint(4, 9)))
+        for _ in range(WORDS_NUM)]
+
+
+async def seed(engine, session_factory, posts_num: int, words) -> None:
+    # Частоты слов убывают по закону Ципфа, как в обычных текстах.
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    rnd = random.Random(2)
+    async with engine.begin() as conn:
+        for statement in DROP_POST_FTS:
+            await conn.execute(text(statement))
+    async with session_factory() as session:
+        await session.execute(insert(User).values(
+            id=1, username='author', password='hash', name='Bench',
+            surname='Bench', email='bench@example.com'))
+        for start in range(0, posts_num, CHUNK_SIZE):
+            await session.execute(insert(Post), [
+                {
+                    'text': ' '.join(rnd.choices(
+                        words, weights, k=WORDS_PER_POST)),
+                    'author_id': 1,
+                }
+                for _ in range(start, min(posts_num, start + CHUNK_SIZE))])
+        await session.commit()
+    async with engine.begin() as conn:
+        for statement in CREATE_POST_FTS:
+            await conn.execute(text(statement))
+    start = time.perf_counter()
+    await rebuild_post_index(engine)
+    print(f'Индекс на {posts_num} постов собран '
+          f'за {time.perf_counter() - start:.1f}s')
+
+
+async def measure(client, requests: int, params: dict) -> list[float]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get('/api/v1/posts/search', params=params)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def measure_like(session_factory, word: str) -> list[float]:
+    latencies = []
+    async with session_factory() as session:
+        for _ in range(LIKE_REQUESTS):
+            start = time.perf_counter()
+            await session.scalar(
+                select(func.count()).select_from(Post)
+                .where(Post.text.like(f'%{word}%')))
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(posts_num: int, requests: int) -> None:
+    words = make_words()
+    async with bench_app() as (client, session_factory):
+        engine = session_factory.kw['bind']
+        await seed(engine, session_factory, posts_num, words)
+        queries = {
+            'frequent word': {'q': words[0]},
+            'rare word': {'q': words[-1]},
+            'prefix': {'q': f'{words[50][:3]}*'},
+            'two words': {'q': f'{words[3]} {words[10]}'},
+        }
+        for name, params in queries.items():
+            report(f'search, {name}',
+                   await measure(client, requests, params))
+        response = await client.get(
+            '/api/v1/posts/search', params={'q': words[10]})
+        report('search, second page', await measure(
+            client, requests,
+            {'q': words[10], 'cursor': response.json()['next_cursor']}))
+        report('LIKE %word%, rare word',
+               await measure_like(session_factory, words[-1]))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100))
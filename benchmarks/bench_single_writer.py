@@ -0,0 +1,84 @@
+"""Пропускная способность записи при разной конкурентности: каждый
+запрос фиксирует свою транзакцию или все записи идут через единственного
+писателя с групповой фиксацией.
+
+Запуск: python -m benchmarks.bench_single_writer [кол-во записей]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from business_layer.schemas import PostCreate
+from config import settings
+from db_layer import crud
+from db_layer.db_engine import Base, configure_sqlite_engine
+from db_layer.models import User
+from db_layer.writer import DBWriter
+
+CONCURRENCY_LEVELS = (1, 8, 32, 128)
+
+
+async def run(writes: int, concurrency: int, single_writer: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f'sqlite+aiosqlite:///{Path(tmp_dir) / "bench.db"}'
+        engine = configure_sqlite_engine(create_async_engine(
+            url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.sqlite_pool_size,
+            max_overflow=settings.sqlite_max_overflow,
+            pool_timeout=300))
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User).values(
+                id=1, username='bench', password='hash', name='Bench',
+                surname='Bench', email='bench@example.com'))
+        writer_engine = configure_sqlite_engine(
+            create_async_engine(
+                url, poolclass=AsyncAdaptedQueuePool,
+                pool_size=1, max_overflow=0),
+            begin='IMMEDIATE')
+        writer = DBWriter(sessionmaker(
+            writer_engine, class_=AsyncSession, expire_on_commit=False))
+        crud.db_writer = writer
+        if single_writer:
+            await writer.start()
+        queue = asyncio.Queue()
+        for idx in range(writes):
+            queue.put_nowait(idx)
+
+        async def worker():
+            while not queue.empty():
+                idx = queue.get_nowait()
+                async with session_factory() as session:
+                    await crud.post_crud.create(
+                        new_obj=PostCreate(text=f'Пост {idx}', author_id=1),
+                        session=session)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await writer.stop()
+        await writer_engine.dispose()
+        await engine.dispose()
+    return writes / elapsed
+
+
+async def main(writes: int) -> None:
+    for concurrency in CONCURRENCY_LEVELS:
+        per_request = await run(writes, concurrency, single_writer=False)
+        grouped = await run(writes, concurrency, single_writer=True)
+        print(f'concurrency={concurrency:<4} '
+              f'commit per request: {per_request:8.1f} writes/s   '
+              f'single writer: {grouped:8.1f} writes/s')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,81 @@
+"""Смешанная нагрузка чтение/запись при стандартных настройках SQLite
+и при настройках из конфигурации (WAL, synchronous=NORMAL, mmap и т.д.).
+
+Запуск: python -m benchmarks.bench_sqlite_pragmas [кол-во операций]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db_layer.db_engine import (Base, configure_sqlite_engine,
+                                get_sqlite_pragmas)
+from db_layer.models import Post, User
+
+from .common import report
+
+CONCURRENCY = 16
+WRITE_SHARE = 0.2
+POSTS_NUM = 10000
+
+
+async def run_profile(name: str, pragmas: dict, operations: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = configure_sqlite_engine(
+            create_async_engine(
+                f'sqlite+aiosqlite:///{Path(tmp_dir) / "bench.db"}',
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=CONCURRENCY),
+            pragmas=pragmas)
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User).values(
+                id=1, username='bench', password='hash', name='Bench',
+                surname='Bench', email='bench@example.com'))
+            await conn.execute(insert(Post), [
+                {'text': f'Пост {idx}', 'author_id': 1, 'like_count': 0}
+                for idx in range(POSTS_NUM)])
+
+        reads, writes = [], []
+        queue = asyncio.Queue()
+        for _ in range(operations):
+            queue.put_nowait(random.random() < WRITE_SHARE)
+
+        async def worker():
+            while not queue.empty():
+                is_write = queue.get_nowait()
+                start = time.perf_counter()
+                async with session_factory() as session:
+                    if is_write:
+                        session.add(Post(text='Новый пост', author_id=1))
+                        await session.commit()
+                    else:
+                        await session.get(
+                            Post, random.randint(1, POSTS_NUM))
+                (writes if is_write else reads).append(
+                    time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+        await engine.dispose()
+    print(f'{name}: {operations / elapsed:8.1f} ops/s')
+    report(f'  {name} reads', reads)
+    report(f'  {name} writes', writes)
+
+
+async def main(operations: int) -> None:
+    await run_profile('sqlite defaults', {'foreign_keys': 'ON'}, operations)
+    await run_profile('tuned profile', get_sqlite_pragmas(), operations)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,87 @@
+"""Стоимость поддержки рейтинга популярных постов в зависимости
+от частоты лайков и задержка страницы GET /api/v1/posts/trending.
+
+Лайки применяются пачками, как при отложенной записи лайков: за интервал
+`LIKE_FLUSH_INTERVAL_MS` при частоте R лайков в секунду накапливается
+R * интервал лайков. Для каждой частоты замеряется время обновления
+рейтинга одной пачкой и доля интервала, которую оно занимает. Затем
+замеряется страница популярных постов при заполненном рейтинге.
+
+Запуск: python -m benchmarks.bench_trending [кол-во постов]
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from config import settings
+from db_layer.crud import trending_crud
+from db_layer.models import Post, User
+
+from .common import bench_app, report
+
+LIKE_RATES = (100, 1_000, 10_000, 50_000)
+FLUSHES = 20
+PAGE_REQUESTS = 200
+CHUNK_SIZE = 50_000
+
+
+async def seed(session_factory, posts_num: int) -> None:
+    async with session_factory() as session:
+        await session.execute(insert(User).values(
+            id=1, username='author', password='hash', name='Bench',
+            surname='Bench', email='bench@example.com'))
+        for start in range(0, posts_num, CHUNK_SIZE):
+            await session.execute(insert(Post), [
+                {'text': f'Пост {idx}', 'author_id': 1}
+                for idx in range(start, min(posts_num, start + CHUNK_SIZE))])
+        await session.commit()
+
+
+async def measure_refresh(session_factory, posts_num: int, rate: int):
+    interval = settings.like_flush_interval_ms / 1000
+    batch_size = max(1, int(rate * interval))
+    rnd = random.Random(rate)
+    latencies = []
+    for _ in range(FLUSHES):
+        now = int(datetime.utcnow().timestamp())
+        added = [
+            (rnd.randint(1, posts_num), now) for _ in range(batch_size)]
+        async with session_factory() as session:
+            start = time.perf_counter()
+            await trending_crud.apply(session, added=added)
+            await session.commit()
+            latencies.append(time.perf_counter() - start)
+    report(f'{rate} likes/s, batch {batch_size}', latencies)
+    busy = sum(latencies) / len(latencies) / interval * 100
+    print(f'{"":<40} {busy:.1f}% of flush interval')
+
+
+async def measure_page(client, params: dict) -> list[float]:
+    latencies = []
+    for _ in range(PAGE_REQUESTS):
+        start = time.perf_counter()
+        response = await client.get('/api/v1/posts/trending', params=params)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def main(posts_num: int) -> None:
+    async with bench_app() as (client, session_factory):
+        await seed(session_factory, posts_num)
+        for rate in LIKE_RATES:
+            await measure_refresh(session_factory, posts_num, rate)
+        report('trending, first page',
+               await measure_page(client, {'limit': 20}))
+        response = await client.get(
+            '/api/v1/posts/trending', params={'limit': 100})
+        report('trending, second page', await measure_page(
+            client, {'limit': 20, 'cursor': response.json()['next_cursor']}))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
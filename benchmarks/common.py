@@ -0,0 +1,90 @@
+"""Общие утилиты для бенчмарков: временная БД и клиент приложения."""
+import statistics
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import settings
+
+from db_layer.db_engine import (Base, configure_sqlite_engine,
+                                get_read_only_url, get_read_pragmas,
+                                get_read_session, get_write_session,
+                                start_unit_of_work)
+from main import app
+
+
+@asynccontextmanager
+async def bench_app(pragmas: dict | None = None):
+    """Поднимает приложение поверх временной файловой БД. Возвращает
+    асинхронный http-клиент и фабрику сессий для подготовки данных.
+    `pragmas` - настройки соединения SQLite, по умолчанию из конфигурации."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f'sqlite+aiosqlite:///{Path(tmp_dir) / "bench.db"}'
+        engine = configure_sqlite_engine(
+            create_async_engine(
+                url,
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.sqlite_pool_size,
+                max_overflow=settings.sqlite_max_overflow),
+            pragmas=pragmas)
+        read_engine = configure_sqlite_engine(
+            create_async_engine(
+                get_read_only_url(url),
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.sqlite_read_pool_size,
+                max_overflow=settings.sqlite_read_max_overflow),
+            pragmas=get_read_pragmas())
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        read_session_factory = sessionmaker(read_engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async def override_get_write_session(request: Request):
+            async with session_factory() as session:
+                start_unit_of_work(session, request)
+                yield session
+
+        async def override_get_read_session():
+            async with read_session_factory() as session:
+                yield session
+
+        app.dependency_overrides = {
+            get_write_session: override_get_write_session,
+            get_read_session: override_get_read_session,
+        }
+        try:
+            async with app.router.lifespan_context(app):
+                async with httpx.AsyncClient(
+                    app=app,
+                    base_url='http://bench',
+                    timeout=None,
+                ) as client:
+                    yield client, session_factory
+        finally:
+            app.dependency_overrides = {}
+            await read_engine.dispose()
+            await engine.dispose()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль `pct` (0-100) по списку значений."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        min(98, max(0, int(pct) - 1))]
+
+
+def report(name: str, latencies: list[float]) -> None:
+    """Печатает сводку по задержкам в миллисекундах."""
+    latencies_ms = [value * 1000 for value in latencies]
+    print(
+        f'{name:<40} n={len(latencies_ms):<6} '
+        f'p50={percentile(latencies_ms, 50):8.2f}ms '
+        f'p99={percentile(latencies_ms, 99):8.2f}ms '
+        f'max={max(latencies_ms):8.2f}ms')
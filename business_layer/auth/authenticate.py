@@ -3,36 +3,58 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from business_layer import schemas
+from business_layer.cache import auth_user_cache
 from db_layer import db_engine as db
-from db_layer import models
 from db_layer.crud import user_crud
 
 from .jwt_handler import verify_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/user/signin')
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl='/user/signin', auto_error=False)
 
 
 async def authenticate(
     session: Annotated[db.AsyncSession,
-                       Depends(db.get_async_session)],
+                       Depends(db.get_read_session)],
     token: Annotated[str, Depends(oauth2_scheme)]
-) -> models.User:
+) -> schemas.User:
     """Функция для обработки переданного на эндпойнт токена. Функция
     проверяет токен на валидность и срок действия, затем по user_id
     проверяет наличие пользователя в базе данных и его статус (пользователь
     должен быть активен, не отключен). Если проверки пройдены - функция
-    возвращает объект пользователя из БД."""
+    возвращает данные пользователя. Данные активных пользователей
+    кэшируются на `AUTH_CACHE_TTL` секунд; при изменении или удалении
+    пользователя через `user_crud` запись из кэша удаляется."""
     if not token:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=('Для получения доступа авторизуйтейсь '
                     'и добавьте токен в запрос.'))
     decoded_token = verify_access_token(token)
-    user = await user_crud.get(
-        obj_id=decoded_token['user_id'],
-        session=session)
+    user_id = decoded_token['user_id']
+    user = auth_user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = await user_crud.get(obj_id=user_id, session=session)
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=('Пользователь не найден.'))
+    user = schemas.User.model_validate(user)
+    auth_user_cache.set(user_id, user)
     return user
+
+
+async def authenticate_optional(
+    session: Annotated[db.AsyncSession,
+                       Depends(db.get_read_session)],
+    token: Annotated[str | None, Depends(optional_oauth2_scheme)]
+) -> schemas.User | None:
+    """Функция для эндпойнтов, доступных без авторизации. Если токен
+    не передан, возвращает None, иначе проверяет токен так же, как
+    `authenticate`."""
+    if not token:
+        return None
+    return await authenticate(session=session, token=token)
@@ -1,10 +1,31 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class HashPassword:
-    """Класс содержит методы создания хэша пароля и верификации пароля"""
+    """Класс содержит методы создания хэша пароля и верификации пароля.
+
+    Асинхронные методы выполняют bcrypt в ограниченном пуле потоков
+    (bcrypt отпускает GIL), чтобы не блокировать цикл событий. Если
+    в работе и в очереди уже `max_pending` задач, запрос сразу
+    отклоняется с кодом 503."""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self.max_workers = max_workers or settings.hash_workers
+        self.max_pending = max_pending or settings.hash_queue_limit
+        self._executor = None
+        self._pending = 0
 
     def create_hash(self, password: str):
         """Метод создает хэш пароля, используя алгоритм bcrypt"""
@@ -14,3 +35,46 @@ class HashPassword:
         """Метод принимает на вход пароль и его хэш и возвращает
         результат сверки пароля с хэшем"""
         return pwd_context.verify(plain_password, hashed_password)
+
+    async def create_hash_async(self, password: str) -> str:
+        """Асинхронная версия `create_hash`, выполняется в пуле потоков."""
+        return await self._run(self.create_hash, password)
+
+    async def verify_hash_async(
+        self,
+        plain_password: str,
+        hashed_password: str
+    ) -> bool:
+        """Асинхронная версия `verify_hash`, выполняется в пуле потоков."""
+        return await self._run(self.verify_hash, plain_password,
+                               hashed_password)
+
+    @property
+    def pending(self) -> int:
+        """Кол-во задач хэширования в работе и в очереди."""
+        return self._pending
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Сервис перегружен, повторите запрос позже.')
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='hash_password')
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Метод останавливает пул потоков, дожидаясь текущих задач."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = HashPassword()
@@ -1,12 +1,22 @@
+import hashlib
 from datetime import datetime
+from typing import Iterable
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 
+from business_layer.cache import TTLCache
 from config import Settings
 
 settings = Settings()
 
+verified_token_cache = TTLCache(
+    name='verified_tokens',
+    maxsize=settings.token_cache_size,
+    ttl=settings.token_cache_ttl,
+)
+revoked_tokens: dict[bytes, float] = {}
+
 
 def create_access_token(user_id: int) -> str:
     """Функция для создания токена на основе user_id и секрета, заданного
@@ -23,10 +33,17 @@ def create_access_token(user_id: int) -> str:
     )
 
 
-def verify_access_token(token: str) -> dict:
-    """Функция проверяет на валидность переданный в неё токен.
-    В случае успешной валидации функция возвращает расшифрованный
-    словарь, содержащий user_id и дату окончания срока действия."""
+def token_digest(token: str) -> bytes:
+    """Функция возвращает хэш токена. В кэшах хранятся только хэши,
+    сами токены не сохраняются."""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def decode_access_token(token: str) -> dict:
+    """Функция проверяет подпись и срок действия токена без обращения
+    к кэшу. В случае успешной валидации функция возвращает
+    расшифрованный словарь, содержащий user_id и дату окончания срока
+    действия."""
     try:
         data = jwt.decode(
             token,
@@ -52,3 +69,52 @@ def verify_access_token(token: str) -> dict:
             detail="Token expired!"
         )
     return data
+
+
+def verify_access_token(token: str) -> dict:
+    """Функция проверяет на валидность переданный в неё токен.
+    Результат успешной проверки кэшируется по хэшу токена, но не дольше
+    срока действия самого токена, поэтому повторные запросы с тем же
+    токеном не требуют проверки подписи. Отозванные токены
+    не принимаются."""
+    digest = token_digest(token)
+    if digest in revoked_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token revoked"
+        )
+    data = verified_token_cache.get(digest)
+    if data is not None:
+        return dict(data)
+    data = decode_access_token(token)
+    verified_token_cache.set(
+        digest,
+        data,
+        ttl=data['expires'] - datetime.now().timestamp())
+    return dict(data)
+
+
+def add_revoked_tokens(tokens: Iterable[tuple[bytes, float]]) -> None:
+    """Функция запрещает в своем процессе токены `tokens` (хэш токена
+    и окончание срока его действия) и удаляет их из кэша проверенных
+    токенов. Записи об истекших токенах при этом удаляются."""
+    now = datetime.now().timestamp()
+    for digest, expires in list(revoked_tokens.items()):
+        if expires <= now:
+            del revoked_tokens[digest]
+    for digest, expires in tokens:
+        if expires > now:
+            verified_token_cache.invalidate(digest)
+            revoked_tokens[digest] = expires
+
+
+def revoke_access_token(token: str) -> tuple[bytes, float]:
+    """Функция отзывает токен в своем процессе: удаляет его из кэша
+    проверенных токенов и запрещает его дальнейшее использование
+    до окончания срока его действия. Возвращает хэш токена и окончание
+    срока действия, чтобы отзыв можно было сохранить в БД для других
+    процессов (`revoked_token_crud`)."""
+    data = decode_access_token(token)
+    revoked = (token_digest(token), data['expires'])
+    add_revoked_tokens([revoked])
+    return revoked
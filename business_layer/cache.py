@@ -0,0 +1,225 @@
+"""Кэши и объединение одновременных чтений в памяти процесса."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from config import settings
+
+caches: dict[str, 'TTLCache'] = {}
+flights: dict[str, 'SingleFlight'] = {}
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых чтений: пока выполняется
+    загрузка по ключу, остальные запросы того же ключа не загружают
+    значение сами, а ждут результата первого запроса (или его ошибки).
+    Если первый запрос отменен, загрузку начинает один из ждущих.
+
+    Результат отдается только запросам, пришедшим во время загрузки,
+    и нигде не сохраняется. Группа с именем регистрируется в `flights`,
+    чтобы ее счетчики можно было отдать в метриках."""
+
+    def __init__(self, name: str | None = None) -> None:
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._loading: dict[Hashable, asyncio.Future] = {}
+        if name is not None:
+            flights[name] = self
+
+    def __len__(self) -> int:
+        return len(self._loading)
+
+    async def do(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        on_result: Callable[[Any], None] | None = None,
+    ) -> Any:
+        """Метод возвращает результат `loader()`, вызывая его, только если
+        загрузка по ключу `key` еще не идет. `on_result(value)` вызывается
+        первым запросом после загрузки, если за это время ключ не был
+        отвязан через `forget`."""
+        self.calls += 1
+        while key in self._loading:
+            future = self._loading[key]
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Загружавший запрос отменен - пробуем сами.
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            self._detach(key, future)
+            future.cancel()
+            raise
+        except BaseException as error:
+            self._detach(key, future)
+            future.set_exception(error)
+            # Ждущих может не быть: помечаем ошибку как полученную.
+            future.exception()
+            raise
+        if self._detach(key, future) and on_result is not None:
+            on_result(value)
+        future.set_result(value)
+        return value
+
+    def _detach(self, key: Hashable, future: asyncio.Future) -> bool:
+        if self._loading.get(key) is future:
+            del self._loading[key]
+            return True
+        return False
+
+    def forget(self, key: Hashable) -> None:
+        """Метод отвязывает идущую загрузку ключа: новые запросы начнут
+        загрузку заново, а ее результат получат только уже ждущие."""
+        self._loading.pop(key, None)
+
+    def forget_all(self) -> None:
+        """Метод отвязывает все идущие загрузки."""
+        self._loading.clear()
+
+    def clear(self) -> None:
+        """Метод отвязывает загрузки и сбрасывает счетчики."""
+        self.forget_all()
+        self.calls = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict:
+        """Метод возвращает кол-во идущих загрузок и статистику
+        обращений."""
+        return {
+            'in_flight': len(self._loading),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+        }
+
+
+class TTLCache:
+    """LRU-кэш с ограниченным временем жизни записей. При превышении
+    `maxsize` вытесняется запись, к которой дольше всего не обращались.
+    Кэш регистрируется в `caches` под своим именем, чтобы его счетчики
+    попадания и промахи можно было отдать в метриках.
+
+    `get_or_load` объединяет одновременные промахи по одному ключу:
+    значение загружает только первый запрос, остальные ждут его
+    результата."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._flight = SingleFlight()
+        caches[name] = self
+
+    @property
+    def coalesced(self) -> int:
+        return self._flight.coalesced
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Метод возвращает значение по ключу или `default`, если записи
+        нет или срок её жизни истек."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Метод сохраняет значение. `ttl` позволяет задать для записи
+        срок жизни короче стандартного."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Метод возвращает значение из кэша, а при промахе загружает его
+        через `loader()` и сохраняет, если оно не None. Пока значение
+        загружается, другие запросы того же ключа ждут этой загрузки,
+        а не вызывают `loader` сами. Если ключ инвалидирован во время
+        загрузки, результат отдается ждущим, но не сохраняется."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def store(value):
+            if value is not None:
+                self.set(key, value)
+
+        return await self._flight.do(key, loader, on_result=store)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Метод удаляет запись из кэша. Идущая загрузка этого ключа
+        отвязывается от кэша: ее результат не будет сохранен, а новые
+        запросы начнут загрузку заново."""
+        self._data.pop(key, None)
+        self._flight.forget(key)
+
+    def invalidate_all(self) -> None:
+        """Метод удаляет из кэша все записи, не сбрасывая счетчики."""
+        self._data.clear()
+        self._flight.forget_all()
+
+    def clear(self) -> None:
+        """Метод очищает кэш и сбрасывает счетчики."""
+        self.invalidate_all()
+        self.hits = 0
+        self.misses = 0
+        self._flight.clear()
+
+    def stats(self) -> dict:
+        """Метод возвращает размер кэша и статистику обращений."""
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': self.hits / requests if requests else 0.0,
+        }
+
+
+auth_user_cache = TTLCache(
+    name='auth_users',
+    maxsize=settings.auth_cache_size,
+    ttl=settings.auth_cache_ttl,
+)
+
+post_cache = TTLCache(
+    name='posts',
+    maxsize=settings.post_cache_size,
+    ttl=settings.post_cache_ttl,
+)
+
+read_flight = SingleFlight(name='reads')
@@ -0,0 +1,458 @@
+"""Отложенная запись лайков (write-behind).
+
+Лайки и отмены лайков проверяются и схлопываются в памяти, а в БД
+попадают пачкой раз в `flush_interval` секунд или при накоплении
+`max_events` изменений: одним `executemany` во временную таблицу
+и несколькими запросами, которые применяют изменения к `like`
+и суммарные изменения счетчиков к `post`, а также обновляют рейтинг
+популярных постов, в одной транзакции.
+
+Сохранность: каждое принятое событие до ответа клиенту дописывается
+в журнал на диске вместе с временем события. При падении процесса
+журнал переживает его (данные уже в кэше ОС); отключение питания -
+только с `fsync=True` (`LIKE_JOURNAL_FSYNC`, по умолчанию выключено).
+При запуске журналы, не успевшие попасть в БД, применяются заново:
+для каждой пары (пост, пользователь) берется последнее по времени
+событие из журналов всех завершившихся процессов. Применение
+идемпотентно: счетчики считаются по фактическим изменениям в `like`,
+поэтому повторное применение журнала их не искажает.
+
+Один процесс: решение, принять ли лайк или отмену, принимается
+по состоянию в памяти процесса, поэтому буфер можно включать только
+при одном воркере. Буфер пишет журнал `<journal_path>.<владелец>`
+и держит блокировку `flock` на файле `<journal_path>.<владелец>.lock`,
+пока работает. При запуске (запуски упорядочиваются блокировкой
+`<journal_path>.lock`) буфер применяет журналы владельцев, чью
+блокировку удалось взять, т.е. завершившихся процессов, а если
+блокировку держит работающий процесс, запуск завершается ошибкой.
+Без модуля `fcntl` (Windows) блокировки не берутся, и второй процесс
+не обнаруживается.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from sqlalchemy.sql import text
+
+from business_layer.cache import post_cache
+from business_layer.liker_index import liker_index
+from config import settings
+from db_layer import db_engine as db
+from db_layer.crud import like_crud, trending_crud
+from db_layer.invalidation import invalidation_bus
+from db_layer.writer import db_writer
+
+logger = logging.getLogger(__name__)
+
+CREATE_EVENTS_TABLE = text(
+    'CREATE TEMP TABLE IF NOT EXISTS like_events ('
+    'post_id INTEGER NOT NULL, liker_id INTEGER NOT NULL, '
+    'liked BOOLEAN NOT NULL, PRIMARY KEY (post_id, liker_id))')
+INSERT_EVENTS = text(
+    'INSERT OR REPLACE INTO like_events (post_id, liker_id, liked) '
+    'VALUES (:post_id, :liker_id, :liked)')
+DROP_ORPHAN_EVENTS = text(
+    'DELETE FROM like_events WHERE liked AND ('
+    'NOT EXISTS (SELECT 1 FROM post WHERE post.id = like_events.post_id) '
+    'OR NOT EXISTS (SELECT 1 FROM "user" '
+    'WHERE "user".id = like_events.liker_id))')
+SELECT_CHANGES = text(
+    'SELECT e.post_id AS post_id, e.liked AS liked, '
+    'l.create_timestamp AS create_timestamp '
+    'FROM like_events AS e LEFT JOIN "like" AS l '
+    'ON l.post_id = e.post_id AND l.liker_id = e.liker_id '
+    'WHERE (e.liked AND l.id IS NULL) OR (NOT e.liked AND l.id IS NOT NULL)')
+APPLY_COUNTERS = text(
+    'UPDATE post SET like_count = like_count + deltas.delta '
+    'FROM (SELECT e.post_id AS post_id, sum(CASE '
+    'WHEN e.liked AND l.id IS NULL THEN 1 '
+    'WHEN NOT e.liked AND l.id IS NOT NULL THEN -1 '
+    'ELSE 0 END) AS delta '
+    'FROM like_events AS e LEFT JOIN "like" AS l '
+    'ON l.post_id = e.post_id AND l.liker_id = e.liker_id '
+    'GROUP BY e.post_id) AS deltas '
+    'WHERE post.id = deltas.post_id AND deltas.delta != 0')
+APPLY_LIKES = text(
+    'INSERT INTO "like" (post_id, liker_id, create_timestamp) '
+    'SELECT post_id, liker_id, :now FROM like_events WHERE liked '
+    'ON CONFLICT DO NOTHING')
+APPLY_UNLIKES = text(
+    'DELETE FROM "like" WHERE (post_id, liker_id) IN ('
+    'SELECT post_id, liker_id FROM like_events WHERE NOT liked)')
+CLEAR_EVENTS = text('DELETE FROM like_events')
+
+
+def _flock(file, wait: bool) -> bool:
+    """Функция берет эксклюзивную блокировку файла. Возвращает False,
+    если `wait=False`, а файл заблокирован другим процессом."""
+    if fcntl is None:
+        return True
+    flags = fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+    try:
+        fcntl.flock(file.fileno(), flags)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class LikeWriteBehind:
+    """Буфер лайков с периодической пакетной записью в БД."""
+
+    def __init__(
+        self,
+        session_factory,
+        journal_path: str | Path | None = None,
+        flush_interval: float | None = None,
+        max_events: int | None = None,
+        fsync: bool | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.journal_path = Path(journal_path or settings.like_journal_path)
+        self.flush_interval = (
+            settings.like_flush_interval_ms / 1000
+            if flush_interval is None else flush_interval)
+        self.max_events = max_events or settings.like_flush_max_events
+        self.fsync = settings.like_journal_fsync if fsync is None else fsync
+        # (post_id, liker_id) -> [состояние в БД, итоговое состояние]
+        self._pending: dict[tuple[int, int], list[bool]] = {}
+        self._flushing: dict[tuple[int, int], list[bool]] = {}
+        self._flushed_batches = 0
+        self._journal = None
+        self._journal_seq = 0
+        self._lock_file = None
+        self.owner = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        """Метод применяет журналы завершившихся процессов и запускает
+        фоновую запись в собственный журнал. Если в той же папке уже
+        работает буфер другого процесса, вызывает RuntimeError."""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self.owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._journal_seq = 0
+        with self._startup_lock():
+            self._lock_file = open(
+                self._owner_path(self.owner, '.lock'), 'a', encoding='utf-8')
+            _flock(self._lock_file, wait=False)
+            try:
+                await self._replay_journals()
+            except BaseException:
+                self._release_journal()
+                raise
+        self._journal = open(
+            self._owner_path(self.owner), 'a', encoding='utf-8')
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Метод останавливает фоновую запись, предварительно записав
+        в БД все накопленные изменения, и закрывает журнал."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._journal.close()
+            self._journal = None
+            self._release_journal()
+
+    async def like(self, post_id: int, liker_id: int,
+                   session: db.AsyncSession) -> bool:
+        """Метод принимает лайк. Возвращает False, если пользователь
+        уже лайкнул пост."""
+        return await self._change(post_id, liker_id, True, session)
+
+    async def unlike(self, post_id: int, liker_id: int,
+                     session: db.AsyncSession) -> bool:
+        """Метод принимает отмену лайка. Возвращает False, если лайка
+        не было."""
+        return await self._change(post_id, liker_id, False, session)
+
+    async def flush(self) -> None:
+        """Метод записывает в БД все накопленные изменения."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            journal_seq = self._rotate_journal()
+            changes = {
+                key: desired for key, (base, desired) in batch.items()
+                if base != desired}
+            try:
+                await self._apply(changes)
+            except Exception:
+                for key, state in batch.items():
+                    if key in self._pending:
+                        self._pending[key][0] = state[0]
+                    else:
+                        self._pending[key] = state
+                raise
+            finally:
+                self._flushing = {}
+            self._flushed_batches += 1
+            for path in self._rotated_journals(self.owner):
+                if int(path.suffix[1:]) <= journal_seq:
+                    path.unlink()
+
+    def pending_likes(
+        self,
+        liker_id: int,
+        post_ids: list[int],
+    ) -> dict[int, bool]:
+        """Метод возвращает еще не записанное в БД состояние лайков
+        пользователя для постов из `post_ids`: post_id -> есть ли лайк."""
+        result = {}
+        for post_id in post_ids:
+            key = (post_id, liker_id)
+            state = self._pending.get(key) or self._flushing.get(key)
+            if state is not None:
+                result[post_id] = state[1]
+        return result
+
+    async def _change(self, post_id, liker_id, liked, session) -> bool:
+        key = (post_id, liker_id)
+        while key not in self._pending:
+            if key in self._flushing:
+                exists = self._flushing[key][1]
+                self._pending[key] = [exists, exists]
+                break
+            if liker_index.loaded:
+                exists = liker_index.has_liked(post_id, liker_id)
+                self._pending[key] = [exists, exists]
+                break
+            flushed_batches = self._flushed_batches
+            like = await like_crud.get_like(
+                post_id=post_id,
+                liker_id=liker_id,
+                session=session)
+            if key in self._pending:
+                break
+            if (flushed_batches == self._flushed_batches
+                    and key not in self._flushing):
+                self._pending[key] = [like is not None, like is not None]
+        state = self._pending[key]
+        if state[1] == liked:
+            return False
+        self._journal.write(
+            f'{"L" if liked else "U"} {post_id} {liker_id} '
+            f'{time.time_ns()}\n')
+        self._journal.flush()
+        state[1] = liked
+        if len(self._pending) >= self.max_events:
+            self._wakeup.set()
+        if self.fsync:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._fsync_journal, self._journal)
+        return True
+
+    @staticmethod
+    def _fsync_journal(journal) -> None:
+        try:
+            os.fsync(journal.fileno())
+        except (OSError, ValueError):
+            # Журнал успели сменить: при смене он уже сброшен на диск.
+            if not journal.closed:
+                raise
+
+    def _owner_path(self, owner: str | None, suffix: str = '') -> Path:
+        """Путь к журналу (или его блокировке) владельца `owner`. Для
+        None - журнал версий без владельцев, писавших прямо
+        в `journal_path`."""
+        if owner is None:
+            return self.journal_path.with_name(
+                f'{self.journal_path.name}{suffix}')
+        return self.journal_path.with_name(
+            f'{self.journal_path.name}.{owner}{suffix}')
+
+    @contextmanager
+    def _startup_lock(self):
+        with open(self._owner_path(None, '.lock'), 'a') as lock_file:
+            _flock(lock_file, wait=True)
+            yield
+
+    def _rotate_journal(self) -> int:
+        self._journal_seq += 1
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal.close()
+        self._owner_path(self.owner).rename(
+            self._owner_path(self.owner, f'.{self._journal_seq}'))
+        self._journal = open(
+            self._owner_path(self.owner), 'a', encoding='utf-8')
+        return self._journal_seq
+
+    def _rotated_journals(self, owner: str | None) -> list[Path]:
+        prefix = self._owner_path(owner).name
+        pattern = re.compile(rf'^{re.escape(prefix)}\.(\d+)$')
+        paths = [
+            path for path in self.journal_path.parent.iterdir()
+            if pattern.match(path.name)]
+        return sorted(paths, key=lambda path: int(path.suffix[1:]))
+
+    def _journals(self, owner: str | None) -> list[Path]:
+        """Журналы владельца в порядке записи: ротированные и текущий."""
+        paths = self._rotated_journals(owner)
+        if self._owner_path(owner).exists():
+            paths.append(self._owner_path(owner))
+        return paths
+
+    def _release_journal(self) -> None:
+        """Метод удаляет пустой журнал остановленного буфера и снимает
+        блокировку. Непустые журналы (запись в БД при остановке
+        не удалась) остаются и будут применены при следующем запуске."""
+        live_path = self._owner_path(self.owner)
+        if (not self._rotated_journals(self.owner)
+                and live_path.exists() and not live_path.stat().st_size):
+            live_path.unlink()
+        self._owner_path(self.owner, '.lock').unlink(missing_ok=True)
+        self._lock_file.close()
+        self._lock_file = None
+
+    async def _replay_journals(self) -> None:
+        owner_pattern = re.compile(
+            rf'^{re.escape(self.journal_path.name)}\.'
+            r'(\d+-[0-9a-f]{8})(?:\.\d+|\.lock)?$')
+        owners = {
+            match.group(1) for match in map(
+                owner_pattern.match,
+                (path.name for path in self.journal_path.parent.iterdir()))
+            if match} - {self.owner}
+        journals = [self._journals(None)]
+        dead_owners = []
+        try:
+            for owner in sorted(owners):
+                lock_file = open(
+                    self._owner_path(owner, '.lock'), 'a', encoding='utf-8')
+                if not _flock(lock_file, wait=False):
+                    lock_file.close()
+                    raise RuntimeError(
+                        'Буфер отложенной записи лайков уже работает '
+                        f'в процессе {owner.split("-")[0]}: включайте '
+                        'LIKE_WRITE_BEHIND только при одном воркере.')
+                dead_owners.append((owner, lock_file))
+                journals.append(self._journals(owner))
+            # Внутри журналов одного процесса события идут по порядку,
+            # а между процессами упорядочиваются по времени события.
+            latest = {}
+            for paths in journals:
+                for key, event in self._read_journals(paths).items():
+                    if key not in latest or event[0] >= latest[key][0]:
+                        latest[key] = event
+            changes = {key: liked for key, (_, liked) in latest.items()}
+            if changes:
+                await self._apply(changes)
+            for paths in journals:
+                for path in paths:
+                    path.unlink()
+            for owner, _ in dead_owners:
+                self._owner_path(owner, '.lock').unlink(missing_ok=True)
+        finally:
+            for _, lock_file in dead_owners:
+                lock_file.close()
+
+    @staticmethod
+    def _read_journals(
+        paths: list[Path],
+    ) -> dict[tuple[int, int], tuple[int, bool]]:
+        """Метод читает журналы одного процесса и возвращает последнее
+        событие для каждой пары (post_id, liker_id): время события в нс
+        (0 для строк без времени из прежних версий) и есть ли лайк.
+        Недописанная последняя строка (без перевода строки)
+        пропускается."""
+        events = {}
+        for path in paths:
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    parts = line.split()
+                    if (not line.endswith('\n')
+                            or len(parts) not in (3, 4)
+                            or parts[0] not in ('L', 'U')
+                            or not all(part.isdigit() for part in parts[1:])):
+                        continue
+                    timestamp = int(parts[3]) if len(parts) == 4 else 0
+                    events[(int(parts[1]), int(parts[2]))] = (
+                        timestamp, parts[0] == 'L')
+        return events
+
+    async def _apply(self, changes: dict[tuple[int, int], bool]) -> None:
+        if not changes:
+            return
+        stale_entries = [
+            (post_cache, post_id)
+            for post_id in {post_id for post_id, _ in changes}]
+
+        async def operation(session):
+            now = int(datetime.utcnow().timestamp())
+            await session.execute(CREATE_EVENTS_TABLE)
+            await session.execute(INSERT_EVENTS, [
+                {'post_id': post_id, 'liker_id': liker_id, 'liked': liked}
+                for (post_id, liker_id), liked in changes.items()])
+            await session.execute(DROP_ORPHAN_EVENTS)
+            applied = (await session.execute(SELECT_CHANGES)).all()
+            await session.execute(APPLY_COUNTERS)
+            await session.execute(APPLY_LIKES, {'now': now})
+            await session.execute(APPLY_UNLIKES)
+            await session.execute(CLEAR_EVENTS)
+            await trending_crud.apply(
+                session,
+                added=[(row.post_id, now) for row in applied if row.liked],
+                removed=[
+                    (row.post_id, row.create_timestamp)
+                    for row in applied if not row.liked])
+            await invalidation_bus.publish(session, stale_entries)
+
+        try:
+            if db_writer.running:
+                await db_writer.submit(operation)
+                return
+            async with self.session_factory() as session:
+                await operation(session)
+                await session.commit()
+        finally:
+            invalidation_bus.invalidate(stale_entries)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                if self._stopping:
+                    raise
+                logger.exception('Не удалось записать лайки в БД.')
+                continue
+            if self._stopping:
+                return
+
+
+like_buffer = LikeWriteBehind(session_factory=db.AsyncSessionLocal)
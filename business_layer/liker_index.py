@@ -0,0 +1,126 @@
+"""Индекс лайков в памяти процесса.
+
+Для каждого поста хранится отсортированный массив id лайкнувших его
+пользователей (`array('I')`, 4 байта на лайк вместо ~60 байт на элемент
+`set`). Проверка «лайкнул ли пользователь пост» - двоичный поиск,
+кол-во лайков - длина массива, поэтому проверка повторного лайка,
+отмена несуществующего лайка и `liked_by_me` обходятся без запросов
+к БД. Добавление и удаление лайка сдвигают хвост массива, что для
+типичных постов (до сотен тысяч лайков) дешевле запроса к SQLite.
+
+Индекс строится из таблицы `like` при запуске (`LIKER_INDEX`)
+и обновляется эндпойнтами лайков после записи в БД. Он видит только
+лайки, прошедшие через свой процесс, поэтому включать его можно лишь
+при одном воркере.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable
+
+from sqlalchemy import select
+
+from db_layer.models import Like
+
+LOAD_CHUNK_SIZE = 100_000
+
+
+class LikerIndex:
+    """Отсортированные массивы id лайкнувших пользователей по постам."""
+
+    def __init__(self) -> None:
+        self._likers: dict[int, array] = {}
+        self.loaded = False
+
+    async def load(self, session_factory) -> None:
+        """Метод строит индекс по таблице `like`. Строки читаются
+        по индексу (post_id, liker_id), т.е. уже отсортированными."""
+        likers = {}
+        async with session_factory() as session:
+            result = await session.stream(
+                select(Like.post_id, Like.liker_id)
+                .order_by(Like.post_id, Like.liker_id)
+                .execution_options(yield_per=LOAD_CHUNK_SIZE))
+            async for rows in result.partitions():
+                for post_id, post_rows in groupby(rows, itemgetter(0)):
+                    post_likers = likers.get(post_id)
+                    if post_likers is None:
+                        post_likers = likers[post_id] = array('I')
+                    post_likers.extend(map(itemgetter(1), post_rows))
+        self._likers = likers
+        self.loaded = True
+
+    def clear(self) -> None:
+        """Метод выключает индекс и освобождает память."""
+        self._likers = {}
+        self.loaded = False
+
+    def has_liked(self, post_id: int, liker_id: int) -> bool:
+        """Метод проверяет, лайкнул ли пользователь пост."""
+        post_likers = self._likers.get(post_id)
+        if not post_likers:
+            return False
+        position = bisect_left(post_likers, liker_id)
+        return (
+            position < len(post_likers)
+            and post_likers[position] == liker_id)
+
+    def count(self, post_id: int) -> int:
+        """Метод возвращает кол-во лайков поста."""
+        return len(self._likers.get(post_id, ()))
+
+    def liked_post_ids(
+        self,
+        liker_id: int,
+        post_ids: Iterable[int],
+    ) -> set[int]:
+        """Метод возвращает id постов из `post_ids`, лайкнутых
+        пользователем."""
+        return {
+            post_id for post_id in post_ids
+            if self.has_liked(post_id, liker_id)}
+
+    def add(self, post_id: int, liker_id: int) -> bool:
+        """Метод добавляет лайк. Возвращает False, если он уже был."""
+        post_likers = self._likers.setdefault(post_id, array('I'))
+        position = bisect_left(post_likers, liker_id)
+        if (position < len(post_likers)
+                and post_likers[position] == liker_id):
+            return False
+        post_likers.insert(position, liker_id)
+        return True
+
+    def remove(self, post_id: int, liker_id: int) -> bool:
+        """Метод удаляет лайк. Возвращает False, если его не было."""
+        post_likers = self._likers.get(post_id)
+        if not self.has_liked(post_id, liker_id):
+            return False
+        del post_likers[bisect_left(post_likers, liker_id)]
+        if not post_likers:
+            del self._likers[post_id]
+        return True
+
+    def remove_post(self, post_id: int) -> None:
+        """Метод удаляет все лайки поста."""
+        self._likers.pop(post_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Метод возвращает размер индекса: кол-во постов и лайков,
+        занятую память в байтах (массивы и словарь) и память
+        в пересчете на 1 млн лайков."""
+        likes = sum(map(len, self._likers.values()))
+        memory = sys.getsizeof(self._likers) + sum(
+            sys.getsizeof(post_likers)
+            for post_likers in self._likers.values())
+        return {
+            'posts': len(self._likers),
+            'likes': likes,
+            'bytes': memory,
+            'bytes_per_million_likes': (
+                round(memory / likes * 1_000_000) if likes else 0),
+        }
+
+
+liker_index = LikerIndex()
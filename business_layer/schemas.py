@@ -1,5 +1,9 @@
+from typing import Generic, TypeVar
+
 from pydantic import BaseModel, EmailStr
 
+ItemType = TypeVar('ItemType')
+
 
 class UserBase(BaseModel):
     """Базовая схема пользователя с общими атрибутами для всех схем
@@ -28,6 +32,17 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserShort(BaseModel):
+    """Схема с краткими данными пользователя для списков."""
+
+    id: int
+    username: str
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
 class TokenResponse(BaseModel):
     """Схема для возвращения пользователю данных о выпущенном токене."""
     access_token: str
@@ -53,12 +68,6 @@ class PostUpdate(PostBase):
     update_timestamp: int
 
 
-class PostLikeUpdate(BaseModel):
-    """Схема, используемая для обновления кол-ва лайков у поста."""
-    id: int
-    like_count: int
-
-
 class Post(PostCreate):
     """Схема для получения всех данных поста."""
     id: int
@@ -69,6 +78,12 @@ class Post(PostCreate):
         from_attributes = True
 
 
+class PostRead(Post):
+    """Схема для просмотра поста. `liked_by_me` заполняется только
+    для авторизованного пользователя."""
+    liked_by_me: bool | None = None
+
+
 class LikeBase(BaseModel):
     """Схема для создания и получения информации о лайках."""
 
@@ -79,6 +94,32 @@ class LikeBase(BaseModel):
         from_attributes = True
 
 
+class FollowBase(BaseModel):
+    """Схема для создания и получения информации о подписках."""
+
+    follower_id: int
+    author_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class Page(BaseModel, Generic[ItemType]):
+    """Схема страницы списка. `next_cursor` передается в следующий запрос
+    для получения следующей страницы; None - страница последняя."""
+
+    items: list[ItemType]
+    next_cursor: str | None = None
+
+
+class PostList(Page[PostRead]):
+    """Схема списка постов. При запросе постов по списку id посты
+    идут в порядке запроса, а ненайденные id перечислены
+    в `missing_ids`."""
+
+    missing_ids: list[int] | None = None
+
+
 class NotFound(BaseModel):
     """Схема для сообщения об остутсвии данных в БД."""
 
@@ -89,3 +130,9 @@ class ForbiddenAction(BaseModel):
     """Схема для сообщения о не разрешенных действиях."""
 
     detail: str = 'Действие не разрешено'
+
+
+class ServiceUnavailable(BaseModel):
+    """Схема для сообщения о временной перегрузке сервиса."""
+
+    detail: str = 'Сервис перегружен, повторите запрос позже.'
@@ -0,0 +1,66 @@
+"""Быстрая сериализация списков в JSON.
+
+Обычный путь FastAPI для каждой строки создает модель Pydantic
+из атрибутов ORM-объекта, а затем перекодирует ее `jsonable_encoder`.
+На больших страницах это дороже самого запроса. `RowSerializer`
+работает со строками, выбранными из БД как кортежи колонок в порядке
+полей схемы, и сразу кодирует их в JSON. Поля и их порядок берутся
+из той же схемы, что указана в `response_model`, поэтому ответ
+и OpenAPI совпадают с обычным путем. Включается настройкой
+`FAST_JSON_LISTS`.
+"""
+import json
+from typing import Any, Iterable, Sequence
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from business_layer import schemas
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(data: Any) -> bytes:
+    """Функция кодирует данные из стандартных типов в JSON."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _json_encoder.encode(data).encode()
+
+
+class RowSerializer:
+    """Сериализатор строк по полям схемы `schema`. Поля из `exclude`
+    в строках не ожидаются: их можно добавить в словари отдельно.
+    `only` оставляет из полей схемы только перечисленные."""
+
+    def __init__(
+        self,
+        schema: type[BaseModel],
+        exclude: Iterable[str] = (),
+        only: Iterable[str] | None = None,
+    ) -> None:
+        exclude = set(exclude)
+        only = None if only is None else set(only)
+        self.fields = tuple(
+            name for name in schema.model_fields
+            if name not in exclude and (only is None or name in only))
+
+    def to_dicts(self, rows: Iterable[Sequence]) -> list[dict]:
+        """Метод превращает строки с колонками в порядке `fields`
+        в словари."""
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+    def dumps(self, rows: Iterable[Sequence]) -> bytes:
+        """Метод кодирует строки в JSON-массив объектов."""
+        return dumps(self.to_dicts(rows))
+
+
+post_serializer = RowSerializer(
+    schema=schemas.PostRead,
+    exclude=('liked_by_me',),
+)
+user_serializer = RowSerializer(schema=schemas.User)
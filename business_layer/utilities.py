@@ -1,17 +1,330 @@
+import base64
+import binascii
+import hashlib
+import json
+import re
+from operator import attrgetter
+from typing import Any
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+
 from business_layer import schemas
+from business_layer.cache import read_flight
+from business_layer.like_buffer import like_buffer
+from business_layer.liker_index import liker_index
+from business_layer.serializers import RowSerializer, dumps, post_serializer
+from config import settings
 from db_layer import db_engine as db
 from db_layer.crud import like_crud, post_crud
 
+# Слово поискового запроса; `*` в конце - поиск по префиксу.
+SEARCH_TERM = re.compile(r'(\w+)(\*?)')
+
+# Поля поста, по которым определяется версия страницы списка.
+POST_VERSION_FIELDS = ('id', 'version', 'like_count')
+
+
+def encode_cursor(values: tuple | None) -> str | None:
+    """Функция упаковывает значения ключей пагинации в непрозрачную
+    строку-курсор."""
+    if values is None:
+        return None
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None) -> tuple | None:
+    """Функция распаковывает курсор, полученный от клиента. При
+    некорректном курсоре возвращается ошибка 400."""
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if (not isinstance(values, list) or not values or not all(
+            isinstance(value, (int, float, str)) for value in values)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    return tuple(values)
+
+
+def build_match_query(query: str) -> str:
+    """Функция превращает поисковый запрос пользователя в запрос FTS5:
+    слова берутся в кавычки (так синтаксис FTS5 в запросе не
+    учитывается) и объединяются по И, а слова со `*` на конце ищутся
+    по префиксу. Если в запросе нет слов, возвращается ошибка 400."""
+    terms = [f'"{word}"{star}' for word, star in SEARCH_TERM.findall(query)]
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='В поисковом запросе нет слов.')
+    return ' '.join(terms)
+
+
+def parse_fields(
+    fields: str | None,
+    schema: type[BaseModel],
+) -> tuple[str, ...] | None:
+    """Функция разбирает параметр `fields` (названия полей через запятую)
+    и возвращает поля схемы `schema` в порядке схемы. При неизвестных
+    полях возвращается ошибка 400."""
+    if fields is None:
+        return None
+    names = set(fields.split(','))
+    unknown = names - schema.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Неизвестные поля: {", ".join(sorted(unknown))}.')
+    return tuple(name for name in schema.model_fields if name in names)
+
+
+def get_post_serializer(fields: tuple[str, ...] | None) -> RowSerializer:
+    """Функция возвращает сериализатор постов для полей `fields`
+    (None - все поля схемы). `liked_by_me` в БД не хранится
+    и добавляется отдельно."""
+    if fields is None:
+        return post_serializer
+    return RowSerializer(
+        schema=schemas.PostRead,
+        exclude=('liked_by_me',),
+        only=fields,)
+
+
+def wants_liked_by_me(fields: tuple[str, ...] | None) -> bool:
+    """Функция проверяет, нужно ли для полей `fields` вычислять
+    `liked_by_me`."""
+    return fields is None or 'liked_by_me' in fields
+
+
+def posts_response(
+    rows: list,
+    serializer: RowSerializer,
+    liked_ids: set[int] | None,
+    **extra: Any,
+) -> Response:
+    """Функция кодирует строки постов с колонками в порядке полей
+    `serializer` (и `id` среди остальных) в JSON-ответ со списком
+    `items` и полями `extra`."""
+    items = serializer.to_dicts(rows)
+    if liked_ids is not None:
+        for item, row in zip(items, rows):
+            item['liked_by_me'] = row.id in liked_ids
+    return Response(
+        content=dumps({'items': items, **extra}),
+        media_type='application/json')
+
+
+async def render_posts_page(
+    posts: list,
+    next_key: tuple | None,
+    fields: tuple[str, ...] | None,
+    user: schemas.User | None,
+    session: db.AsyncSession,
+) -> dict | Response:
+    """Функция готовит ответ со страницей постов `posts` - строк
+    с полями сериализатора для `fields` и `id`. При включенной настройке
+    `FAST_JSON_LISTS` или переданных `fields` строки сразу кодируются
+    в JSON, иначе возвращается словарь для `response_model`."""
+    serializer = get_post_serializer(fields)
+    if not wants_liked_by_me(fields):
+        user = None
+    liked_ids = await get_liked_post_ids(
+        user, [post.id for post in posts], session)
+    next_cursor = encode_cursor(next_key)
+    if settings.fast_json_lists or fields is not None:
+        return posts_response(
+            posts, serializer, liked_ids, next_cursor=next_cursor)
+    return {
+        'items': await mark_liked_by_me(posts, user, session, liked_ids),
+        'next_cursor': next_cursor,
+    }
 
-async def change_like_in_post(post_id: int, session: db.AsyncSession) -> None:
+
+async def get_liked_post_ids(
+    user: schemas.User | None,
+    post_ids: list[int],
+    session: db.AsyncSession,
+) -> set[int] | None:
+    """Функция возвращает id постов из `post_ids`, лайкнутых
+    пользователем, одним запросом к БД. Если включена отложенная запись
+    лайков, учитываются и еще не записанные в БД лайки. Если загружен
+    индекс лайков, он уже содержит их, и запрос к БД не выполняется.
+    Для анонимного пользователя возвращает None."""
+    if user is None:
+        return None
+    if liker_index.loaded:
+        return liker_index.liked_post_ids(user.id, post_ids)
+    liked_ids = await like_crud.get_liked_post_ids(
+        liker_id=user.id,
+        post_ids=post_ids,
+        session=session)
+    if like_buffer.running:
+        for post_id, liked in like_buffer.pending_likes(
+                user.id, post_ids).items():
+            if liked:
+                liked_ids.add(post_id)
+            else:
+                liked_ids.discard(post_id)
+    return liked_ids
+
+
+async def mark_liked_by_me(
+    posts: list,
+    user: schemas.User | None,
+    session: db.AsyncSession,
+    liked_ids: set[int] | None = None,
+) -> list:
+    """Функция заполняет `liked_by_me` у постов. Если `liked_ids`
+    не переданы, они получаются одним запросом на все посты. Для
+    анонимного пользователя посты возвращаются без изменений."""
+    if user is None:
+        return posts
+    items = [schemas.PostRead.model_validate(post) for post in posts]
+    if liked_ids is None:
+        liked_ids = await get_liked_post_ids(
+            user, [item.id for item in items], session)
+    for item in items:
+        item.liked_by_me = item.id in liked_ids
+    return items
+
+
+async def load_post(
+    post_id: int,
+    session: db.AsyncSession,
+) -> tuple[schemas.PostRead, bytes] | None:
+    """Функция загружает пост для кэша постов: схему поста и готовое
+    тело ответа для анонимного пользователя."""
     post = await post_crud.get(obj_id=post_id, session=session)
-    like_count = await like_crud.count_likes(
-        post_id=post_id,
-        session=session,)
-    update_likes_in_post = schemas.PostLikeUpdate(
-        id=post_id,
-        like_count=like_count,)
-    await post_crud.update(
-        obj=post,
-        update_data=update_likes_in_post,
-        session=session,)
+    if post is None:
+        return None
+    post = schemas.PostRead.model_validate(post)
+    return post, post.model_dump_json(exclude_unset=True).encode()
+
+
+def post_etag(post, liked_ids: set[int] | None = None) -> str:
+    """Функция возвращает сильный ETag поста. Кроме версии поста
+    (`update_timestamp`, `like_count`) в него входит текст, т.к.
+    `update_timestamp` хранится с точностью до секунды, и для
+    авторизованного пользователя - `liked_by_me`."""
+    liked_by_me = None if liked_ids is None else post.id in liked_ids
+    raw = repr((
+        post.id, post.update_timestamp, post.like_count, post.text,
+        liked_by_me)).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def page_etag(
+    items: list,
+    has_next: bool,
+    liked_ids: set[int] | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> str:
+    """Функция возвращает слабый ETag страницы списка постов по версиям
+    постов на странице и запрошенным полям. Подходит как для постов,
+    так и для строк с полями `POST_VERSION_FIELDS`."""
+    versions = list(map(attrgetter(*POST_VERSION_FIELDS), items))
+    liked = None if liked_ids is None else sorted(liked_ids)
+    raw = dumps([versions, has_next, liked, fields])
+    return f'W/"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Функция сравнивает ETag с заголовком `If-None-Match` (слабое
+    сравнение, как требует RFC 9110 для этого заголовка)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    etag = etag.removeprefix('W/')
+    return any(
+        tag.strip().removeprefix('W/') == etag
+        for tag in if_none_match.split(','))
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    """Функция добавляет в ответ ETag. Ответ зависит от токена
+    (`liked_by_me`), поэтому добавляется и `Vary: Authorization`."""
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Authorization'
+    return response
+
+
+def not_modified(etag: str) -> Response:
+    """Функция возвращает ответ 304 без тела."""
+    return set_etag(
+        Response(status_code=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+async def get_posts_page(
+    session: db.AsyncSession,
+    user: schemas.User | None,
+    response: Response,
+    limit: int,
+    cursor: str | None,
+    if_none_match: str | None,
+    filters: dict[str, Any] | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> dict | Response:
+    """Функция получает страницу постов с поддержкой `If-None-Match`.
+    Если заголовок передан, сначала читаются только версии постов
+    страницы; если ETag совпал с присланным клиентом, возвращается 304
+    без чтения самих постов и без сериализации. Без заголовка ETag
+    считается по прочитанной странице, и запрос к БД один. Из БД
+    читаются только колонки схемы ответа, а при переданных `fields` -
+    только эти поля. При включенной настройке `FAST_JSON_LISTS`
+    или переданных `fields` строки сразу кодируются в JSON."""
+    serializer = get_post_serializer(fields)
+    if not wants_liked_by_me(fields):
+        user = None
+    after = decode_cursor(cursor)
+    filters_key = tuple(sorted((filters or {}).items()))
+
+    def get_page(columns):
+        # Одинаковые одновременные запросы страницы выполняются один раз.
+        return read_flight.do(
+            ('posts.page', limit, after, filters_key, columns),
+            lambda: post_crud.get_page(
+                session=session,
+                limit=limit,
+                after=after,
+                filters=filters,
+                columns=columns,))
+
+    version_ids = liked_ids = None
+    try:
+        if if_none_match:
+            versions, next_key = await get_page(POST_VERSION_FIELDS)
+            version_ids = [row.id for row in versions]
+            liked_ids = await get_liked_post_ids(user, version_ids, session)
+            etag = page_etag(
+                versions, next_key is not None, liked_ids, fields)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        posts, next_key = await get_page(
+            serializer.fields + POST_VERSION_FIELDS)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    if [post.id for post in posts] != version_ids:
+        liked_ids = await get_liked_post_ids(
+            user, [post.id for post in posts], session)
+    # Между запросами страница могла измениться: ETag считается
+    # по тем постам, которые попадут в ответ.
+    etag = page_etag(posts, next_key is not None, liked_ids, fields)
+    if settings.fast_json_lists or fields is not None:
+        return set_etag(
+            posts_response(
+                posts, serializer, liked_ids,
+                next_cursor=encode_cursor(next_key)),
+            etag)
+    set_etag(response, etag)
+    return {
+        'items': await mark_liked_by_me(posts, user, session, liked_ids),
+        'next_cursor': encode_cursor(next_key),
+    }
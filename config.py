@@ -11,9 +11,62 @@ class Settings(BaseSettings):
     database_url: str = os.getenv(
         'DATABASE_URL',
         'sqlite+aiosqlite:///network_db/network.db')
+    sqlite_pool_size: int = int(os.getenv('SQLITE_POOL_SIZE', 5))
+    sqlite_max_overflow: int = int(os.getenv('SQLITE_MAX_OVERFLOW', 10))
+    sqlite_read_pool_size: int = int(os.getenv('SQLITE_READ_POOL_SIZE', 10))
+    sqlite_read_max_overflow: int = int(
+        os.getenv('SQLITE_READ_MAX_OVERFLOW', 10))
+    sqlite_single_writer: bool = (
+        os.getenv('SQLITE_SINGLE_WRITER', 'false').lower() in ('1', 'true'))
+    sqlite_writer_max_batch: int = int(
+        os.getenv('SQLITE_WRITER_MAX_BATCH', 256))
+    sqlite_journal_mode: str = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    sqlite_synchronous: str = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    sqlite_mmap_size: int = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+    sqlite_cache_size: int = int(os.getenv('SQLITE_CACHE_SIZE', -65536))
+    sqlite_busy_timeout: int = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))
+    sqlite_temp_store: str = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
     jwt_secret: str = os.getenv('JWT_SECRET_KEY', 'some_key')
     jwt_algorithm: str = os.getenv('JWT_ALGORITHM', 'HS256')
     jwt_effect_seconds: int = int(os.getenv('JWT_EFFECT_SECONDS', 86400))
+    hash_workers: int = int(
+        os.getenv('HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    hash_queue_limit: int = int(os.getenv('HASH_QUEUE_LIMIT', 64))
+    auth_cache_size: int = int(os.getenv('AUTH_CACHE_SIZE', 10000))
+    auth_cache_ttl: float = float(os.getenv('AUTH_CACHE_TTL', 30))
+    token_cache_size: int = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+    token_cache_ttl: float = float(os.getenv('TOKEN_CACHE_TTL', 300))
+    post_cache_size: int = int(os.getenv('POST_CACHE_SIZE', 1000))
+    post_cache_ttl: float = float(os.getenv('POST_CACHE_TTL', 60))
+    cache_invalidation_bus: bool = (
+        os.getenv('CACHE_INVALIDATION_BUS', 'false').lower()
+        in ('1', 'true'))
+    cache_invalidation_poll_ms: int = int(
+        os.getenv('CACHE_INVALIDATION_POLL_MS', 100))
+    cache_invalidation_retention: float = float(
+        os.getenv('CACHE_INVALIDATION_RETENTION', 300))
+    like_write_behind: bool = (
+        os.getenv('LIKE_WRITE_BEHIND', 'false').lower() in ('1', 'true'))
+    like_flush_interval_ms: int = int(
+        os.getenv('LIKE_FLUSH_INTERVAL_MS', 200))
+    like_flush_max_events: int = int(
+        os.getenv('LIKE_FLUSH_MAX_EVENTS', 1000))
+    like_journal_path: str = os.getenv(
+        'LIKE_JOURNAL_PATH', 'network_db/likes.journal')
+    like_journal_fsync: bool = (
+        os.getenv('LIKE_JOURNAL_FSYNC', 'false').lower() in ('1', 'true'))
+    page_size: int = int(os.getenv('PAGE_SIZE', 20))
+    max_page_size: int = int(os.getenv('MAX_PAGE_SIZE', 100))
+    max_batch_ids: int = int(os.getenv('MAX_BATCH_IDS', 100))
+    trending_half_life: int = int(os.getenv('TRENDING_HALF_LIFE', 21600))
+    trending_window: int = int(os.getenv('TRENDING_WINDOW', 259200))
+    timeline_fanout_limit: int = int(
+        os.getenv('TIMELINE_FANOUT_LIMIT', 10000))
+    timeline_backfill: int = int(os.getenv('TIMELINE_BACKFILL', 100))
+    liker_index: bool = (
+        os.getenv('LIKER_INDEX', 'false').lower() in ('1', 'true'))
+    fast_json_lists: bool = (
+        os.getenv('FAST_JSON_LISTS', 'false').lower() in ('1', 'true'))
 
 
 settings = Settings()
@@ -1,23 +1,86 @@
-from typing import Any, Generic, Type, TypeVar
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Generic, Hashable, Iterable, Type, TypeVar
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import delete, func, select
+from sqlalchemy import (bindparam, delete, func, insert, literal, select,
+                        tuple_, union_all, update)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import Select
 
 from business_layer import schemas
+from business_layer.cache import TTLCache, auth_user_cache, post_cache
+from config import settings
 from db_layer import db_engine
-from db_layer.models import Like, Post, User
+from db_layer.fts import post_fts, post_fts_match, post_fts_rank
+from db_layer.invalidation import invalidation_bus
+from db_layer.models import (Follow, Like, Post, PostTrending, RevokedToken,
+                             Timeline, User)
+from db_layer.sql_functions import log2_sum
+from db_layer.writer import db_writer
 
 ModelType = TypeVar('ModelType', bound=db_engine.Base)
 CreateSchemaType = TypeVar('CreateSchemaType', bound=schemas.BaseModel)
 UpdateSchemaType = TypeVar('UpdateSchemaType', bound=schemas.BaseModel)
 
 
+async def keyset_paginate(
+    session: db_engine.AsyncSession,
+    query: Select,
+    keys: list,
+    limit: int,
+    after: tuple | None = None,
+    descending: bool = True,
+    scalars: bool = True,
+) -> tuple[list, tuple | None]:
+    """Функция выполняет запрос постранично по методу keyset: вместо
+    OFFSET в запрос добавляется условие `(keys) < after` (или `>` при
+    прямой сортировке), поэтому стоимость страницы не зависит от ее
+    номера. Возвращает объекты страницы и значения ключей последнего
+    объекта, если есть следующая страница, иначе None."""
+    if after is not None:
+        if len(after) != len(keys):
+            raise ValueError('Курсор не соответствует ключам сортировки.')
+        if len(keys) == 1:
+            left, right = keys[0], after[0]
+        else:
+            left, right = tuple_(*keys), tuple_(*after)
+        query = query.where(left < right if descending else left > right)
+    order = [key.desc() if descending else key.asc() for key in keys]
+    query = query.order_by(*order).limit(limit + 1)
+    if scalars:
+        result = await session.scalars(query)
+    else:
+        result = await session.execute(query)
+    items = result.all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    next_key = tuple(getattr(items[-1], key.key) for key in keys)
+    return items, next_key
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Базовый класс с операциями CRUD."""
 
     def __init__(self, model: Type[ModelType]) -> None:
         self.model = model
 
+    def _get_field(self, field_name: str):
+        """Метод возвращает колонку модели по названию поля."""
+        field = getattr(self.model, field_name, None)
+        if field is None:
+            raise AttributeError(
+                f'Поле {field_name} отсуствует в таблице'
+            )
+        return field
+
+    def _get_fields(self, field_names: tuple[str, ...]) -> list:
+        """Метод возвращает колонки модели по названиям полей без
+        повторов, сохраняя порядок."""
+        return [self._get_field(name) for name in dict.fromkeys(field_names)]
+
     async def get(
         self,
         obj_id: int,
@@ -26,14 +89,78 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Метод получает объект из БД по `id`."""
         return await session.get(self.model, obj_id)
 
+    async def get_many(
+        self,
+        obj_ids: list[int],
+        session: db_engine.AsyncSession,
+        columns: tuple[str, ...] | None = None,
+    ) -> list:
+        """Метод получает объекты по списку `id` одним запросом.
+        Объекты возвращаются в порядке `obj_ids`, отсутствующие в БД
+        пропускаются. Если указаны `columns`, вместо объектов
+        возвращаются строки только с этими полями и `id`."""
+        if not obj_ids:
+            return []
+        if columns is None:
+            query = select(self.model)
+        else:
+            query = select(*self._get_fields(columns + ('id',)))
+        result = await session.execute(
+            query.where(self.model.id.in_(obj_ids)))
+        objects = result.scalars() if columns is None else result
+        objects_by_id = {obj.id: obj for obj in objects}
+        return [
+            objects_by_id[obj_id] for obj_id in obj_ids
+            if obj_id in objects_by_id]
+
     async def get_all(
         self,
-        session: db_engine.AsyncSession
-    ) -> list[ModelType]:
-        """Метод получает все объекты из запрошенной таблицы."""
+        session: db_engine.AsyncSession,
+        columns: tuple[str, ...] | None = None,
+    ) -> list:
+        """Метод получает все объекты из запрошенной таблицы. Если
+        указаны `columns`, вместо объектов возвращаются строки только
+        с этими полями."""
+        if columns is not None:
+            result = await session.execute(
+                select(*self._get_fields(columns)))
+            return result.all()
         objects = await session.scalars(select(self.model))
         return objects.all()
 
+    async def get_page(
+        self,
+        session: db_engine.AsyncSession,
+        limit: int,
+        after: tuple | None = None,
+        order_by: tuple[str, ...] = ('create_timestamp', 'id'),
+        descending: bool = True,
+        filters: dict[str, Any] | None = None,
+        columns: tuple[str, ...] | None = None,
+    ) -> tuple[list, tuple | None]:
+        """Метод получает страницу объектов, отсортированных по полям
+        `order_by`. `after` - значения этих полей у последнего объекта
+        предыдущей страницы. Последнее поле в `order_by` должно быть
+        уникальным (обычно `id`), чтобы порядок был однозначным.
+        Если указаны `columns`, вместо объектов возвращаются строки
+        только с этими полями и полями `order_by`."""
+        keys = [self._get_field(name) for name in order_by]
+        if columns is None:
+            query = select(self.model)
+        else:
+            query = select(*self._get_fields(columns + order_by))
+        for field_name, value in (filters or {}).items():
+            query = query.where(self._get_field(field_name) == value)
+        return await keyset_paginate(
+            session=session,
+            query=query,
+            keys=keys,
+            limit=limit,
+            after=after,
+            descending=descending,
+            scalars=columns is None,
+        )
+
     async def get_by_field(
         self,
         required_field: str,
@@ -42,17 +169,67 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         one_obj: bool = True
     ) -> ModelType | list[ModelType]:
         """Метод находит объекты по значению указанного поля."""
-        field = getattr(self.model, required_field, None)
-        if field is None:
-            raise AttributeError(
-                f'Поле {required_field} отсуствует в таблице'
-            )
+        field = self._get_field(required_field)
         query = select(self.model).where(field == value)
         if one_obj:
             return await session.scalar(query.limit(1))
         some_objs = await session.scalars(query)
         return some_objs.all()
 
+    def _stale_cache_entries(
+        self,
+        obj_id: int,
+        removed: bool,
+    ) -> list[tuple[TTLCache, Hashable | None]]:
+        """Метод возвращает записи кэшей (кэш и ключ, None - весь кэш),
+        которые устаревают при изменении (`removed=False`) или удалении
+        объекта."""
+        return []
+
+    async def _after_create(
+        self,
+        obj: ModelType,
+        session: db_engine.AsyncSession,
+    ) -> None:
+        """Метод вызывается в транзакции создания объекта после его
+        записи в БД и может дополнить ее связанными изменениями."""
+
+    async def _write(
+        self,
+        operation,
+        session: db_engine.AsyncSession,
+        stale_entries: list[tuple[TTLCache, Hashable | None]] = (),
+    ):
+        """Метод выполняет операцию записи `operation(session)`. Если
+        запущен общий писатель, операция передается ему и фиксируется
+        вместе с другими. Если сессия - единица работы запроса, операция
+        только отправляет изменения в БД, а фиксирует их обработчик
+        запроса один раз перед ответом. Иначе операция сразу фиксируется
+        в переданной сессии. Инвалидации `stale_entries` публикуются
+        для других процессов в той же транзакции, а в кэшах своего
+        процесса сбрасываются после ее завершения."""
+
+        async def write(write_session):
+            result = await operation(write_session)
+            await invalidation_bus.publish(write_session, stale_entries)
+            return result
+
+        def invalidate():
+            invalidation_bus.invalidate(stale_entries)
+
+        if not db_writer.running and db_engine.in_unit_of_work(session):
+            result = await write(session)
+            db_engine.after_commit(session, invalidate)
+            return result
+        try:
+            if db_writer.running:
+                return await db_writer.submit(write)
+            result = await write(session)
+            await session.commit()
+            return result
+        finally:
+            invalidate()
+
     async def create(
         self,
         new_obj: CreateSchemaType,
@@ -61,9 +238,16 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Метод создаёт запись в БД."""
         new_obj = new_obj.dict()
         new_obj = self.model(**new_obj)
-        session.add(new_obj)
-        await session.commit()
-        await session.refresh(new_obj)
+
+        async def operation(write_session):
+            write_session.add(new_obj)
+            await write_session.flush()
+            await self._after_create(new_obj, write_session)
+            return new_obj
+
+        await self._write(operation, session)
+        if new_obj in session:
+            await session.refresh(new_obj)
         return new_obj
 
     async def update(
@@ -75,11 +259,25 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Метод обновляет запись указанного объекта в БД."""
         obj_data = jsonable_encoder(obj)
         update_data = update_data.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(obj, field, update_data[field])
-        await session.commit()
-        await session.refresh(obj)
+        changes = {
+            field: update_data[field]
+            for field in obj_data if field in update_data}
+        obj_id = obj.id
+
+        async def operation(write_session):
+            target = obj
+            if obj not in write_session:
+                target = await write_session.get(self.model, obj_id)
+            for field, value in changes.items():
+                setattr(target, field, value)
+            await write_session.flush()
+            return target
+
+        obj = await self._write(
+            operation, session,
+            self._stale_cache_entries(obj_id, removed=False))
+        if obj in session:
+            await session.refresh(obj)
         return obj
 
     async def remove(
@@ -89,22 +287,74 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> None:
         """Метод удаляет запись из БД."""
         stmt = delete(self.model).where(self.model.id == obj_id)
-        await session.execute(stmt)
-        await session.commit()
+
+        async def operation(write_session):
+            await write_session.execute(stmt)
+
+        await self._write(
+            operation, session,
+            self._stale_cache_entries(obj_id, removed=True))
 
 
 class CRUDUser(CRUDBase):
-    """Класс с запросами к таблице `user`."""
-    pass
+    """Класс с запросами к таблице `user`. При изменении и удалении
+    пользователя его запись удаляется из кэша аутентификации, а при
+    удалении очищается и кэш постов (посты удаляются каскадно)."""
+
+    def _stale_cache_entries(self, obj_id, removed):
+        entries = [(auth_user_cache, obj_id)]
+        if removed:
+            entries.append((post_cache, None))
+        return entries
 
 
 class CRUDPost(CRUDBase):
-    """Класс с запросами к таблице `salary`."""
-    pass
+    """Класс с запросами к таблице `post`. При изменении и удалении
+    поста его запись удаляется из кэша постов."""
+
+    def _stale_cache_entries(self, obj_id, removed):
+        return [(post_cache, obj_id)]
+
+    async def _after_create(self, obj, session):
+        await timeline_crud.fan_out(obj, session)
+
+    async def search_page(
+        self,
+        match: str,
+        session: db_engine.AsyncSession,
+        limit: int,
+        columns: tuple[str, ...],
+        after: tuple | None = None,
+    ) -> tuple[list, tuple | None]:
+        """Метод ищет посты по полнотекстовому индексу запросом FTS5
+        `match` и возвращает страницу строк с полями `columns`, `id`
+        и `score` - релевантностью bm25 (чем меньше, тем лучше).
+        Посты отсортированы по релевантности, `after` - значения
+        `score` и `id` последнего поста предыдущей страницы."""
+        matches = (
+            select(
+                post_fts.c.rowid.label('post_id'),
+                post_fts_rank.label('score'))
+            .where(post_fts_match(match))
+            .subquery())
+        query = (
+            select(*self._get_fields(columns + ('id',)), matches.c.score)
+            .select_from(self.model)
+            .join(matches, matches.c.post_id == self.model.id))
+        return await keyset_paginate(
+            session=session,
+            query=query,
+            keys=[matches.c.score, self.model.id],
+            limit=limit,
+            after=after,
+            descending=False,
+            scalars=False,
+        )
 
 
 class CRUDLike(CRUDBase):
-    """Класс с запросами к таблице `salary`."""
+    """Класс с запросами к таблице `like`. Лайк и его отмена меняют
+    счетчик поста, поэтому пост удаляется из кэша постов."""
 
     async def count_likes(self, post_id, session):
         """Метод для подсчета кол-ва лайков у поста."""
@@ -123,7 +373,438 @@ class CRUDLike(CRUDBase):
             .where(self.model.liker_id == liker_id))
         return await session.scalar(query.limit(1))
 
+    async def get_liked_post_ids(
+        self,
+        liker_id: int,
+        post_ids: list[int],
+        session: db_engine.AsyncSession,
+    ) -> set[int]:
+        """Метод возвращает id постов из `post_ids`, которые лайкнул
+        пользователь `liker_id`, одним запросом."""
+        if not post_ids:
+            return set()
+        query = (
+            select(self.model.post_id)
+            .where(self.model.liker_id == liker_id)
+            .where(self.model.post_id.in_(post_ids)))
+        result = await session.scalars(query)
+        return set(result.all())
+
+    async def get_likers_page(
+        self,
+        post_id: int,
+        session: db_engine.AsyncSession,
+        limit: int,
+        after: tuple | None = None,
+    ) -> tuple[list, tuple | None]:
+        """Метод получает страницу пользователей, лайкнувших пост,
+        от последних к первым. Возвращаются только `id`, `username`
+        и `name` пользователя, связь `Post.likers` не загружается."""
+        like_id = self.model.id.label('like_id')
+        query = (
+            select(User.id, User.username, User.name, like_id)
+            .join(User, User.id == self.model.liker_id)
+            .where(self.model.post_id == post_id))
+        return await keyset_paginate(
+            session=session,
+            query=query,
+            keys=[like_id],
+            limit=limit,
+            after=after,
+            scalars=False,
+        )
+
+    async def add_like(self, post_id, liker_id, session) -> bool:
+        """Метод ставит лайк и увеличивает счетчик лайков поста в одной
+        транзакции. Повторный лайк не вызывает ошибку уникальности:
+        вставка пропускается, и метод возвращает False."""
+        now = int(datetime.utcnow().timestamp())
+        stmt = (
+            sqlite_insert(self.model)
+            .values(post_id=post_id, liker_id=liker_id, create_timestamp=now)
+            .on_conflict_do_nothing(index_elements=['post_id', 'liker_id'])
+            .returning(self.model.id))
+
+        async def operation(write_session):
+            if await write_session.scalar(stmt) is None:
+                return False
+            await self._change_like_count(post_id, 1, write_session)
+            await trending_crud.apply(
+                write_session, added=[(post_id, now)])
+            return True
+
+        return await self._write(
+            operation, session, [(post_cache, post_id)])
+
+    async def remove_like(self, post_id, liker_id, session) -> bool:
+        """Метод удаляет лайк и уменьшает счетчик лайков поста в одной
+        транзакции. Возвращает False, если лайка не было."""
+        stmt = (
+            delete(self.model)
+            .where(self.model.post_id == post_id)
+            .where(self.model.liker_id == liker_id)
+            .returning(self.model.id, self.model.create_timestamp))
+
+        async def operation(write_session):
+            removed = (await write_session.execute(stmt)).first()
+            if removed is None:
+                return False
+            await self._change_like_count(post_id, -1, write_session)
+            await trending_crud.apply(
+                write_session,
+                removed=[(post_id, removed.create_timestamp)])
+            return True
+
+        return await self._write(
+            operation, session, [(post_cache, post_id)])
+
+    async def _change_like_count(self, post_id, delta, session) -> None:
+        stmt = (
+            update(Post)
+            .where(Post.id == post_id)
+            .values(like_count=Post.like_count + delta))
+        await session.execute(stmt)
+
+
+class CRUDTrending(CRUDBase):
+    """Класс с запросами к рейтингу популярных постов `post_trending`.
+
+    Вес лайка равен 2^(t / T), где t - время лайка, а T - период
+    полураспада `TRENDING_HALF_LIFE`: лайк, поставленный на T секунд
+    раньше, весит вдвое меньше. Рейтинг поста - сумма весов его лайков,
+    в таблице хранится ее log2. Т.к. со временем веса всех лайков
+    уменьшаются в одно и то же число раз, порядок постов от этого
+    не меняется, и рейтинг не нужно пересчитывать: он только
+    увеличивается на вес нового лайка и уменьшается на вес отмененного.
+    Посты без лайков за последние `TRENDING_WINDOW` секунд в выдачу
+    не попадают и периодически удаляются из таблицы."""
+
+    # Минимальный интервал между удалениями устаревших постов, секунд.
+    prune_interval = 60
+
+    def __init__(self, model: Type[ModelType]) -> None:
+        super().__init__(model)
+        self._last_prune = 0.0
+
+    @staticmethod
+    def like_weight(timestamp: int) -> float:
+        """Метод возвращает log2 веса лайка, поставленного
+        в `timestamp`."""
+        return timestamp / settings.trending_half_life
+
+    def _weights(
+        self,
+        likes: Iterable[tuple[int, int | None]],
+    ) -> dict[int, tuple[float, int]]:
+        """Метод группирует лайки (id поста, время лайка) по постам:
+        id поста -> (log2 суммы весов, время последнего лайка). Лайки
+        без времени (поставленные до появления рейтинга) пропускаются."""
+        timestamps = defaultdict(list)
+        for post_id, timestamp in likes:
+            if timestamp is not None:
+                timestamps[post_id].append(timestamp)
+        return {
+            post_id: (log2_sum(map(self.like_weight, values)), max(values))
+            for post_id, values in timestamps.items()}
+
+    async def apply(
+        self,
+        session: db_engine.AsyncSession,
+        added: Iterable[tuple[int, int | None]] = (),
+        removed: Iterable[tuple[int, int | None]] = (),
+    ) -> None:
+        """Метод обновляет рейтинг постов на поставленные (`added`)
+        и отмененные (`removed`) лайки - пары (id поста, время лайка).
+        Выполняется в транзакции, которая меняет сами лайки."""
+        table = self.model.__table__
+        added = self._weights(added)
+        if added:
+            stmt = sqlite_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_={
+                    'score': func.log2_add(table.c.score, stmt.excluded.score),
+                    'last_like_timestamp': func.max(
+                        table.c.last_like_timestamp,
+                        stmt.excluded.last_like_timestamp),
+                })
+            await session.execute(stmt, [
+                {'id': post_id, 'score': score, 'last_like_timestamp': last}
+                for post_id, (score, last) in added.items()])
+        removed = self._weights(removed)
+        if removed:
+            # Посты, у которых не осталось лайков, удаляются из рейтинга.
+            rest = func.log2_sub(table.c.score, bindparam('weight'))
+            rows = [
+                {'post_id': post_id, 'weight': weight}
+                for post_id, (weight, _) in removed.items()]
+            await session.execute(
+                delete(table)
+                .where(table.c.id == bindparam('post_id'))
+                .where(rest.is_(None)),
+                rows)
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam('post_id'))
+                .values(score=rest),
+                rows)
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            await self.prune(session)
+
+    async def prune(self, session: db_engine.AsyncSession) -> None:
+        """Метод удаляет посты без лайков за `TRENDING_WINDOW` секунд."""
+        border = int(datetime.utcnow().timestamp()) - settings.trending_window
+        await session.execute(
+            delete(self.model)
+            .where(self.model.last_like_timestamp < border))
+
+    async def get_top_page(
+        self,
+        session: db_engine.AsyncSession,
+        limit: int,
+        columns: tuple[str, ...],
+        after: tuple | None = None,
+    ) -> tuple[list, tuple | None]:
+        """Метод возвращает страницу самых популярных постов: строки
+        с полями поста `columns`, `id` и `score`. Запрос идет по индексу
+        (score, id), поэтому страница из K постов читает около K строк
+        рейтинга независимо от размера таблицы."""
+        border = int(datetime.utcnow().timestamp()) - settings.trending_window
+        # Поля поста выбираются в порядке `columns`, как их ожидает
+        # сериализатор, а `score` - последним.
+        query = (
+            select(
+                *post_crud._get_fields(columns + ('id',)),
+                self.model.score)
+            .select_from(self.model)
+            .join(Post, Post.id == self.model.id)
+            .where(self.model.last_like_timestamp >= border))
+        return await keyset_paginate(
+            session=session,
+            query=query,
+            keys=[self.model.score, self.model.id],
+            limit=limit,
+            after=after,
+            scalars=False,
+        )
+
+
+class CRUDFollow(CRUDBase):
+    """Класс с запросами к таблице `follow`. Подписка и отписка сразу
+    меняют материализованную ленту подписчика (см. `CRUDTimeline`)."""
+
+    async def follow(
+        self,
+        follower_id: int,
+        author_id: int,
+        session: db_engine.AsyncSession,
+    ) -> bool:
+        """Метод подписывает пользователя на автора. Возвращает False,
+        если подписка уже есть."""
+        stmt = (
+            sqlite_insert(self.model)
+            .values(follower_id=follower_id, author_id=author_id)
+            .on_conflict_do_nothing(
+                index_elements=['follower_id', 'author_id'])
+            .returning(self.model.id))
+
+        async def operation(write_session):
+            if await write_session.scalar(stmt) is None:
+                return False
+            await timeline_crud.on_follow(
+                follower_id, author_id, write_session)
+            return True
+
+        return await self._write(operation, session)
+
+    async def unfollow(
+        self,
+        follower_id: int,
+        author_id: int,
+        session: db_engine.AsyncSession,
+    ) -> bool:
+        """Метод отписывает пользователя от автора и убирает посты
+        автора из его ленты. Возвращает False, если подписки не было."""
+        stmt = (
+            delete(self.model)
+            .where(self.model.follower_id == follower_id)
+            .where(self.model.author_id == author_id)
+            .returning(self.model.id))
+
+        async def operation(write_session):
+            if await write_session.scalar(stmt) is None:
+                return False
+            await write_session.execute(
+                delete(Timeline)
+                .where(Timeline.owner_id == follower_id)
+                .where(Timeline.author_id == author_id))
+            return True
+
+        return await self._write(operation, session)
+
+
+class CRUDTimeline(CRUDBase):
+    """Класс с запросами к материализованным лентам `timeline`.
+
+    Лента строится гибридно. Новый пост обычного автора сразу
+    записывается в ленты всех его подписчиков (fan-out on write), и
+    чтение ленты - это один запрос по индексу. У автора с числом
+    подписчиков больше `TIMELINE_FANOUT_LIMIT` такая рассылка стоила бы
+    слишком дорого, поэтому у него включается `fanout_on_read`: его
+    посты в ленты не пишутся, а при чтении берутся из `post` по индексу
+    (author_id, create_timestamp, id) и сливаются с материализованной
+    частью. Режим не выключается при отписках, поэтому посты не теряются
+    при колебаниях числа подписчиков около порога."""
+
+    # Ограничение SQLite на кол-во SELECT в одном UNION ALL.
+    max_union = 500
+
+    async def fan_out(
+        self,
+        post: Post,
+        session: db_engine.AsyncSession,
+    ) -> None:
+        """Метод записывает новый пост в ленты подписчиков автора,
+        если у автора не включен `fanout_on_read`."""
+        fanout_on_read = await session.scalar(
+            select(User.fanout_on_read).where(User.id == post.author_id))
+        if fanout_on_read:
+            return
+        await session.execute(
+            insert(self.model).from_select(
+                ['owner_id', 'post_id', 'author_id', 'create_timestamp'],
+                select(
+                    Follow.follower_id,
+                    literal(post.id),
+                    literal(post.author_id),
+                    literal(post.create_timestamp))
+                .where(Follow.author_id == post.author_id)))
+
+    async def on_follow(
+        self,
+        follower_id: int,
+        author_id: int,
+        session: db_engine.AsyncSession,
+    ) -> None:
+        """Метод обновляет ленты после новой подписки. Если у автора
+        стало больше `TIMELINE_FANOUT_LIMIT` подписчиков, включается
+        `fanout_on_read`. Иначе в ленту подписчика добавляются
+        последние `TIMELINE_BACKFILL` постов автора."""
+        fanout_on_read = await session.scalar(
+            select(User.fanout_on_read).where(User.id == author_id))
+        if fanout_on_read:
+            return
+        # Подписчик с номером `TIMELINE_FANOUT_LIMIT` + 1 ищется по индексу
+        # без подсчета всех подписчиков.
+        extra_follower = await session.scalar(
+            select(Follow.follower_id)
+            .where(Follow.author_id == author_id)
+            .limit(1)
+            .offset(settings.timeline_fanout_limit))
+        if extra_follower is not None:
+            await session.execute(
+                update(User)
+                .where(User.id == author_id)
+                .values(fanout_on_read=True))
+            return
+        recent_posts = (
+            select(
+                literal(follower_id), Post.id, Post.author_id,
+                Post.create_timestamp)
+            .where(Post.author_id == author_id)
+            .order_by(Post.create_timestamp.desc(), Post.id.desc())
+            .limit(settings.timeline_backfill))
+        await session.execute(
+            sqlite_insert(self.model)
+            .from_select(
+                ['owner_id', 'post_id', 'author_id', 'create_timestamp'],
+                recent_posts)
+            .on_conflict_do_nothing())
+
+    async def get_feed_page(
+        self,
+        owner_id: int,
+        session: db_engine.AsyncSession,
+        limit: int,
+        after: tuple | None = None,
+    ) -> tuple[list[int], tuple | None]:
+        """Метод возвращает id постов страницы ленты пользователя
+        от новых к старым и ключ (create_timestamp, id) последнего
+        поста, если есть следующая страница. Материализованная часть
+        ленты и посты авторов с `fanout_on_read` читаются отдельными
+        запросами по индексам и сливаются. Посты авторов
+        с `fanout_on_read` читаются одним запросом из подзапросов
+        по каждому автору, не больше `limit` + 1 постов из каждого."""
+        entries, next_key = await self.get_page(
+            session=session,
+            limit=limit,
+            after=after,
+            order_by=('create_timestamp', 'post_id'),
+            filters={'owner_id': owner_id},
+            columns=(),)
+        candidates = {
+            entry.post_id: (entry.create_timestamp, entry.post_id)
+            for entry in entries}
+        has_next = next_key is not None
+        pull_authors = await session.scalars(
+            select(Follow.author_id)
+            .join(User, User.id == Follow.author_id)
+            .where(Follow.follower_id == owner_id)
+            .where(User.fanout_on_read.is_(True)))
+        author_pages = []
+        for author_id in pull_authors.all():
+            query = (
+                select(Post.id, Post.create_timestamp)
+                .where(Post.author_id == author_id))
+            if after is not None:
+                query = query.where(
+                    tuple_(Post.create_timestamp, Post.id) < tuple_(*after))
+            author_pages.append(select(
+                query
+                .order_by(Post.create_timestamp.desc(), Post.id.desc())
+                .limit(limit + 1)
+                .subquery()))
+        for start in range(0, len(author_pages), self.max_union):
+            posts = await session.execute(union_all(
+                *author_pages[start:start + self.max_union]))
+            candidates.update(
+                (post.id, (post.create_timestamp, post.id))
+                for post in posts)
+        keys = sorted(candidates.values(), reverse=True)
+        if len(keys) > limit:
+            keys, has_next = keys[:limit], True
+        next_key = keys[-1] if has_next and keys else None
+        return [post_id for _, post_id in keys], next_key
+
+
+class CRUDRevokedToken(CRUDBase):
+    """Класс с запросами к таблице `revoked_token`. Отзыв сохраняется
+    в транзакции запроса, а другие процессы получают его через шину
+    инвалидации (`db_layer.invalidation`)."""
+
+    async def revoke(
+        self,
+        digest: bytes,
+        expires: float,
+        session: db_engine.AsyncSession,
+    ) -> None:
+        """Метод сохраняет отзыв токена с хэшем `digest`."""
+        stmt = (
+            sqlite_insert(self.model)
+            .values(digest=digest, expires=expires)
+            .on_conflict_do_nothing(index_elements=['digest']))
+
+        async def operation(write_session):
+            await write_session.execute(stmt)
+
+        await self._write(operation, session)
+
 
 user_crud = CRUDUser(User)
 post_crud = CRUDPost(Post)
 like_crud = CRUDLike(Like)
+trending_crud = CRUDTrending(PostTrending)
+follow_crud = CRUDFollow(Follow)
+timeline_crud = CRUDTimeline(Timeline)
+revoked_token_crud = CRUDRevokedToken(RevokedToken)
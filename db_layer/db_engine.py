@@ -1,10 +1,16 @@
-from sqlalchemy import Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from typing import Callable
+
+from fastapi import Request
+from sqlalchemy import Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
 from sqlalchemy.orm import (declarative_base, declared_attr, mapped_column,
                             sessionmaker)
-from sqlalchemy.sql import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import settings
+from db_layer.sql_functions import SQL_FUNCTIONS
 
 
 class PreBase:
@@ -16,13 +22,145 @@ class PreBase:
     id = mapped_column(Integer, primary_key=True)
 
 
+def get_sqlite_pragmas() -> dict[str, str | int]:
+    """Функция возвращает настройки соединения SQLite из конфигурации."""
+    return {
+        'foreign_keys': 'ON',
+        'journal_mode': settings.sqlite_journal_mode,
+        'synchronous': settings.sqlite_synchronous,
+        'mmap_size': settings.sqlite_mmap_size,
+        'cache_size': settings.sqlite_cache_size,
+        'busy_timeout': settings.sqlite_busy_timeout,
+        'temp_store': settings.sqlite_temp_store,
+    }
+
+
+def get_read_pragmas() -> dict[str, str | int]:
+    """Функция возвращает настройки соединения SQLite для чтения: режим
+    журнала задается пишущим соединением, а запись запрещена."""
+    pragmas = get_sqlite_pragmas()
+    del pragmas['journal_mode'], pragmas['synchronous']
+    pragmas['query_only'] = 'ON'
+    return pragmas
+
+
+def get_read_only_url(database_url: str) -> str:
+    """Функция преобразует адрес БД в адрес для открытия файла SQLite
+    только на чтение (`mode=ro`)."""
+    url = make_url(database_url)
+    return url.set(
+        database=f'file:{url.database}',
+        query={**url.query, 'mode': 'ro', 'uri': 'true'},
+    ).render_as_string(hide_password=False)
+
+
+def configure_sqlite_engine(
+    engine: AsyncEngine,
+    pragmas: dict[str, str | int] | None = None,
+    begin: str | None = None,
+) -> AsyncEngine:
+    """Функция подключает к движку обработчик, который выполняет PRAGMA
+    один раз при открытии соединения, а не в начале каждой сессии.
+    Чтобы это давало эффект, соединения должны переиспользоваться через
+    пул: с NullPool соединение открывается заново для каждой сессии.
+
+    Если задан `begin` (например, 'IMMEDIATE'), драйвер перестает сам
+    управлять транзакциями и каждая транзакция начинается явным
+    `BEGIN <begin>`. Это нужно для корректной работы SAVEPOINT.
+
+    В соединении также регистрируются функции SQL из `SQL_FUNCTIONS`."""
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if begin is not None:
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+        for name, (args_num, function) in SQL_FUNCTIONS.items():
+            dbapi_connection.create_function(
+                name, args_num, function, deterministic=True)
+
+    if begin is not None:
+        @event.listens_for(engine.sync_engine, 'begin')
+        def begin_transaction(connection):
+            connection.exec_driver_sql(f'BEGIN {begin}')
+
+    return engine
+
+
 Base = declarative_base(cls=PreBase)
-engine = create_async_engine(settings.database_url)
+engine = configure_sqlite_engine(create_async_engine(
+    settings.database_url,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.sqlite_pool_size,
+    max_overflow=settings.sqlite_max_overflow,
+))
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+read_engine = configure_sqlite_engine(
+    create_async_engine(
+        get_read_only_url(settings.database_url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.sqlite_read_pool_size,
+        max_overflow=settings.sqlite_read_max_overflow,
+    ),
+    pragmas=get_read_pragmas(),
+)
+ReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession)
 
 
-async def get_async_session():
-    """Функция для генерации сессий к БД."""
+UNIT_OF_WORK = 'unit_of_work'
+
+
+def start_unit_of_work(session: AsyncSession, request: Request) -> None:
+    """Функция делает сессию единицей работы запроса: CRUD только
+    отправляет изменения в БД (flush), а вся транзакция фиксируется
+    одним COMMIT перед отправкой ответа (`UnitOfWorkRoute`)."""
+    session.info[UNIT_OF_WORK] = []
+    request.state.write_session = session
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    return UNIT_OF_WORK in session.info
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Функция откладывает `callback` до фиксации единицы работы
+    `session`. Вне единицы работы изменения уже зафиксированы,
+    и `callback` вызывается сразу."""
+    if in_unit_of_work(session):
+        session.info[UNIT_OF_WORK].append(callback)
+    else:
+        callback()
+
+
+async def commit_unit_of_work(session: AsyncSession) -> None:
+    """Функция фиксирует транзакцию единицы работы и вызывает отложенные
+    до фиксации действия (сброс кэшей и т.п.). Если фиксация не удалась,
+    транзакция откатывается при закрытии сессии, и действия
+    не выполняются."""
+    callbacks = session.info[UNIT_OF_WORK]
+    session.info[UNIT_OF_WORK] = []
+    if session.in_transaction():
+        await session.commit()
+    for callback in callbacks:
+        callback()
+
+
+async def get_write_session(request: Request):
+    """Функция для генерации сессий к БД для запросов, изменяющих
+    данные. Все изменения запроса выполняются в одной транзакции,
+    которая фиксируется перед отправкой ответа."""
     async with AsyncSessionLocal() as async_session:
-        await async_session.execute(text('PRAGMA foreign_keys = ON'))
+        start_unit_of_work(async_session, request)
+        yield async_session
+
+
+async def get_read_session():
+    """Функция для генерации сессий к БД только для чтения. Сессии
+    используют отдельный пул соединений, открытых в режиме `mode=ro`,
+    и в режиме WAL не ждут пишущие транзакции."""
+    async with ReadSessionLocal() as async_session:
         yield async_session
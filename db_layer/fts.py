@@ -0,0 +1,67 @@
+"""Полнотекстовый индекс постов на SQLite FTS5.
+
+Индекс `post_fts` хранит только словарь (external content): тексты
+берутся из таблицы `post` по `rowid = post.id`. Триггеры на `post`
+поддерживают индекс в актуальном состоянии в той же транзакции, что
+и изменение поста; изменения, не затрагивающие текст (например,
+счетчика лайков), индекс не трогают. Токенизатор `unicode61` приводит
+к нижнему регистру и кириллицу, а префиксные индексы на 2 и 3 символа
+ускоряют префиксные запросы (`прив*`).
+
+Пересборка индекса по уже существующим постам (например, после
+загрузки данных в обход триггеров):
+
+    python -m db_layer.fts
+"""
+import asyncio
+
+from sqlalchemy import Integer, column, literal_column, table
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import text
+
+POST_FTS_TABLE = 'post_fts'
+
+CREATE_POST_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "text, content='post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_insert AFTER INSERT ON post "
+    "BEGIN INSERT INTO post_fts (rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_delete AFTER DELETE ON post "
+    "BEGIN INSERT INTO post_fts (post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_update AFTER UPDATE OF text "
+    "ON post BEGIN INSERT INTO post_fts (post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO post_fts (rowid, text) VALUES (new.id, new.text); END",
+)
+DROP_POST_FTS = (
+    'DROP TRIGGER IF EXISTS post_fts_update',
+    'DROP TRIGGER IF EXISTS post_fts_delete',
+    'DROP TRIGGER IF EXISTS post_fts_insert',
+    'DROP TABLE IF EXISTS post_fts',
+)
+REBUILD_POST_FTS = text("INSERT INTO post_fts (post_fts) VALUES ('rebuild')")
+
+# Таблица для построения запросов; в метаданных моделей ее нет,
+# создается она `CREATE_POST_FTS`.
+post_fts = table(POST_FTS_TABLE, column('rowid', Integer))
+post_fts_match = literal_column(POST_FTS_TABLE).op('MATCH')
+post_fts_rank = literal_column(f'bm25({POST_FTS_TABLE})')
+
+
+async def rebuild_post_index(engine: AsyncEngine) -> None:
+    """Функция пересобирает индекс по всем постам в таблице `post`."""
+    async with engine.begin() as conn:
+        await conn.execute(REBUILD_POST_FTS)
+
+
+if __name__ == '__main__':
+    from db_layer.db_engine import engine
+
+    async def main():
+        await rebuild_post_index(engine)
+        await engine.dispose()
+
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+"""Шина инвалидации кэшей между процессами (воркерами uvicorn).
+
+Каждый воркер держит свои кэши в памяти (`business_layer.cache`). Чтобы
+запись, выполненная одним воркером, сбрасывала устаревшие записи кэшей
+в остальных, CRUD в той же транзакции, что и изменение данных, добавляет
+строки в таблицу `cache_invalidation`. Номер строки (AUTOINCREMENT)
+служит версией: воркер помнит последний примененный номер и раз
+в `CACHE_INVALIDATION_POLL_MS` миллисекунд читает строки с большими
+номерами, поэтому задержка инвалидации ограничена интервалом опроса.
+Перед чтением проверяется `PRAGMA data_version`: оно меняется, только
+если другое соединение зафиксировало изменения, так что опрос без
+записей в БД ничего не читает.
+
+Строки старше `CACHE_INVALIDATION_RETENTION` секунд удаляются. Если
+воркер отстал и нужные ему строки уже удалены (разрыв в номерах),
+он полностью очищает свои кэши.
+
+Так же распространяются отзывы токенов: при запуске воркер загружает
+из таблицы `revoked_token` действующие отзывы, а при опросе - новые,
+и больше не принимает эти токены. Истекшие отзывы удаляются вместе
+со старыми инвалидациями.
+"""
+import asyncio
+import logging
+import time
+from typing import Hashable, Iterable
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql import text
+
+from business_layer.auth.jwt_handler import add_revoked_tokens
+from business_layer.cache import TTLCache, caches, read_flight
+from config import settings
+from db_layer import db_engine as db
+from db_layer.models import CacheInvalidation, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+CacheEntries = Iterable[tuple[TTLCache, Hashable | None]]
+
+LAST_SEQUENCE = text(
+    "SELECT seq FROM sqlite_sequence WHERE name = 'cache_invalidation'")
+
+
+class InvalidationBus:
+    """Публикация инвалидаций кэшей через БД и их применение."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        poll_interval: float | None = None,
+        retention: float | None = None,
+    ) -> None:
+        self.engine = engine
+        self.poll_interval = (
+            settings.cache_invalidation_poll_ms / 1000
+            if poll_interval is None else poll_interval)
+        self.retention = retention or settings.cache_invalidation_retention
+        self.last_id = 0
+        self.last_revoked_id = 0
+        self._conn: AsyncConnection | None = None
+        self._data_version = None
+        self._last_prune = 0.0
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """Метод запоминает текущую версию, загружает действующие отзывы
+        токенов и запускает опрос таблицы."""
+        self._conn = await self.engine.connect()
+        self.last_id = await self._conn.scalar(LAST_SEQUENCE) or 0
+        self.last_revoked_id = 0
+        await self._apply_revocations()
+        self._data_version = await self._conn.scalar(
+            text('PRAGMA data_version'))
+        await self._conn.commit()
+        self._last_prune = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Метод останавливает опрос и закрывает соединение."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await self._conn.close()
+        self._conn = None
+
+    async def publish(
+        self,
+        session: db.AsyncSession,
+        entries: CacheEntries,
+    ) -> None:
+        """Метод добавляет инвалидации `entries` (кэш и ключ, None -
+        весь кэш) в текущую транзакцию `session`: другие воркеры увидят
+        их только после ее фиксации. Если шина не запущена, ничего
+        не делает."""
+        rows = [
+            {'cache_name': cache.name, 'cache_key': key}
+            for cache, key in entries]
+        if not self.running or not rows:
+            return
+        await session.execute(insert(CacheInvalidation), rows)
+
+    @staticmethod
+    def invalidate(entries: CacheEntries) -> None:
+        """Метод сбрасывает записи `entries` в кэшах своего процесса.
+        Кроме того, отвязываются все идущие объединенные чтения: запрос,
+        пришедший после записи, не должен получить результат чтения,
+        начатого до нее."""
+        read_flight.forget_all()
+        for cache, key in entries:
+            if key is None:
+                cache.invalidate_all()
+            else:
+                cache.invalidate(key)
+
+    async def poll(self) -> int:
+        """Метод применяет инвалидации и отзывы токенов, зафиксированные
+        после последнего опроса. Возвращает кол-во примененных
+        инвалидаций и отзывов."""
+        data_version = await self._conn.scalar(text('PRAGMA data_version'))
+        if data_version == self._data_version:
+            await self._conn.commit()
+            return 0
+        self._data_version = data_version
+        revoked = await self._apply_revocations()
+        result = await self._conn.execute(
+            select(
+                CacheInvalidation.id,
+                CacheInvalidation.cache_name,
+                CacheInvalidation.cache_key)
+            .where(CacheInvalidation.id > self.last_id)
+            .order_by(CacheInvalidation.id))
+        rows = result.all()
+        await self._conn.commit()
+        if not rows:
+            return revoked
+        if rows[0].id != self.last_id + 1:
+            logger.warning(
+                'Пропущены инвалидации %s-%s, кэши очищены полностью.',
+                self.last_id + 1, rows[0].id - 1)
+            self.invalidate((cache, None) for cache in caches.values())
+        else:
+            self.invalidate(
+                (caches[row.cache_name], row.cache_key) for row in rows
+                if row.cache_name in caches)
+        self.last_id = rows[-1].id
+        return revoked + len(rows)
+
+    async def _apply_revocations(self) -> int:
+        """Метод применяет в своем процессе действующие отзывы токенов,
+        сохраненные после последнего опроса. Возвращает их кол-во."""
+        result = await self._conn.execute(
+            select(RevokedToken.id, RevokedToken.digest, RevokedToken.expires)
+            .where(RevokedToken.id > self.last_revoked_id)
+            .where(RevokedToken.expires > time.time())
+            .order_by(RevokedToken.id))
+        rows = result.all()
+        await self._conn.commit()
+        if not rows:
+            return 0
+        add_revoked_tokens((row.digest, row.expires) for row in rows)
+        self.last_revoked_id = rows[-1].id
+        return len(rows)
+
+    async def prune(self) -> None:
+        """Метод удаляет инвалидации старше `retention` секунд
+        и истекшие отзывы токенов."""
+        border = int(time.time() - self.retention)
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                delete(CacheInvalidation)
+                .where(CacheInvalidation.create_timestamp < border))
+            await conn.execute(
+                delete(RevokedToken)
+                .where(RevokedToken.expires <= time.time()))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                if time.monotonic() - self._last_prune >= self.retention:
+                    self._last_prune = time.monotonic()
+                    await self.prune()
+            except Exception:
+                logger.exception('Не удалось применить инвалидации кэшей.')
+
+
+invalidation_bus = InvalidationBus(engine=db.engine)
@@ -1,9 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import (DDL, Boolean, Float, ForeignKey, Index, Integer,
+                        LargeBinary, String, UniqueConstraint, event,
+                        literal_column)
 from sqlalchemy.orm import mapped_column, relationship
 
 from .db_engine import Base
+from .fts import CREATE_POST_FTS, DROP_POST_FTS
 
 
 class User(Base):
@@ -15,6 +18,10 @@ class User(Base):
     email = mapped_column(String, nullable=False)
     is_active = mapped_column(Boolean, default=True)
     is_superuser = mapped_column(Boolean, default=False)
+    # Посты автора не рассылаются по лентам подписчиков, а добавляются
+    # в ленту при чтении. Включается навсегда, когда у автора становится
+    # больше `TIMELINE_FANOUT_LIMIT` подписчиков.
+    fanout_on_read = mapped_column(Boolean, default=False)
     posts = relationship(
         'Post',
         back_populates='author',
@@ -46,6 +53,27 @@ class Post(Base):
         passive_deletes=True
     )
     like_count = mapped_column(Integer, default=0)
+    # Версия поста: увеличивается при каждом UPDATE через SQLAlchemy.
+    # В отличие от `update_timestamp` (с точностью до секунды) различает
+    # изменения, сделанные в одну секунду, поэтому по ней строится ETag.
+    version = mapped_column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default='1',
+        onupdate=literal_column('version') + 1)
+    __table_args__ = (
+        Index('ix_post_create_timestamp_id', 'create_timestamp', 'id'),
+        Index(
+            'ix_post_author_id_create_timestamp_id',
+            'author_id', 'create_timestamp', 'id'),
+    )
+
+
+for statement in CREATE_POST_FTS:
+    event.listen(Post.__table__, 'after_create', DDL(statement))
+for statement in DROP_POST_FTS:
+    event.listen(Post.__table__, 'before_drop', DDL(statement))
 
 
 class Like(Base):
@@ -59,10 +87,106 @@ class Like(Base):
         Integer,
         ForeignKey('user.id', ondelete='CASCADE'),
         nullable=False,)
+    create_timestamp = mapped_column(
+        Integer,
+        default=lambda: int(datetime.utcnow().timestamp()))
     liker = relationship(
         'User',
         back_populates='liked_posts')
     post = relationship(
         'Post',
         back_populates='likers')
-    __table_args__ = (UniqueConstraint('post_id', 'liker_id'), )
+    __table_args__ = (
+        UniqueConstraint('post_id', 'liker_id'),
+        Index('ix_like_liker_id_post_id', 'liker_id', 'post_id'),
+        Index('ix_like_post_id_id', 'post_id', 'id'),
+    )
+
+
+class Follow(Base):
+    """Модель Алхимии к таблице follow в БД: подписка пользователя
+    `follower_id` на автора `author_id`."""
+
+    follower_id = mapped_column(
+        Integer,
+        ForeignKey('user.id', ondelete='CASCADE'),
+        nullable=False,)
+    author_id = mapped_column(
+        Integer,
+        ForeignKey('user.id', ondelete='CASCADE'),
+        nullable=False,)
+    create_timestamp = mapped_column(
+        Integer,
+        default=lambda: int(datetime.utcnow().timestamp()))
+    __table_args__ = (
+        UniqueConstraint('follower_id', 'author_id'),
+        Index('ix_follow_author_id_follower_id', 'author_id', 'follower_id'),
+    )
+
+
+class Timeline(Base):
+    """Модель Алхимии к таблице timeline в БД: материализованная лента
+    пользователя `owner_id` - посты авторов, на которых он подписан.
+    `create_timestamp` и `author_id` скопированы из поста."""
+
+    owner_id = mapped_column(
+        Integer,
+        ForeignKey('user.id', ondelete='CASCADE'),
+        nullable=False,)
+    post_id = mapped_column(
+        Integer,
+        ForeignKey('post.id', ondelete='CASCADE'),
+        nullable=False,)
+    author_id = mapped_column(Integer, nullable=False)
+    create_timestamp = mapped_column(Integer, nullable=False)
+    __table_args__ = (
+        Index(
+            'ix_timeline_owner_id_create_timestamp_post_id',
+            'owner_id', 'create_timestamp', 'post_id', unique=True),
+        Index('ix_timeline_owner_id_author_id', 'owner_id', 'author_id'),
+        Index('ix_timeline_post_id', 'post_id'),
+    )
+
+
+class PostTrending(Base):
+    """Модель Алхимии к таблице post_trending в БД. Рейтинг популярных
+    постов: `id` - id поста, `score` - log2 суммы весов его лайков
+    (вес лайка растет вдвое за каждый период полураспада),
+    `last_like_timestamp` - время последнего лайка."""
+
+    __tablename__ = 'post_trending'
+    id = mapped_column(
+        Integer,
+        ForeignKey('post.id', ondelete='CASCADE'),
+        primary_key=True)
+    score = mapped_column(Float, nullable=False)
+    last_like_timestamp = mapped_column(Integer, nullable=False)
+    __table_args__ = (
+        Index('ix_post_trending_score_id', 'score', 'id'),
+        Index('ix_post_trending_last_like_timestamp', 'last_like_timestamp'),
+    )
+
+
+class CacheInvalidation(Base):
+    """Модель Алхимии к таблице cache_invalidation в БД. Журнал
+    инвалидаций кэшей для других процессов: `cache_key` - ключ записи
+    кэша `cache_name`, None - весь кэш."""
+
+    __tablename__ = 'cache_invalidation'
+    cache_name = mapped_column(String, nullable=False)
+    cache_key = mapped_column(Integer, nullable=True)
+    create_timestamp = mapped_column(
+        Integer,
+        default=lambda: int(datetime.utcnow().timestamp()))
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+class RevokedToken(Base):
+    """Модель Алхимии к таблице revoked_token в БД. Отозванные токены,
+    общие для всех процессов: `digest` - хэш токена, `expires` - время
+    окончания срока его действия, после которого запись удаляется."""
+
+    __tablename__ = 'revoked_token'
+    digest = mapped_column(LargeBinary, nullable=False, unique=True)
+    expires = mapped_column(Float, nullable=False)
+    __table_args__ = {'sqlite_autoincrement': True}
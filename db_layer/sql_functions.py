@@ -0,0 +1,53 @@
+"""Функции SQL, которые регистрируются в каждом соединении SQLite.
+
+Рейтинг популярных постов хранит сумму весов лайков в логарифмической
+шкале (log2): веса растут экспоненциально со временем лайка, и в обычной
+шкале быстро переполнили бы float. Функции ниже складывают и вычитают
+такие суммы без перехода к обычной шкале.
+"""
+import math
+
+# Относительная точность, ниже которой разность считается нулевой.
+EPSILON = 1e-9
+
+
+def log2_add(log_a: float | None, log_b: float | None) -> float | None:
+    """Функция возвращает log2(2^a + 2^b). None считается нулем
+    в обычной шкале."""
+    if log_a is None:
+        return log_b
+    if log_b is None:
+        return log_a
+    high, low = max(log_a, log_b), min(log_a, log_b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def log2_sub(log_a: float | None, log_b: float | None) -> float | None:
+    """Функция возвращает log2(2^a - 2^b) или None, если разность
+    не положительна (с точностью до `EPSILON`)."""
+    if log_a is None:
+        return None
+    if log_b is None:
+        return log_a
+    if log_b > log_a:
+        return None
+    rest = 1 - 2 ** (log_b - log_a)
+    if rest < EPSILON:
+        return None
+    return log_a + math.log2(rest)
+
+
+def log2_sum(values) -> float | None:
+    """Функция возвращает log2(sum(2^value)) для значений `values`."""
+    values = list(values)
+    if not values:
+        return None
+    high = max(values)
+    return high + math.log2(sum(2 ** (value - high) for value in values))
+
+
+# Название функции в SQL -> (кол-во аргументов, функция).
+SQL_FUNCTIONS = {
+    'log2_add': (2, log2_add),
+    'log2_sub': (2, log2_sub),
+}
@@ -0,0 +1,115 @@
+"""Единственный писатель SQLite с групповой фиксацией (group commit).
+
+SQLite допускает только одну пишущую транзакцию одновременно, поэтому
+конкурирующие транзакции запросов ждут друг друга в обработчике
+занятости или получают `database is locked`. При включенной настройке
+`SQLITE_SINGLE_WRITER` все записи CRUD передаются фоновой задаче,
+которая владеет единственным пишущим соединением. Накопившиеся
+в очереди операции она выполняет в одной транзакции, каждую внутри
+своего SAVEPOINT, и фиксирует их одним COMMIT. Результат или ошибка
+каждой операции возвращаются вызвавшему её обработчику.
+"""
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import settings
+from db_layer.db_engine import configure_sqlite_engine
+
+ResultType = TypeVar('ResultType')
+Operation = Callable[[AsyncSession], Awaitable[ResultType]]
+
+
+class DBWriter:
+    """Фоновая задача, выполняющая операции записи пачками."""
+
+    def __init__(self, session_factory, max_batch: int | None = None) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max_batch or settings.sqlite_writer_max_batch
+        self._queue: asyncio.Queue | None = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """Метод запускает фоновую задачу писателя."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Метод останавливает писателя, выполнив все операции,
+        поставленные в очередь до остановки."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        task, self._task = self._task, None
+        await task
+
+    async def submit(self, operation: Operation) -> ResultType:
+        """Метод ставит операцию в очередь и ждет её фиксации в БД.
+        Операция получает сессию писателя; фиксировать её не нужно."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: list) -> None:
+        outcomes = []
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    for operation, future in batch:
+                        if future.cancelled():
+                            continue
+                        try:
+                            async with session.begin_nested():
+                                result = await operation(session)
+                        except Exception as error:
+                            outcomes.append((future, error, False))
+                        else:
+                            outcomes.append((future, result, True))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, value, succeeded in outcomes:
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+writer_engine = configure_sqlite_engine(
+    create_async_engine(
+        settings.database_url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    ),
+    begin='IMMEDIATE',
+)
+WriterSessionLocal = sessionmaker(
+    writer_engine, class_=AsyncSession, expire_on_commit=False)
+db_writer = DBWriter(session_factory=WriterSessionLocal)
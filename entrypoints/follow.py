@@ -0,0 +1,64 @@
+"""Роутеры для едпойнтов подписок."""
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from business_layer import schemas
+from business_layer.auth.authenticate import authenticate
+from db_layer import db_engine as db
+from db_layer.crud import follow_crud, user_crud
+from entrypoints.routing import UnitOfWorkRoute
+
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.post(
+    path='/{user_id}',
+    summary='Подписаться на пользователя',
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        403: {'model': schemas.ForbiddenAction},
+        404: {'model': schemas.NotFound}},
+)
+async def follow_user(
+    user_id: int,
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
+    user: Annotated[schemas.User, Depends(authenticate)],
+) -> schemas.FollowBase:
+    """Последние посты автора сразу появляются в ленте подписчика."""
+    if user_id == user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='Подписка на самого себя не разрешена.')
+    if not await user_crud.get(obj_id=user_id, session=session):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Пользователь не найден.')
+    created = await follow_crud.follow(
+        follower_id=user.id,
+        author_id=user_id,
+        session=session,)
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='Повторная подписка не разрешена.')
+    return schemas.FollowBase(follower_id=user.id, author_id=user_id)
+
+
+@router.delete(
+    path='/{user_id}',
+    summary='Отписаться от пользователя',
+    status_code=status.HTTP_404_NOT_FOUND,
+)
+async def unfollow_user(
+    user_id: int,
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
+    user: Annotated[schemas.User, Depends(authenticate)],
+) -> schemas.NotFound:
+    """Посты автора убираются из ленты бывшего подписчика."""
+    await follow_crud.unfollow(
+        follower_id=user.id,
+        author_id=user_id,
+        session=session,)
+    return {}
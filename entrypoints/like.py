@@ -1,15 +1,34 @@
 """Роутеры для едпойнтов лайков."""
+from functools import partial
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.exc import IntegrityError
 
 from business_layer import schemas, utilities
 from business_layer.auth.authenticate import authenticate
+from business_layer.like_buffer import like_buffer
+from business_layer.liker_index import liker_index
+from config import settings
 from db_layer import db_engine as db
 from db_layer.crud import like_crud, post_crud
+from entrypoints.routing import UnitOfWorkRoute
 
-router = APIRouter()
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+def update_liker_index(change, post_id, liker_id, session) -> None:
+    """Функция применяет изменение к индексу лайков, если он загружен.
+    Лайк, записанный в БД, попадает в индекс после фиксации транзакции
+    запроса. Лайк, принятый буфером отложенной записи, - сразу: буфер
+    берет из индекса состояние ключей, которых в нем нет."""
+    if not liker_index.loaded:
+        return
+    if like_buffer.running:
+        change(post_id, liker_id)
+    else:
+        db.after_commit(session, partial(change, post_id, liker_id))
 
 
 @router.post(
@@ -22,7 +41,7 @@ router = APIRouter()
 )
 async def like_post(
     post_id: int,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
     user: Annotated[schemas.User, Depends(authenticate)],
 ) -> schemas.LikeBase:
     post = await post_crud.get(obj_id=post_id, session=session)
@@ -34,19 +53,29 @@ async def like_post(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail='Лайк самому себе не разрешен.')
-    like_schema = schemas.LikeBase(post_id=post_id, liker_id=user.id)
-    try:
-        obj = await like_crud.create(new_obj=like_schema, session=session)
-        like = schemas.LikeBase.model_validate(obj)
-        await utilities.change_like_in_post(post_id, session)
-        return like
-
-    except IntegrityError as e:
-        if 'UNIQUE constraint' in e.args[0]:
+    if liker_index.loaded and liker_index.has_liked(post_id, user.id):
+        created = False
+    elif like_buffer.running:
+        created = await like_buffer.like(
+            post_id=post_id,
+            liker_id=user.id,
+            session=session,)
+    else:
+        try:
+            created = await like_crud.add_like(
+                post_id=post_id,
+                liker_id=user.id,
+                session=session,)
+        except IntegrityError:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Повторный лайк не разрешен.')
-        raise
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Пост не найден.')
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='Повторный лайк не разрешен.')
+    update_liker_index(liker_index.add, post_id, user.id, session)
+    return schemas.LikeBase(post_id=post_id, liker_id=user.id)
 
 
 @router.delete(
@@ -56,16 +85,59 @@ async def like_post(
 )
 async def unlike_post(
     post_id: int,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
     user: Annotated[schemas.User, Depends(authenticate)],
 ) -> schemas.NotFound:
-    like_obj = await like_crud.get_like(
-        post_id=int(post_id),
-        liker_id=user.id,
-        session=session,)
-    if like_obj:
-        await like_crud.remove(
-            obj_id=like_obj.id,
+    if liker_index.loaded and not liker_index.has_liked(post_id, user.id):
+        return {}
+    if like_buffer.running:
+        await like_buffer.unlike(
+            post_id=post_id,
+            liker_id=user.id,
             session=session,)
-        await utilities.change_like_in_post(post_id, session)
+    else:
+        await like_crud.remove_like(
+            post_id=post_id,
+            liker_id=user.id,
+            session=session,)
+    update_liker_index(liker_index.remove, post_id, user.id, session)
     return {}
+
+
+@router.get(
+    path='/{post_id}/users',
+    summary='Показать пользователей, лайкнувших пост',
+    response_model=schemas.Page[schemas.UserShort],
+    responses={
+        400: {'model': schemas.NotFound},
+        404: {'model': schemas.NotFound}},
+)
+async def get_post_likers(
+    post_id: int,
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+) -> schemas.Page[schemas.UserShort]:
+    """Пользователи отдаются от последних лайкнувших к первым
+    страницами по `limit` штук. Для получения следующей страницы
+    передайте `next_cursor` из предыдущего ответа в параметре `cursor`."""
+    after = utilities.decode_cursor(cursor)
+    if not await post_crud.get(obj_id=post_id, session=session):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Пост не найден.')
+    try:
+        likers, next_key = await like_crud.get_likers_page(
+            post_id=post_id,
+            session=session,
+            limit=limit,
+            after=after,)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    return {
+        'items': likers,
+        'next_cursor': utilities.encode_cursor(next_key),
+    }
@@ -1,7 +1,7 @@
 """Подключение всех роутеров к главному роутеру."""
 from fastapi import APIRouter
 
-from . import like, posts, user
+from . import follow, like, metrics, posts, user
 
 main_router = APIRouter(prefix='/api/v1')
 
@@ -20,3 +20,13 @@ main_router.include_router(
     prefix='/like',
     tags=['Likes']
 )
+main_router.include_router(
+    router=follow.router,
+    prefix='/follow',
+    tags=['Follows']
+)
+main_router.include_router(
+    router=metrics.router,
+    prefix='/metrics',
+    tags=['Metrics']
+)
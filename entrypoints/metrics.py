@@ -0,0 +1,31 @@
+"""Роутеры для эндпойнтов метрик."""
+from fastapi import APIRouter
+
+from business_layer.cache import caches, flights
+from business_layer.liker_index import liker_index
+
+router = APIRouter()
+
+
+@router.get(
+    path='/caches',
+    summary='Статистика кэшей',
+)
+async def get_cache_stats() -> dict[str, dict]:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get(
+    path='/flights',
+    summary='Статистика объединения одновременных чтений',
+)
+async def get_flight_stats() -> dict[str, dict]:
+    return {name: flight.stats() for name, flight in flights.items()}
+
+
+@router.get(
+    path='/liker-index',
+    summary='Размер индекса лайков',
+)
+async def get_liker_index_stats() -> dict[str, bool | int]:
+    return {'loaded': liker_index.loaded, **liker_index.stats()}
@@ -1,25 +1,224 @@
 """Роутеры для едпойнтов поста."""
 from datetime import datetime
+from functools import partial
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query,
+                     Response, status)
 
-from business_layer import schemas
-from business_layer.auth.authenticate import authenticate
+from business_layer import schemas, utilities
+from business_layer.auth.authenticate import (authenticate,
+                                              authenticate_optional)
+from business_layer.cache import post_cache, read_flight
+from business_layer.liker_index import liker_index
 from db_layer import db_engine as db
-from db_layer.crud import post_crud
+from config import settings
+from db_layer.crud import post_crud, timeline_crud, trending_crud
+from entrypoints.routing import UnitOfWorkRoute
 
-router = APIRouter()
+
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.get(
     path='/',
     summary='Показать список постов',
-    response_model=list[schemas.Post],)
+    response_model=schemas.PostList,
+    response_model_exclude_unset=True,
+    responses={400: {'model': schemas.NotFound}, 304: {}},)
 async def get_all_posts(
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
-) -> list[schemas.Post]:
-    return await post_crud.get_all(session=session)
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User | None, Depends(authenticate_optional)],
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+    ids: Annotated[str | None, Query(pattern=r'^\d+(,\d+)*$')] = None,
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> schemas.PostList:
+    """Посты отдаются от новых к старым страницами по `limit` штук.
+    Для получения следующей страницы передайте `next_cursor`
+    из предыдущего ответа в параметре `cursor`. Авторизованному
+    пользователю у каждого поста возвращается `liked_by_me`.
+    Страница отдается со слабым ETag; если он совпадает с переданным
+    в `If-None-Match`, возвращается 304 без тела.
+
+    Если передан параметр `ids` (id через запятую, не больше
+    `MAX_BATCH_IDS`), возвращаются только эти посты в порядке запроса,
+    а ненайденные id перечисляются в `missing_ids`; `limit` и `cursor`
+    при этом не учитываются.
+
+    В параметре `fields` можно перечислить через запятую поля поста,
+    которые нужно вернуть: остальные поля не читаются из БД."""
+    selected_fields = utilities.parse_fields(fields, schemas.PostRead)
+    if ids is not None:
+        post_ids = list(dict.fromkeys(int(post_id)
+                                      for post_id in ids.split(',')))
+        if len(post_ids) > settings.max_batch_ids:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=('Можно запросить не больше '
+                        f'{settings.max_batch_ids} постов.'))
+        serializer = utilities.get_post_serializer(selected_fields)
+        posts = await read_flight.do(
+            ('posts.get_many', tuple(post_ids), serializer.fields),
+            lambda: post_crud.get_many(
+                obj_ids=post_ids,
+                session=session,
+                columns=serializer.fields,))
+        found_ids = {post.id for post in posts}
+        missing_ids = [
+            post_id for post_id in post_ids if post_id not in found_ids]
+        if settings.fast_json_lists or selected_fields is not None:
+            liked_ids = None
+            if utilities.wants_liked_by_me(selected_fields):
+                liked_ids = await utilities.get_liked_post_ids(
+                    user, list(found_ids), session)
+            return utilities.posts_response(
+                posts, serializer, liked_ids,
+                next_cursor=None,
+                missing_ids=missing_ids,)
+        return {
+            'items': await utilities.mark_liked_by_me(posts, user, session),
+            'next_cursor': None,
+            'missing_ids': missing_ids,
+        }
+    return await utilities.get_posts_page(
+        session=session,
+        user=user,
+        response=response,
+        limit=limit,
+        cursor=cursor,
+        if_none_match=if_none_match,
+        fields=selected_fields,)
+
+
+@router.get(
+    path='/search',
+    summary='Искать посты',
+    response_model=schemas.Page[schemas.PostRead],
+    response_model_exclude_unset=True,
+    responses={400: {'model': schemas.NotFound}},)
+async def search_posts(
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User | None, Depends(authenticate_optional)],
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
+) -> schemas.Page[schemas.PostRead]:
+    """Полнотекстовый поиск по тексту постов. Посты должны содержать
+    все слова запроса `q`; слово со `*` на конце ищется по префиксу
+    (`прив*`). Посты отдаются от более релевантных (bm25) к менее
+    релевантным страницами по `limit` штук, следующая страница
+    запрашивается по `next_cursor`. Новые посты меняют релевантность
+    остальных, поэтому при листании во время записи порядок может
+    немного сместиться.
+
+    Авторизованному пользователю у каждого поста возвращается
+    `liked_by_me`, параметр `fields` работает как в списке постов."""
+    selected_fields = utilities.parse_fields(fields, schemas.PostRead)
+    serializer = utilities.get_post_serializer(selected_fields)
+    match = utilities.build_match_query(q)
+    after = utilities.decode_cursor(cursor)
+    try:
+        posts, next_key = await read_flight.do(
+            ('posts.search', match, limit, serializer.fields, after),
+            lambda: post_crud.search_page(
+                match=match,
+                session=session,
+                limit=limit,
+                columns=serializer.fields,
+                after=after,))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    return await utilities.render_posts_page(
+        posts, next_key, selected_fields, user, session)
+
+
+@router.get(
+    path='/trending',
+    summary='Показать популярные посты',
+    response_model=schemas.Page[schemas.PostRead],
+    response_model_exclude_unset=True,
+    responses={400: {'model': schemas.NotFound}},)
+async def get_trending_posts(
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User | None, Depends(authenticate_optional)],
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
+) -> schemas.Page[schemas.PostRead]:
+    """Посты отдаются по убыванию популярности: суммы весов лайков,
+    где вес лайка уменьшается вдвое за каждые `TRENDING_HALF_LIFE`
+    секунд. Учитываются посты с лайками за последние `TRENDING_WINDOW`
+    секунд. Следующая страница запрашивается по `next_cursor`,
+    параметр `fields` работает как в списке постов."""
+    selected_fields = utilities.parse_fields(fields, schemas.PostRead)
+    columns = utilities.get_post_serializer(selected_fields).fields
+    after = utilities.decode_cursor(cursor)
+    try:
+        posts, next_key = await read_flight.do(
+            ('posts.trending', limit, columns, after),
+            lambda: trending_crud.get_top_page(
+                session=session,
+                limit=limit,
+                columns=columns,
+                after=after,))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    return await utilities.render_posts_page(
+        posts, next_key, selected_fields, user, session)
+
+
+@router.get(
+    path='/feed',
+    summary='Показать ленту подписок',
+    response_model=schemas.Page[schemas.PostRead],
+    response_model_exclude_unset=True,
+    responses={400: {'model': schemas.NotFound}},)
+async def get_feed(
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User, Depends(authenticate)],
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
+) -> schemas.Page[schemas.PostRead]:
+    """Посты авторов, на которых подписан пользователь, от новых
+    к старым страницами по `limit` штук. Следующая страница
+    запрашивается по `next_cursor`, параметр `fields` работает
+    как в списке постов."""
+    selected_fields = utilities.parse_fields(fields, schemas.PostRead)
+    columns = utilities.get_post_serializer(selected_fields).fields
+    after = utilities.decode_cursor(cursor)
+    try:
+        post_ids, next_key = await read_flight.do(
+            ('posts.feed', user.id, limit, after),
+            lambda: timeline_crud.get_feed_page(
+                owner_id=user.id,
+                session=session,
+                limit=limit,
+                after=after,))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор.')
+    posts = await read_flight.do(
+        ('posts.get_many', tuple(post_ids), columns),
+        lambda: post_crud.get_many(
+            obj_ids=post_ids,
+            session=session,
+            columns=columns,))
+    return await utilities.render_posts_page(
+        posts, next_key, selected_fields, user, session)
 
 
 @router.post(
@@ -29,7 +228,7 @@ async def get_all_posts(
     response_model=schemas.Post,)
 async def create_post(
     new_post: schemas.PostBase,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
     user: Annotated[schemas.User, Depends(authenticate)],
 ) -> schemas.Post:
     enriched_post = schemas.PostCreate(
@@ -44,18 +243,38 @@ async def create_post(
 @router.get(
     path='/{post_id}',
     summary='Показать пост',
-    response_model=schemas.Post,
-    responses={404: {'model': schemas.NotFound}},)
+    response_model=schemas.PostRead,
+    response_model_exclude_unset=True,
+    responses={404: {'model': schemas.NotFound}, 304: {}},)
 async def get_post(
     post_id: int,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
-) -> schemas.Post:
-    post = await post_crud.get(obj_id=post_id, session=session)
-    if not post:
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User | None, Depends(authenticate_optional)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> schemas.PostRead:
+    """Авторизованному пользователю возвращается `liked_by_me`.
+    Пост отдается с ETag; если он совпадает с переданным
+    в `If-None-Match`, возвращается 304 без тела.
+
+    Посты кэшируются в памяти процесса вместе с готовым телом ответа,
+    которое анонимному пользователю отдается без сериализации."""
+    cached = await post_cache.get_or_load(
+        post_id, lambda: utilities.load_post(post_id, session))
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Пост не найден.')
-    return post
+    post, body = cached
+    liked_ids = await utilities.get_liked_post_ids(user, [post_id], session)
+    etag = utilities.post_etag(post, liked_ids)
+    if utilities.etag_matches(if_none_match, etag):
+        return utilities.not_modified(etag)
+    if user is None:
+        return utilities.set_etag(
+            Response(content=body, media_type='application/json'), etag)
+    utilities.set_etag(response, etag)
+    return post.model_copy(update={'liked_by_me': post_id in liked_ids})
 
 
 @router.patch(
@@ -69,7 +288,7 @@ async def get_post(
 async def update_post(
     post_id: int,
     input_data: schemas.PostBase,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
     user: Annotated[schemas.User, Depends(authenticate)],
 ) -> schemas.Post:
     post_to_update = await post_crud.get(obj_id=post_id, session=session)
@@ -99,7 +318,7 @@ async def update_post(
     responses={403: {'model': schemas.ForbiddenAction}},)
 async def delete_post(
     post_id: int,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
     user: Annotated[schemas.User, Depends(authenticate)],
 ) -> schemas.NotFound:
     post_to_delete = await post_crud.get(obj_id=post_id, session=session)
@@ -112,4 +331,5 @@ async def delete_post(
     await post_crud.remove(
         obj_id=post_to_delete.id,
         session=session,)
+    db.after_commit(session, partial(liker_index.remove_post, post_id))
     return {}
@@ -0,0 +1,29 @@
+"""Класс маршрута, фиксирующий единицу работы запроса."""
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from db_layer import db_engine as db
+
+
+class UnitOfWorkRoute(APIRoute):
+    """Маршрут, который после успешного выполнения обработчика фиксирует
+    транзакцию пишущей сессии запроса одним COMMIT и только потом
+    отдает ответ. Зависимости с `yield` завершаются уже после отправки
+    ответа, поэтому фиксировать транзакцию в `get_write_session` нельзя:
+    клиент получил бы ответ до того, как изменения попали в БД.
+    Если обработчик завершился ошибкой, транзакция не фиксируется
+    и откатывается при закрытии сессии."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def unit_of_work_handler(request: Request) -> Response:
+            response = await handler(request)
+            session = getattr(request.state, 'write_session', None)
+            if session is not None:
+                await db.commit_unit_of_work(session)
+            return response
+
+        return unit_of_work_handler
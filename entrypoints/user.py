@@ -1,29 +1,109 @@
 """Роутеры для едпойнтов юзера."""
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query,
+                     Response, status)
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
 
-from business_layer import schemas
-from business_layer.auth.hash_password import HashPassword
-from business_layer.auth.jwt_handler import create_access_token
+from business_layer import schemas, utilities
+from business_layer.auth.authenticate import (authenticate_optional,
+                                              oauth2_scheme)
+from business_layer.auth.hash_password import password_hasher
+from business_layer.auth.jwt_handler import (create_access_token,
+                                             revoke_access_token)
+from business_layer.cache import read_flight
+from business_layer.serializers import RowSerializer, user_serializer
 from db_layer import db_engine as db
-from db_layer.crud import user_crud
+from config import settings
+from db_layer.crud import revoked_token_crud, user_crud
+from entrypoints.routing import UnitOfWorkRoute
 
-router = APIRouter()
-hash_password = HashPassword()
+
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.get(
     path='/',
     summary='Посмотреть всех пользователей',
     response_model=list[schemas.User],
+    responses={400: {'model': schemas.NotFound}},
 )
 async def get_all_users(
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)]
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
 ) -> list[schemas.User]:
-    return await user_crud.get_all(session=session)
+    """Из БД читаются только колонки схемы ответа (без хешей паролей).
+    В параметре `fields` можно перечислить через запятую поля, которые
+    нужно вернуть. При включенной настройке `FAST_JSON_LISTS`
+    или переданных `fields` строки сразу кодируются в JSON."""
+    selected_fields = utilities.parse_fields(fields, schemas.User)
+    serializer = user_serializer
+    if selected_fields is not None:
+        serializer = RowSerializer(schema=schemas.User, only=selected_fields)
+    encode = settings.fast_json_lists or selected_fields is not None
+
+    async def load():
+        rows = await user_crud.get_all(
+            session=session,
+            columns=serializer.fields)
+        return serializer.dumps(rows) if encode else rows
+
+    # Одновременные одинаковые запросы получают одни строки
+    # или одно готовое тело ответа.
+    result = await read_flight.do(
+        ('users.all', serializer.fields, encode), load)
+    if encode:
+        return Response(content=result, media_type='application/json')
+    return result
+
+
+@router.get(
+    path='/{user_id}/posts',
+    summary='Показать посты пользователя',
+    response_model=schemas.Page[schemas.PostRead],
+    response_model_exclude_unset=True,
+    responses={
+        400: {'model': schemas.NotFound},
+        404: {'model': schemas.NotFound},
+        304: {}},
+)
+async def get_user_posts(
+    user_id: int,
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
+    user: Annotated[schemas.User | None, Depends(authenticate_optional)],
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = (
+        settings.page_size),
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(pattern=r'^\w+(,\w+)*$')] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> schemas.Page[schemas.PostRead]:
+    """Посты пользователя отдаются от новых к старым страницами
+    по `limit` штук. Для получения следующей страницы передайте
+    `next_cursor` из предыдущего ответа в параметре `cursor`.
+    Авторизованному пользователю у каждого поста возвращается
+    `liked_by_me`. Страница отдается со слабым ETag; если он совпадает
+    с переданным в `If-None-Match`, возвращается 304 без тела.
+    В параметре `fields` можно перечислить через запятую поля поста,
+    которые нужно вернуть."""
+    utilities.decode_cursor(cursor)
+    selected_fields = utilities.parse_fields(fields, schemas.PostRead)
+    if not await read_flight.do(
+            ('users.get', user_id),
+            lambda: user_crud.get(obj_id=user_id, session=session)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Пользователь не найден.')
+    return await utilities.get_posts_page(
+        session=session,
+        user=user,
+        response=response,
+        limit=limit,
+        cursor=cursor,
+        if_none_match=if_none_match,
+        filters={'author_id': user_id},
+        fields=selected_fields,)
 
 
 @router.post(
@@ -31,13 +111,16 @@ async def get_all_users(
     summary='Создание пользователя',
     status_code=status.HTTP_201_CREATED,
     response_model=schemas.User,
-    responses={403: {'model': schemas.ForbiddenAction}}
+    responses={
+        403: {'model': schemas.ForbiddenAction},
+        503: {'model': schemas.ServiceUnavailable}},
 )
 async def create_user(
     new_user: schemas.UserCreate,
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
 ) -> schemas.User:
-    hashed_password = hash_password.create_hash(new_user.password)
+    hashed_password = await password_hasher.create_hash_async(
+        new_user.password)
     new_user.password = hashed_password
     try:
         return await user_crud.create(
@@ -58,10 +141,11 @@ async def create_user(
     responses={
         404: {'model': schemas.NotFound},
         403: {'model': schemas.ForbiddenAction},
-        401: {'model': schemas.ForbiddenAction}},
+        401: {'model': schemas.ForbiddenAction},
+        503: {'model': schemas.ServiceUnavailable}},
 )
 async def sign_user_in(
-    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_read_session)],
     user: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> dict:
     user_exists = await user_crud.get_by_field(
@@ -76,7 +160,8 @@ async def sign_user_in(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail='Пользователь неактивен.')
-    if not hash_password.verify_hash(user.password, user_exists.password):
+    if not await password_hasher.verify_hash_async(
+            user.password, user_exists.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Введен неверный пароль.')
@@ -85,3 +170,19 @@ async def sign_user_in(
         'access_token': access_token,
         'token_type': 'Bearer'
     }
+
+
+@router.post(
+    path='/logout',
+    summary='Выход из приложения',
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def sign_user_out(
+    session: Annotated[db.AsyncSession, Depends(db.get_write_session)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> None:
+    """Переданный токен отзывается и больше не принимается. Отзыв
+    сохраняется в БД, поэтому при включенной шине инвалидации его
+    применяют и остальные воркеры."""
+    digest, expires = revoke_access_token(token)
+    await revoked_token_crud.revoke(digest, expires, session)
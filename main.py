@@ -1,7 +1,41 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from business_layer.auth.hash_password import password_hasher
+from business_layer.like_buffer import like_buffer
+from business_layer.liker_index import liker_index
 from config import settings
+from db_layer.db_engine import ReadSessionLocal
+from db_layer.invalidation import invalidation_bus
+from db_layer.writer import db_writer
 from entrypoints.main_router import main_router
 
-app = FastAPI(title=settings.app_title)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и корректная остановка фоновых ресурсов приложения.
+    Ресурсы останавливаются в порядке, обратном запуску: сначала
+    в БД дописываются отложенные лайки, затем писатель выполняет
+    оставшиеся в очереди операции. Индекс лайков строится после того,
+    как отложенные лайки из журналов записаны в БД."""
+    if settings.cache_invalidation_bus:
+        await invalidation_bus.start()
+    if settings.sqlite_single_writer:
+        await db_writer.start()
+    if settings.like_write_behind:
+        await like_buffer.start()
+    if settings.liker_index:
+        await liker_index.load(ReadSessionLocal)
+    try:
+        yield
+    finally:
+        await like_buffer.stop()
+        await db_writer.stop()
+        await invalidation_bus.stop()
+        liker_index.clear()
+        password_hasher.shutdown()
+
+
+app = FastAPI(title=settings.app_title, lifespan=lifespan)
 app.include_router(main_router)
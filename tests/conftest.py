@@ -1,18 +1,25 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import pytest
 import pytest_asyncio
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import text
 
-from business_layer.auth.authenticate import authenticate
+from business_layer.auth.authenticate import (authenticate,
+                                              authenticate_optional)
 from business_layer.auth.hash_password import HashPassword
-from business_layer.auth.jwt_handler import create_access_token
+from business_layer.auth.jwt_handler import (create_access_token,
+                                             revoked_tokens)
+from business_layer.cache import caches, flights
 from business_layer.schemas import LikeBase, PostCreate, UserCreate
-from db_layer.db_engine import Base, get_async_session
+from db_layer.db_engine import (Base, configure_sqlite_engine,
+                                get_read_only_url, get_read_pragmas,
+                                get_read_session, get_write_session,
+                                start_unit_of_work)
 from db_layer.models import Like, Post, User
 from main import app
 
@@ -22,21 +29,60 @@ TEST_DB_PATH = APP_DIR / 'network_db/test.db'
 SQLALCHEMY_DATABASE_URL = f'sqlite+aiosqlite:///{TEST_DB_PATH}'
 
 
-engine = create_async_engine(
+engine = configure_sqlite_engine(create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
+))
+
+read_engine = configure_sqlite_engine(
+    create_async_engine(get_read_only_url(SQLALCHEMY_DATABASE_URL)),
+    pragmas=get_read_pragmas(),
 )
 
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine)
+TestingReadSessionLocal = sessionmaker(
+    class_=AsyncSession, autocommit=False, autoflush=False, bind=read_engine)
 
 
-async def override_get_async_session():
+async def override_get_write_session(request: Request):
     async with TestingSessionLocal() as session:
-        await session.execute(text('PRAGMA foreign_keys = ON'))
+        start_unit_of_work(session, request)
+        yield session
+
+
+async def override_get_read_session():
+    async with TestingReadSessionLocal() as session:
         yield session
 
 
+session_overrides = {
+    get_write_session: override_get_write_session,
+    get_read_session: override_get_read_session,
+}
+
+
+@asynccontextmanager
+async def capture_statements(target_engine=engine):
+    """Контекстный менеджер собирает все запросы к тестовой БД через
+    движок `target_engine`."""
+    statements = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(target_engine.sync_engine, 'before_cursor_execute',
+                 before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target_engine.sync_engine, 'before_cursor_execute',
+                     before_cursor_execute)
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def init_db():
     async with engine.begin() as conn:
@@ -46,6 +92,16 @@ async def init_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in caches.values():
+        cache.clear()
+    for flight in flights.values():
+        flight.clear()
+    revoked_tokens.clear()
+    yield
+
+
 password_handler = HashPassword()
 password_hash = password_handler.create_hash('testpassword123')
 
@@ -122,7 +178,6 @@ likes = [
 
 async def create_user(userdata):
     async with TestingSessionLocal() as session:
-        await session.execute(text('PRAGMA foreign_keys = ON'))
         user_schema = UserCreate(**userdata.__dict__)
         prepared_data = user_schema.dict()
         user = User(**prepared_data)
@@ -146,7 +201,6 @@ async def create_users():
 @pytest_asyncio.fixture
 async def posts_in_db(create_users):
     async with TestingSessionLocal() as session:
-        await session.execute(text('PRAGMA foreign_keys = ON'))
         created_posts = []
         for postdata in posts:
             post_schema = PostCreate(**postdata)
@@ -162,7 +216,6 @@ async def posts_in_db(create_users):
 @pytest_asyncio.fixture
 async def posts_likes_in_db(posts_in_db):
     async with TestingSessionLocal() as session:
-        await session.execute(text('PRAGMA foreign_keys = ON'))
         created_likes = []
         for likedata in likes:
             like_schema = LikeBase(**likedata)
@@ -172,6 +225,11 @@ async def posts_likes_in_db(posts_in_db):
             await session.commit()
             await session.refresh(like)
             created_likes.append(like.__dict__.copy())
+        for post_id in {likedata['post_id'] for likedata in likes}:
+            post = await session.get(Post, post_id)
+            post.like_count = sum(
+                likedata['post_id'] == post_id for likedata in likes)
+        await session.commit()
         return created_likes, posts_in_db
 
 
@@ -184,35 +242,37 @@ def override_failed_auth():
 
 @pytest.fixture
 def active_client1():
-    app.dependency_overrides = {}
-    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides = dict(session_overrides)
     app.dependency_overrides[authenticate] = lambda: active_user1
+    app.dependency_overrides[authenticate_optional] = (
+        lambda: active_user1)
     with TestClient(app) as client:
         yield client
 
 
 @pytest.fixture
 def active_client2():
-    app.dependency_overrides = {}
-    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides = dict(session_overrides)
     app.dependency_overrides[authenticate] = lambda: active_user2
+    app.dependency_overrides[authenticate_optional] = (
+        lambda: active_user2)
     with TestClient(app) as client:
         yield client
 
 
 @pytest.fixture
 def active_client3():
-    app.dependency_overrides = {}
-    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides = dict(session_overrides)
     app.dependency_overrides[authenticate] = lambda: active_user3
+    app.dependency_overrides[authenticate_optional] = (
+        lambda: active_user3)
     with TestClient(app) as client:
         yield client
 
 
 @pytest.fixture
 def test_client():
-    app.dependency_overrides = {}
-    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides = dict(session_overrides)
     app.dependency_overrides[authenticate] = override_failed_auth
     with TestClient(app) as client:
         yield client
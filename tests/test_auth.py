@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from business_layer.auth.authenticate import authenticate
+from business_layer.auth.hash_password import HashPassword
+from business_layer.auth.jwt_handler import (create_access_token,
+                                             verified_token_cache,
+                                             verify_access_token)
+from business_layer.cache import auth_user_cache
+from db_layer.crud import user_crud
+from tests.conftest import TestingSessionLocal
+
+
+async def test_hash_password_async_roundtrip():
+    hasher = HashPassword(max_workers=1, max_pending=2)
+    password_hash = await hasher.create_hash_async('testpassword123')
+    assert await hasher.verify_hash_async('testpassword123', password_hash), (
+        'Пароль не прошел проверку')
+    assert not await hasher.verify_hash_async('wrong', password_hash), (
+        'Неверный пароль прошел проверку')
+    assert hasher.pending == 0, 'Очередь хэширования д.быть пустой'
+    hasher.shutdown()
+
+
+async def test_hash_password_queue_limit_fails_fast():
+    hasher = HashPassword(max_workers=1, max_pending=1)
+    release = threading.Event()
+    hasher.create_hash = lambda password: release.wait(5) and 'hash'
+    first = asyncio.ensure_future(hasher.create_hash_async('first'))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as error:
+        await hasher.create_hash_async('second')
+    assert error.value.status_code == 503, 'Неверный код ошибки'
+    release.set()
+    assert await first == 'hash', 'Первая задача д.быть выполнена'
+    hasher.shutdown()
+
+
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
+
+async def test_authenticate_caches_user(create_users):
+    user, token = create_users['active_user1']
+    async with TestingSessionLocal() as session:
+        first = await authenticate(session=session, token=token)
+        second = await authenticate(session=session, token=token)
+    assert first.id == second.id == user.id, 'Неверный пользователь'
+    stats = auth_user_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1), (
+        'Повторный запрос д.быть обслужен из кэша')
+
+
+async def test_authenticate_cache_invalidated_on_deactivation(create_users):
+    user, token = create_users['active_user1']
+    async with TestingSessionLocal() as session:
+        await authenticate(session=session, token=token)
+        db_user = await user_crud.get(obj_id=user.id, session=session)
+        await user_crud.update(
+            obj=db_user,
+            session=session,
+            update_data=UserStatusUpdate(is_active=False))
+        assert len(auth_user_cache) == 0, 'Запись д.быть удалена из кэша'
+        with pytest.raises(HTTPException) as error:
+            await authenticate(session=session, token=token)
+    assert error.value.status_code == 403, 'Неверный код ошибки'
+
+
+async def test_authenticate_cache_invalidated_on_delete(create_users):
+    user, token = create_users['active_user2']
+    async with TestingSessionLocal() as session:
+        await authenticate(session=session, token=token)
+        await user_crud.remove(obj_id=user.id, session=session)
+        with pytest.raises(HTTPException) as error:
+            await authenticate(session=session, token=token)
+    assert error.value.status_code == 403, 'Неверный код ошибки'
+
+
+def test_cache_metrics(test_client):
+    response = test_client.get('/api/v1/metrics/caches')
+    assert response.status_code == 200, 'Неверный код ответа'
+    stats = response.json()['auth_users']
+    assert sorted(stats.keys()) == sorted(
+        ['size', 'maxsize', 'hits', 'misses', 'coalesced', 'hit_ratio']), (
+        'ключи в ответе не такие, как ожидались')
+
+
+def test_verify_access_token_caches_claims():
+    token = create_access_token(1)
+    first = verify_access_token(token)
+    second = verify_access_token(token)
+    assert first == second and first['user_id'] == 1, 'Неверные данные токена'
+    stats = verified_token_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1), (
+        'Повторная проверка д.быть обслужена из кэша')
+    assert token not in repr(verified_token_cache._data), (
+        'Кэш не должен хранить токены')
+
+
+def test_verify_access_token_invalid_not_cached():
+    with pytest.raises(HTTPException) as error:
+        verify_access_token('invalid.token.value')
+    assert error.value.status_code == 400, 'Неверный код ошибки'
+    assert len(verified_token_cache) == 0, 'Неверный токен попал в кэш'
+
+
+def test_logout_revokes_token(test_client):
+    token = create_access_token(1)
+    verify_access_token(token)
+    response = test_client.post(
+        '/api/v1/users/logout',
+        headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 204, 'Неверный код ответа'
+    assert len(verified_token_cache) == 0, 'Токен д.быть удален из кэша'
+    with pytest.raises(HTTPException) as error:
+        verify_access_token(token)
+    assert error.value.status_code == 403, 'Неверный код ошибки'
@@ -0,0 +1,218 @@
+import asyncio
+
+import httpx
+import pytest
+
+from business_layer.cache import (SingleFlight, TTLCache, caches, post_cache,
+                                  read_flight)
+from db_layer.crud import user_crud
+from main import app
+from tests.conftest import (capture_statements, read_engine,
+                            session_overrides)
+
+
+@pytest.fixture
+def cache():
+    cache = TTLCache(name='test_cache', maxsize=10, ttl=60)
+    yield cache
+    caches.pop('test_cache')
+
+
+async def test_get_or_load_coalesces_misses(cache):
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 'value'
+
+    tasks = [
+        asyncio.create_task(cache.get_or_load('key', loader))
+        for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*tasks) == ['value'] * 10, (
+        'Все запросы д.получить загруженное значение')
+    assert calls == 1, 'Значение д.загружаться один раз'
+    assert cache.coalesced == 9, 'Неверное кол-во объединенных запросов'
+    assert await cache.get_or_load('key', loader) == 'value'
+    assert calls == 1, 'Значение д.браться из кэша'
+
+
+async def test_get_or_load_invalidated_during_load(cache):
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return 'old'
+
+    leader = asyncio.create_task(cache.get_or_load('key', loader))
+    await asyncio.sleep(0)
+    cache.invalidate('key')
+
+    async def new_loader():
+        return 'new'
+
+    assert await cache.get_or_load('key', new_loader) == 'new', (
+        'После инвалидации загрузка д.начаться заново')
+    release.set()
+    assert await leader == 'old'
+    assert cache.get('key') == 'new', 'Устаревшее значение попало в кэш'
+
+
+async def test_get_or_load_leader_cancelled(cache):
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return 'slow'
+
+    async def loader():
+        return 'value'
+
+    leader = asyncio.create_task(cache.get_or_load('key', slow_loader))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.get_or_load('key', loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 'value', (
+        'При отмене первого запроса ждущий д.загрузить значение сам')
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_get_or_load_none_not_cached(cache):
+    async def loader():
+        return None
+
+    assert await cache.get_or_load('key', loader) is None
+    assert len(cache) == 0, 'Пустое значение не д.сохраняться в кэше'
+
+
+def test_post_cache_invalidated_on_writes(active_client1, posts_in_db):
+    active_client1.get('/api/v1/posts/1')
+    active_client1.get('/api/v1/posts/1')
+    assert post_cache.stats()['hits'] == 1, 'Пост д.отдаваться из кэша'
+
+    active_client1.patch('/api/v1/posts/1', json={'text': 'Новый текст'})
+    assert 1 not in post_cache._data, 'Изменение д.удалять пост из кэша'
+    response = active_client1.get('/api/v1/posts/1')
+    assert response.json()['text'] == 'Новый текст', 'Пост не обновился'
+
+    active_client1.delete('/api/v1/posts/1')
+    response = active_client1.get('/api/v1/posts/1')
+    assert response.status_code == 404, 'Удаленный пост остался в кэше'
+
+
+def test_post_cache_invalidated_on_likes(active_client2, posts_in_db):
+    response = active_client2.get('/api/v1/posts/1')
+    assert response.json()['like_count'] == 0
+    active_client2.post('/api/v1/like/1')
+    response = active_client2.get('/api/v1/posts/1')
+    assert response.json()['like_count'] == 1, 'Лайк д.удалять пост из кэша'
+    active_client2.delete('/api/v1/like/1')
+    response = active_client2.get('/api/v1/posts/1')
+    assert response.json()['like_count'] == 0, (
+        'Отмена лайка д.удалять пост из кэша')
+
+
+async def test_single_flight_shares_error():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        raise ValueError('ошибка')
+
+    tasks = [
+        asyncio.create_task(flight.do('key', loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results), (
+        'Ошибка загрузки д.отдаваться всем ждущим')
+    assert calls == 1, 'После ошибки ждущие не д.загружать значение сами'
+    assert len(flight) == 0, 'Упавшая загрузка осталась в группе'
+
+
+async def test_single_flight_follower_cancelled():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return 'value'
+
+    leader = asyncio.create_task(flight.do('key', loader))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do('key', loader))
+    await asyncio.sleep(0)
+    follower.cancel()
+    release.set()
+    assert await leader == 'value', (
+        'Отмена ждущего запроса не д.отменять загрузку')
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+
+
+async def test_single_flight_forget():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def old_loader():
+        await release.wait()
+        return 'old'
+
+    async def new_loader():
+        return 'new'
+
+    leader = asyncio.create_task(flight.do('key', old_loader))
+    await asyncio.sleep(0)
+    flight.forget_all()
+    assert await flight.do('key', new_loader) == 'new', (
+        'После записи чтение д.выполняться заново')
+    release.set()
+    assert await leader == 'old'
+
+
+async def test_concurrent_reads_run_one_query(posts_in_db, monkeypatch):
+    requests_num = 20
+    release = asyncio.Event()
+    get_all = user_crud.get_all
+
+    async def gated_get_all(**kwargs):
+        # Запрос придерживается, пока не придут все клиенты.
+        await release.wait()
+        return await get_all(**kwargs)
+
+    monkeypatch.setattr(user_crud, 'get_all', gated_get_all)
+    app.dependency_overrides = dict(session_overrides)
+    try:
+        async with httpx.AsyncClient(
+                app=app, base_url='http://test') as client:
+            async with capture_statements(read_engine) as statements:
+                tasks = [
+                    asyncio.create_task(client.get('/api/v1/users/'))
+                    for _ in range(requests_num)]
+                for _ in range(500):
+                    if read_flight.coalesced == requests_num - 1:
+                        break
+                    await asyncio.sleep(0.01)
+                release.set()
+                responses = await asyncio.gather(*tasks)
+    finally:
+        app.dependency_overrides = {}
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.content for response in responses}) == 1, (
+        'Все запросы д.получить одинаковый ответ')
+    user_queries = [
+        statement for statement, _ in statements
+        if statement.rstrip().endswith('FROM user')]
+    assert len(user_queries) == 1, (
+        f'{requests_num} одновременных запросов д.выполнить один запрос '
+        f'к БД, выполнено {len(user_queries)}')
@@ -0,0 +1,84 @@
+import asyncio
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db_layer.crud import like_crud
+from db_layer.db_engine import configure_sqlite_engine
+from db_layer.models import Like, Post, User
+from tests.conftest import SQLALCHEMY_DATABASE_URL, TestingSessionLocal
+
+LIKERS_NUM = 1000
+DUPLICATES_NUM = 100
+
+
+async def create_post_with_likers() -> int:
+    async with TestingSessionLocal() as session:
+        await session.execute(insert(User), [
+            {
+                'id': user_id,
+                'username': f'user{user_id}',
+                'password': 'hash',
+                'name': 'Имя',
+                'surname': 'Фамилия',
+                'email': 'aaa@bbb.ccc',
+            }
+            for user_id in range(1, LIKERS_NUM + 2)])
+        post = Post(text='Популярный пост', author_id=LIKERS_NUM + 1)
+        session.add(post)
+        await session.flush()
+        post_id = post.id
+        await session.commit()
+        return post_id
+
+
+async def like_counters(post_id) -> tuple[int, int]:
+    async with TestingSessionLocal() as session:
+        like_count = await session.scalar(
+            select(Post.like_count).where(Post.id == post_id))
+        likes_num = await session.scalar(
+            select(func.count()).select_from(Like)
+            .where(Like.post_id == post_id))
+        return like_count, likes_num
+
+
+async def test_concurrent_likes_keep_exact_counter():
+    post_id = await create_post_with_likers()
+    # Как и на сервере, запросы делят между собой ограниченный пул
+    # соединений; без пула каждый из 1000 запросов открыл бы своё.
+    pooled_engine = configure_sqlite_engine(create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=5,
+        max_overflow=0,
+        pool_timeout=60))
+    PooledSession = sessionmaker(pooled_engine, class_=AsyncSession)
+
+    async def like(liker_id):
+        async with PooledSession() as session:
+            return await like_crud.add_like(
+                post_id=post_id,
+                liker_id=liker_id,
+                session=session)
+
+    liker_ids = (list(range(1, LIKERS_NUM + 1))
+                 + list(range(1, DUPLICATES_NUM + 1)))
+    results = await asyncio.gather(*(like(user_id) for user_id in liker_ids))
+    assert sum(results) == LIKERS_NUM, 'Повторные лайки д.быть отклонены'
+    assert await like_counters(post_id) == (LIKERS_NUM, LIKERS_NUM), (
+        'Счетчик лайков не совпадает с кол-вом лайков')
+
+    async def unlike(liker_id):
+        async with PooledSession() as session:
+            return await like_crud.remove_like(
+                post_id=post_id,
+                liker_id=liker_id,
+                session=session)
+
+    results = await asyncio.gather(*(unlike(user_id) for user_id in liker_ids))
+    assert sum(results) == LIKERS_NUM, 'Лишние лайки удалены'
+    assert await like_counters(post_id) == (0, 0), (
+        'Счетчик лайков не совпадает с кол-вом лайков')
+    await pooled_engine.dispose()
@@ -1,6 +1,9 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import text
 
-from config import Settings
-from tests.conftest import BASE_DIR
+from config import Settings, settings
+from tests.conftest import BASE_DIR, TestingReadSessionLocal, engine
 
 
 def test_check_migration_file_exist():
@@ -29,3 +32,23 @@ def test_check_db_url():
             assert 'sqlite+aiosqlite' in attr_value['default'], (
                 'Укажите значение по умолчанию для подключения базы данных '
                 'sqlite ')
+
+
+async def test_sqlite_pragmas_set_on_connect():
+    async with engine.connect() as conn:
+        for name, expected in (
+            ('foreign_keys', 1),
+            ('journal_mode', settings.sqlite_journal_mode.lower()),
+            ('busy_timeout', settings.sqlite_busy_timeout),
+            ('cache_size', settings.sqlite_cache_size),
+        ):
+            value = await conn.scalar(text(f'PRAGMA {name}'))
+            assert value == expected, f'PRAGMA {name}: неверное значение'
+
+
+async def test_read_session_is_read_only(posts_in_db):
+    async with TestingReadSessionLocal() as session:
+        assert await session.scalar(text('SELECT count(*) FROM post')) == 3, (
+            'Сессия для чтения должна видеть данные')
+        with pytest.raises(OperationalError):
+            await session.execute(text('DELETE FROM post'))
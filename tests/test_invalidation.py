@@ -0,0 +1,183 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from business_layer.auth.jwt_handler import (create_access_token,
+                                             revoked_tokens,
+                                             verified_token_cache,
+                                             verify_access_token)
+from business_layer.cache import auth_user_cache, post_cache
+from business_layer.schemas import PostUpdate
+from db_layer.crud import post_crud
+from db_layer.db_engine import Base, configure_sqlite_engine
+from db_layer.invalidation import InvalidationBus, invalidation_bus
+from db_layer.models import CacheInvalidation, Post, User
+from tests.conftest import TestingSessionLocal, engine
+
+WORKERS_NUM = 3
+POLL_INTERVAL = 0.05
+MAX_LATENCY = 1.0
+
+
+def create_engine(url):
+    return configure_sqlite_engine(create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=2, max_overflow=0))
+
+
+async def load_post_text(session_factory, post_id):
+    async with session_factory() as session:
+        post = await session.get(Post, post_id)
+        return post.text
+
+
+def run_worker(url, ready, results):
+    """Воркер кэширует пост и ждет, пока шина не сбросит его из кэша."""
+
+    async def main():
+        worker_engine = create_engine(url)
+        session_factory = sessionmaker(worker_engine, class_=AsyncSession)
+        bus = InvalidationBus(worker_engine, poll_interval=POLL_INTERVAL)
+        await bus.start()
+        await post_cache.get_or_load(
+            1, lambda: load_post_text(session_factory, 1))
+        ready.put(True)
+        deadline = time.monotonic() + 10
+        while 1 in post_cache._data and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+        invalidated_at = time.time()
+        text = await post_cache.get_or_load(
+            1, lambda: load_post_text(session_factory, 1))
+        results.put((invalidated_at, text))
+        await bus.stop()
+        await worker_engine.dispose()
+
+    asyncio.run(main())
+
+
+async def create_post(conn):
+    await conn.execute(insert(User).values(
+        id=1, username='user', password='hash', name='Имя',
+        surname='Фамилия', email='aaa@bbb.ccc'))
+    await conn.execute(insert(Post).values(
+        id=1, text='Старый текст', author_id=1))
+
+
+async def test_invalidation_reaches_other_processes(tmp_path, monkeypatch):
+    url = f'sqlite+aiosqlite:///{tmp_path / "workers.db"}'
+    main_engine = create_engine(url)
+    async with main_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await create_post(conn)
+    monkeypatch.setattr(invalidation_bus, 'engine', main_engine)
+    await invalidation_bus.start()
+
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    workers = [
+        context.Process(target=run_worker, args=(url, ready, results))
+        for _ in range(WORKERS_NUM)]
+    for worker in workers:
+        worker.start()
+    try:
+        loop = asyncio.get_running_loop()
+        for _ in workers:
+            await loop.run_in_executor(None, ready.get, True, 60)
+
+        session_factory = sessionmaker(main_engine, class_=AsyncSession)
+        async with session_factory() as session:
+            post = await session.get(Post, 1)
+            await post_crud.update(
+                obj=post,
+                session=session,
+                update_data=PostUpdate(
+                    id=1, text='Новый текст', update_timestamp=1))
+        committed_at = time.time()
+
+        for _ in workers:
+            invalidated_at, text = await loop.run_in_executor(
+                None, results.get, True, 30)
+            assert text == 'Новый текст', (
+                'Воркер д.загрузить пост заново после инвалидации')
+            assert invalidated_at - committed_at < MAX_LATENCY, (
+                'Инвалидация дошла до воркера слишком поздно')
+    finally:
+        for worker in workers:
+            worker.join(timeout=30)
+            if worker.is_alive():
+                worker.terminate()
+        await invalidation_bus.stop()
+        await main_engine.dispose()
+    assert all(worker.exitcode == 0 for worker in workers), (
+        'Воркер завершился с ошибкой')
+
+
+async def test_poll_applies_published_invalidations(create_users):
+    publisher = InvalidationBus(engine)
+    subscriber = InvalidationBus(engine)
+    await publisher.start()
+    await subscriber.start()
+    try:
+        post_cache.set(1, 'post')
+        auth_user_cache.set(2, 'user')
+        async with TestingSessionLocal() as session:
+            await publisher.publish(session, [(post_cache, 1)])
+            await session.commit()
+        assert await subscriber.poll() == 1, 'Инвалидация не получена'
+        assert post_cache.get(1) is None, 'Пост не удален из кэша'
+        assert auth_user_cache.get(2) == 'user', 'Удалена лишняя запись'
+        assert await subscriber.poll() == 0, (
+            'Без новых записей опрос ничего не д.применять')
+
+        post_cache.set(1, 'post')
+        async with TestingSessionLocal() as session:
+            await publisher.publish(session, [(auth_user_cache, None)])
+            await publisher.publish(session, [(post_cache, 1)])
+            await session.commit()
+        async with engine.begin() as conn:
+            await conn.execute(CacheInvalidation.__table__.delete().where(
+                CacheInvalidation.id == subscriber.last_id + 1))
+        assert await subscriber.poll() == 1
+        assert auth_user_cache.get(2) is None and post_cache.get(1) is None, (
+            'При пропуске инвалидаций кэши д.очищаться полностью')
+    finally:
+        await subscriber.stop()
+        await publisher.stop()
+
+
+async def test_revoked_token_reaches_other_workers(test_client):
+    subscriber = InvalidationBus(engine)
+    await subscriber.start()
+    token = create_access_token(1)
+    try:
+        response = test_client.post(
+            '/api/v1/users/logout',
+            headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 204, 'Неверный код ответа'
+        # Другой воркер ничего не знает об отзыве и уже проверил токен.
+        revoked_tokens.clear()
+        verify_access_token(token)
+        assert await subscriber.poll() == 1, 'Отзыв токена не получен'
+        with pytest.raises(HTTPException) as error:
+            verify_access_token(token)
+        assert error.value.status_code == 403, (
+            'Отозванный в другом воркере токен не д.приниматься')
+    finally:
+        await subscriber.stop()
+
+    revoked_tokens.clear()
+    verified_token_cache.clear()
+    await subscriber.start()
+    try:
+        with pytest.raises(HTTPException):
+            verify_access_token(token)
+    finally:
+        await subscriber.stop()
+    assert len(revoked_tokens) == 1, (
+        'Воркер д.загружать действующие отзывы при запуске')
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+import main
+from business_layer.auth.authenticate import authenticate
+from business_layer.like_buffer import LikeWriteBehind
+from config import settings
+from db_layer.models import Like, Post
+from entrypoints import like as like_routes
+from tests.conftest import (TestingSessionLocal, active_user3,
+                            session_overrides)
+
+
+async def like_state(post_id) -> tuple[int, int]:
+    async with TestingSessionLocal() as session:
+        like_count = await session.scalar(
+            select(Post.like_count).where(Post.id == post_id))
+        likes_num = await session.scalar(
+            select(func.count()).select_from(Like)
+            .where(Like.post_id == post_id))
+        return like_count, likes_num
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / 'likes.journal'
+
+
+def journal_files(journal_path) -> list[str]:
+    """Имена журналов в папке, кроме блокировки запуска."""
+    return sorted(
+        path.name for path in journal_path.parent.iterdir()
+        if path.name != 'likes.journal.lock')
+
+
+def crash(buffer) -> None:
+    """Имитация падения процесса: буфер не сбрасывается в БД,
+    а блокировка журнала снимается, как при завершении процесса."""
+    buffer._task.cancel()
+    buffer._journal.close()
+    buffer._lock_file.close()
+
+
+async def test_write_behind_flushes_batch(posts_in_db, journal_path):
+    buffer = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await buffer.start()
+    async with TestingSessionLocal() as session:
+        assert await buffer.like(1, 2, session), 'Лайк д.быть принят'
+        assert await buffer.like(1, 3, session), 'Лайк д.быть принят'
+        assert not await buffer.like(1, 2, session), (
+            'Повторный лайк д.быть отклонен')
+        assert await buffer.like(2, 2, session), 'Лайк д.быть принят'
+        assert await buffer.unlike(2, 2, session), 'Отмена д.быть принята'
+        assert not await buffer.unlike(3, 2, session), (
+            'Отмена несуществующего лайка д.быть отклонена')
+    assert await like_state(1) == (0, 0), 'Лайки записаны в БД до сброса'
+    assert buffer.pending_likes(2, [1, 2, 3, 4]) == {
+        1: True, 2: False, 3: False}, 'Неверное состояние лайков в буфере'
+
+    await buffer.flush()
+    assert await like_state(1) == (2, 2), 'Неверное кол-во лайков после сброса'
+    assert await like_state(2) == (0, 0), 'Отмененный лайк попал в БД'
+
+    async with TestingSessionLocal() as session:
+        assert not await buffer.like(1, 3, session), (
+            'Повторный лайк после сброса д.быть отклонен')
+        assert await buffer.unlike(1, 3, session), 'Отмена д.быть принята'
+    await buffer.stop()
+    assert await like_state(1) == (1, 1), 'Остановка д.быть со сбросом'
+    assert journal_files(journal_path) == [], (
+        'После остановки журналы д.быть удалены')
+
+
+async def test_write_behind_replays_journal(posts_in_db, journal_path):
+    buffer = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await buffer.start()
+    async with TestingSessionLocal() as session:
+        await buffer.like(1, 2, session)
+        await buffer.like(1, 3, session)
+        await buffer.like(2, 3, session)
+        await buffer.unlike(2, 3, session)
+    crash(buffer)
+    journal = buffer._owner_path(buffer.owner).read_text()
+    assert await like_state(1) == (0, 0), 'Лайки записаны в БД до сброса'
+
+    restarted = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await restarted.start()
+    await restarted.stop()
+    assert await like_state(1) == (2, 2), 'Журнал не применен'
+    assert await like_state(2) == (0, 0), 'Журнал применен неверно'
+
+    journal_path.write_text(journal + 'L 1 ')
+    restarted = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await restarted.start()
+    await restarted.stop()
+    assert await like_state(1) == (2, 2), (
+        'Повторное применение журнала изменило счетчик')
+
+
+async def test_write_behind_replay_orders_by_event_time(
+    posts_in_db, journal_path
+):
+    # У процесса с меньшим pid события новее: порядок имен владельцев
+    # не совпадает с порядком событий.
+    newer = journal_path.with_name(f'{journal_path.name}.100-0000000b')
+    older = journal_path.with_name(f'{journal_path.name}.200-0000000a')
+    older.write_text('L 1 2 1000\nL 2 2 1000\n')
+    newer.write_text('U 1 2 2000\n')
+    buffer = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await buffer.start()
+    await buffer.stop()
+    assert await like_state(1) == (0, 0), (
+        'Д.применяться последнее по времени событие')
+    assert await like_state(2) == (1, 1), 'Журнал применен не полностью'
+    assert journal_files(journal_path) == [], (
+        'Примененные журналы д.быть удалены')
+
+
+def test_write_behind_lifespan_drains_on_shutdown(
+    monkeypatch,
+    posts_in_db,
+    journal_path,
+):
+    buffer = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    monkeypatch.setattr(settings, 'like_write_behind', True)
+    monkeypatch.setattr(main, 'like_buffer', buffer)
+    monkeypatch.setattr(like_routes, 'like_buffer', buffer)
+    main.app.dependency_overrides = {
+        **session_overrides,
+        authenticate: lambda: active_user3,
+    }
+    with TestClient(main.app) as client:
+        response = client.post('/api/v1/like/1')
+        assert response.status_code == 201, 'Неверный код ответа'
+        response = client.post('/api/v1/like/1')
+        assert response.status_code == 403, 'Неверный код ответа'
+        assert len(buffer) == 1, 'Лайк д.быть в буфере'
+    assert not buffer.running, 'Буфер д.быть остановлен'
+    assert asyncio.run(like_state(1)) == (1, 1), (
+        'При остановке лайки д.быть записаны в БД')
+
+
+async def test_write_behind_refuses_second_process(
+    posts_in_db, journal_path
+):
+    worker_a = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    worker_b = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await worker_a.start()
+    async with TestingSessionLocal() as session:
+        assert await worker_a.like(1, 3, session), 'Лайк д.быть принят'
+    with pytest.raises(RuntimeError):
+        await worker_b.start()
+    assert not worker_b.running, 'Второй буфер не д.запускаться'
+    assert journal_files(journal_path) == sorted([
+        worker_a._owner_path(worker_a.owner).name,
+        worker_a._owner_path(worker_a.owner, '.lock').name]), (
+        'Неудачный запуск д.удалить только свою блокировку')
+    assert await like_state(1) == (0, 0), (
+        'Журнал работающего буфера не д.применяться другим')
+
+    crash(worker_a)
+    restarted = LikeWriteBehind(
+        TestingSessionLocal, journal_path=journal_path, flush_interval=60)
+    await restarted.start()
+    assert await like_state(1) == (1, 1), (
+        'Журнал упавшего процесса д.быть применен при запуске')
+    await restarted.stop()
+    assert journal_files(journal_path) == [], (
+        'После остановки журналы д.быть удалены')
@@ -0,0 +1,75 @@
+import pytest_asyncio
+
+from business_layer.liker_index import LikerIndex, liker_index
+from tests.conftest import (TestingReadSessionLocal, capture_statements,
+                            read_engine)
+
+
+@pytest_asyncio.fixture
+async def loaded_index(posts_likes_in_db):
+    await liker_index.load(TestingReadSessionLocal)
+    yield liker_index
+    liker_index.clear()
+
+
+def test_liker_index_add_remove():
+    index = LikerIndex()
+    for liker_id in (5, 1, 3):
+        assert index.add(10, liker_id), 'Лайк д.быть добавлен'
+    assert not index.add(10, 3), 'Повторный лайк не д.быть добавлен'
+    assert list(index._likers[10]) == [1, 3, 5], (
+        'Массив лайкнувших д.быть отсортирован')
+    assert index.count(10) == 3, 'Неверное кол-во лайков'
+    assert index.has_liked(10, 5), 'Лайк не найден'
+    assert not index.has_liked(10, 4), 'Найден несуществующий лайк'
+    assert not index.has_liked(11, 5), 'Найден лайк другого поста'
+    assert index.liked_post_ids(5, [10, 11]) == {10}, (
+        'Неверные лайкнутые посты')
+
+    assert index.remove(10, 3), 'Лайк д.быть удален'
+    assert not index.remove(10, 3), 'Удален несуществующий лайк'
+    assert index.count(10) == 2, 'Неверное кол-во лайков после удаления'
+    index.remove(10, 1)
+    index.remove(10, 5)
+    assert index.stats()['posts'] == 0, 'Пустой пост остался в индексе'
+
+
+def test_liker_index_memory():
+    index = LikerIndex()
+    for post_id in range(100):
+        for liker_id in range(1000):
+            index.add(post_id, liker_id)
+    stats = index.stats()
+    assert stats['likes'] == 100_000, 'Неверное кол-во лайков'
+    assert stats['bytes_per_million_likes'] < 6_000_000, (
+        'Индекс д.занимать не больше ~6 байт на лайк')
+
+
+async def test_liker_index_load(loaded_index):
+    assert loaded_index.loaded, 'Индекс не загружен'
+    assert loaded_index.count(1) == 2, 'Неверное кол-во лайков поста 1'
+    assert loaded_index.liked_post_ids(2, [1, 2, 3]) == {1, 2}, (
+        'Неверные лайкнутые посты')
+
+
+async def test_liker_index_routes(active_client3, loaded_index):
+    async with capture_statements(read_engine) as statements:
+        response = active_client3.get('/api/v1/posts/')
+    liked_by_me = {
+        post['id']: post['liked_by_me'] for post in response.json()['items']}
+    assert liked_by_me == {1: True, 2: False, 3: False}, (
+        'Неверный признак liked_by_me')
+    assert not any('"like"' in statement for statement, _ in statements), (
+        'liked_by_me д.браться из индекса без запроса к таблице like')
+
+    response = active_client3.post('/api/v1/like/1')
+    assert response.status_code == 403, 'Повторный лайк не отклонен'
+    response = active_client3.post('/api/v1/like/2')
+    assert response.status_code == 201, 'Неверный код ответа'
+    assert loaded_index.has_liked(2, 3), 'Лайк не попал в индекс'
+
+    response = active_client3.delete('/api/v1/like/1')
+    assert response.status_code == 404, 'Неверный код ответа'
+    assert not loaded_index.has_liked(1, 3), 'Лайк не удален из индекса'
+    num_likes = active_client3.get('/api/v1/posts/1').json()['like_count']
+    assert num_likes == 1, 'Лайк не удален из БД'
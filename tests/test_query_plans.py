@@ -0,0 +1,130 @@
+import re
+
+from sqlalchemy import update
+
+from business_layer.schemas import PostCreate, PostUpdate
+from db_layer.crud import (follow_crud, like_crud, post_crud, timeline_crud,
+                           trending_crud, user_crud)
+from db_layer.models import User
+from tests.conftest import (TestingSessionLocal, capture_statements, engine,
+                            read_engine)
+
+# Полный просмотр таблицы без индекса: `SCAN post`, но не
+# `SCAN post USING INDEX ...` и не `SCAN post USING COVERING INDEX ...`.
+# Просмотр результата подзапроса (`SCAN anon_1`) таблицу не читает.
+FULL_SCAN = re.compile(r'^SCAN (?!anon_\d+$)(\S+)$')
+
+# Запросы, которые выполняет SQLite при каскадном удалении и проверке
+# внешних ключей. В EXPLAIN QUERY PLAN для DELETE они не видны,
+# поэтому проверяются отдельно.
+FOREIGN_KEY_LOOKUPS = (
+    'SELECT 1 FROM post WHERE author_id = 1',
+    'SELECT 1 FROM "like" WHERE liker_id = 1',
+    'SELECT 1 FROM "like" WHERE post_id = 1',
+    'SELECT 1 FROM follow WHERE follower_id = 1',
+    'SELECT 1 FROM follow WHERE author_id = 1',
+    'SELECT 1 FROM timeline WHERE owner_id = 1',
+    'SELECT 1 FROM timeline WHERE post_id = 1',
+)
+
+
+async def get_bad_plans(statements) -> list[str]:
+    bad_plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(
+                    ('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+                continue
+            plan = await conn.exec_driver_sql(
+                f'EXPLAIN QUERY PLAN {statement}', parameters)
+            for row in plan:
+                detail = row[-1]
+                if FULL_SCAN.match(detail) or 'TEMP B-TREE' in detail:
+                    bad_plans.append(f'{statement!r}: {detail}')
+    return bad_plans
+
+
+async def test_crud_queries_use_indexes(posts_likes_in_db):
+    async with capture_statements() as statements:
+        async with TestingSessionLocal() as session:
+            await user_crud.get(1, session)
+            await user_crud.get_by_field('username', 'User1', session)
+            await post_crud.get(1, session)
+            await post_crud.get_many([3, 1, 100], session)
+            await post_crud.get_by_field(
+                'author_id', 1, session, one_obj=False)
+            _, next_key = await post_crud.get_page(session, limit=2)
+            await post_crud.get_page(session, limit=2, after=next_key)
+            _, next_key = await post_crud.get_page(
+                session, limit=2, filters={'author_id': 1})
+            await post_crud.get_page(
+                session, limit=2, after=next_key, filters={'author_id': 1})
+            await post_crud.get_page(
+                session, limit=2, after=next_key, filters={'author_id': 1},
+                columns=('id', 'update_timestamp', 'like_count'))
+            await like_crud.get_by_field(
+                'liker_id', 2, session, one_obj=False)
+            await like_crud.count_likes(1, session)
+            await like_crud.get_like(1, 2, session)
+            await like_crud.get_liked_post_ids(2, [1, 2, 3], session)
+            _, next_key = await like_crud.get_likers_page(1, session, limit=1)
+            await like_crud.get_likers_page(
+                1, session, limit=1, after=next_key)
+            await like_crud.add_like(3, 2, session)
+            await like_crud.add_like(2, 3, session)
+            _, next_key = await trending_crud.get_top_page(
+                session, limit=1, columns=('text',))
+            await trending_crud.get_top_page(
+                session, limit=1, columns=('text',), after=next_key)
+            await trending_crud.prune(session)
+            await like_crud.remove_like(3, 2, session)
+            await follow_crud.follow(2, 1, session)
+            await follow_crud.follow(3, 1, session)
+            await session.execute(
+                update(User).where(User.id == 3).values(fanout_on_read=True))
+            await follow_crud.follow(2, 3, session)
+            _, next_key = await timeline_crud.get_feed_page(
+                2, session, limit=1)
+            await timeline_crud.get_feed_page(
+                2, session, limit=1, after=next_key)
+            await follow_crud.unfollow(3, 1, session)
+            post = await post_crud.create(
+                PostCreate(text='Новый пост', author_id=1), session)
+            await post_crud.update(
+                post, session,
+                PostUpdate(id=post.id, text='Измененный пост',
+                           update_timestamp=post.create_timestamp))
+            await post_crud.remove(post.id, session)
+            await user_crud.remove(4, session)
+    statements.extend((lookup, ()) for lookup in FOREIGN_KEY_LOOKUPS)
+    assert await get_bad_plans(statements) == [], (
+        'Запросы CRUD должны использовать индексы, а не полный '
+        'просмотр таблицы')
+
+
+async def test_full_scan_is_detected(posts_in_db):
+    bad_plans = await get_bad_plans([
+        ('SELECT * FROM post WHERE text = ?', ('Тестовый пост1',)),
+        ('SELECT * FROM "user" ORDER BY name', ()),
+    ])
+    assert len(bad_plans) == 3, (
+        'Проверка планов должна находить полный просмотр таблицы '
+        'и сортировку во временном B-дереве')
+
+
+async def test_list_endpoints_select_only_response_columns(
+    test_client, posts_in_db
+):
+    async with capture_statements(read_engine) as statements:
+        test_client.get('/api/v1/users')
+        test_client.get('/api/v1/posts', params={'ids': '1,2'})
+    selects = [
+        statement for statement, _ in statements
+        if statement.lstrip().upper().startswith('SELECT')]
+    assert selects and not any('password' in sql for sql in selects), (
+        'Списки не д.читать хеши паролей')
+    async with capture_statements(read_engine) as statements:
+        test_client.get('/api/v1/posts', params={'fields': 'id'})
+    assert statements and not any(
+        'post.text' in sql for sql, _ in statements), (
+        'При fields=id не д.читаться текст постов')
@@ -0,0 +1,101 @@
+from sqlalchemy import func, select
+
+from business_layer.schemas import PostCreate
+from config import settings
+from db_layer.crud import follow_crud, post_crud, timeline_crud
+from db_layer.models import Timeline, User
+from tests.conftest import TestingSessionLocal
+
+
+async def create_post(text, author_id=1):
+    async with TestingSessionLocal() as session:
+        post = await post_crud.create(
+            PostCreate(text=text, author_id=author_id), session)
+        return post.id
+
+
+async def timeline_size(owner_id):
+    async with TestingSessionLocal() as session:
+        return await session.scalar(
+            select(func.count()).select_from(Timeline)
+            .where(Timeline.owner_id == owner_id))
+
+
+def test_follow_post(active_client2, create_users):
+    response = active_client2.post('/api/v1/follow/1')
+    assert response.status_code == 201, 'Неверный код ответа'
+    assert response.json() == {'follower_id': 2, 'author_id': 1}, (
+        'Неверный ответ')
+    for user_id, code in ((1, 403), (2, 403), (100, 404)):
+        response = active_client2.post(f'/api/v1/follow/{user_id}')
+        assert response.status_code == code, 'Неверный код ответа'
+
+
+async def test_feed_get(active_client2, posts_in_db):
+    response = active_client2.get('/api/v1/posts/feed')
+    assert response.json() == {'items': [], 'next_cursor': None}, (
+        'Без подписок лента д.быть пустой')
+
+    active_client2.post('/api/v1/follow/1')
+    expected_ids = [post['id'] for post in reversed(posts_in_db[0])]
+    response = active_client2.get('/api/v1/posts/feed')
+    assert [post['id'] for post in response.json()['items']] == (
+        expected_ids), 'В ленте д.быть прежние посты автора'
+
+    new_post_id = await create_post('Новый пост автора')
+    await create_post('Пост другого автора', author_id=3)
+    response = active_client2.get('/api/v1/posts/feed', params={'limit': 2})
+    first_page = response.json()
+    assert [post['id'] for post in first_page['items']] == [
+        new_post_id, expected_ids[0]], 'Новый пост д.попасть в ленту'
+    assert all(post['liked_by_me'] is False for post in first_page['items'])
+    response = active_client2.get(
+        '/api/v1/posts/feed',
+        params={'limit': 2, 'cursor': first_page['next_cursor']})
+    second_page = response.json()
+    assert [post['id'] for post in second_page['items']] == (
+        expected_ids[1:]), 'Вторая страница отличается от ожидаемой'
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+
+    active_client2.delete('/api/v1/follow/1')
+    response = active_client2.get('/api/v1/posts/feed')
+    assert response.json()['items'] == [], (
+        'После отписки посты автора д.пропасть из ленты')
+    assert await timeline_size(2) == 0, 'Лента в БД не очищена'
+
+
+async def test_feed_hybrid_fanout(posts_in_db, monkeypatch):
+    monkeypatch.setattr(settings, 'timeline_fanout_limit', 1)
+    old_ids = [post['id'] for post in reversed(posts_in_db[0])]
+    async with TestingSessionLocal() as session:
+        await follow_crud.follow(2, 1, session)
+        await follow_crud.follow(3, 1, session)
+        assert await session.scalar(
+            select(User.fanout_on_read).where(User.id == 1)), (
+            'У автора с большим числом подписчиков д.включиться '
+            'чтение при запросе ленты')
+    new_ids = [await create_post(f'Пост {idx}') for idx in range(3)]
+    assert await timeline_size(2) == len(old_ids), (
+        'Посты автора с fanout_on_read не д.рассылаться по лентам')
+    assert await timeline_size(3) == 0, (
+        'Подписчику автора с fanout_on_read не нужно заполнять ленту')
+
+    expected_ids = list(reversed(new_ids)) + old_ids
+    for owner_id in (2, 3):
+        feed_ids, next_key = [], None
+        async with TestingSessionLocal() as session:
+            while True:
+                post_ids, next_key = await timeline_crud.get_feed_page(
+                    owner_id, session, limit=2, after=next_key)
+                feed_ids.extend(post_ids)
+                if next_key is None:
+                    break
+        assert feed_ids == expected_ids, (
+            'Лента д.объединять рассылку и чтение постов без повторов')
+
+    monkeypatch.setattr(settings, 'timeline_fanout_limit', 100)
+    async with TestingSessionLocal() as session:
+        await follow_crud.unfollow(3, 1, session)
+    await create_post('Пост после отписки')
+    assert await timeline_size(2) == len(old_ids), (
+        'Режим fanout_on_read не д.выключаться')
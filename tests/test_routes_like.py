@@ -29,7 +29,7 @@ def test_like_post_double_not_allowed(active_client3, posts_likes_in_db):
     assert response.status_code == 403, 'Неверный код ответа'
     assert list(data.keys()) == ['detail'], 'Неверный ключ в ответе'
     num_likes = active_client3.get('/api/v1/posts/1').json()['like_count']
-    assert num_likes == 0, 'неверное кол-во лайков в посте'
+    assert num_likes == 2, 'неверное кол-во лайков в посте'
 
 
 def test_like_post_del_unauthorized_no_access(test_client, posts_in_db):
@@ -40,3 +40,34 @@ def test_like_post_del_unauthorized_no_access(test_client, posts_in_db):
         data = response.json()
         assert response.status_code == 403, 'Неверный код ответа'
         assert list(data.keys()) == ['detail'], 'Неверный ключ в ответе'
+
+
+def test_like_post_likers_get_paginated(test_client, posts_likes_in_db):
+    response = test_client.get('/api/v1/like/1/users', params={'limit': 1})
+    assert response.status_code == 200, 'Неверный код ответа'
+    first_page = response.json()
+    assert first_page['items'] == [
+        {'id': 3, 'username': 'User3', 'name': 'Виктор'}], (
+        'Первая страница отличается от ожидаемой')
+    assert first_page['next_cursor'] is not None, 'В ответе нет курсора'
+
+    response = test_client.get(
+        '/api/v1/like/1/users',
+        params={'limit': 1, 'cursor': first_page['next_cursor']})
+    assert response.status_code == 200, 'Неверный код ответа'
+    second_page = response.json()
+    assert [user['id'] for user in second_page['items']] == [2], (
+        'Вторая страница отличается от ожидаемой')
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+
+    response = test_client.get('/api/v1/like/3/users')
+    assert response.json() == {'items': [], 'next_cursor': None}, (
+        'У поста без лайков список д.быть пустым')
+
+
+def test_like_post_likers_get_not_found(test_client, posts_likes_in_db):
+    response = test_client.get('/api/v1/like/100/users')
+    assert response.status_code == 404, 'Неверный код ответа'
+    response = test_client.get(
+        '/api/v1/like/1/users', params={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400, 'Неверный код ответа'
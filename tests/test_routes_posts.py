@@ -1,13 +1,26 @@
+from sqlalchemy import update
+
+from config import settings
+from db_layer.models import Post
+from tests.conftest import (TestingSessionLocal, capture_statements,
+                            read_engine)
+
+
 def test_posts_get(test_client, posts_in_db):
     response = test_client.get('/api/v1/posts')
     assert response.status_code == 200, 'Неверный код ответа'
-    data = response.json()
+    assert sorted(response.json().keys()) == ['items', 'next_cursor'], (
+        'ключи в ответе не такие, как ожидались')
+    data = response.json()['items']
     post_num = len(posts_in_db[0])
 
     assert len(data) == post_num, f'В ответе должно быть записей: {post_num}'
-    for idx, item in enumerate(posts_in_db[0]):
+    assert response.json()['next_cursor'] is None, 'Страница д.быть последней'
+    for idx, item in enumerate(reversed(posts_in_db[0])):
         post = item.copy()
         post.pop('_sa_instance_state')
+        # Версия поста служебная и в ответ не входит.
+        post.pop('version', None)
         expected_keys = sorted(list(post.keys()))
         response_keys = sorted(list(data[idx].keys()))
         assert expected_keys == response_keys, (
@@ -18,6 +31,279 @@ def test_posts_get(test_client, posts_in_db):
                 'отличается от ожидаемого')
 
 
+def test_posts_get_paginated(test_client, posts_in_db):
+    expected_ids = [post['id'] for post in reversed(posts_in_db[0])]
+    response = test_client.get('/api/v1/posts', params={'limit': 2})
+    assert response.status_code == 200, 'Неверный код ответа'
+    first_page = response.json()
+    assert [post['id'] for post in first_page['items']] == expected_ids[:2], (
+        'Первая страница отличается от ожидаемой')
+    assert first_page['next_cursor'] is not None, 'В ответе нет курсора'
+
+    response = test_client.get(
+        '/api/v1/posts',
+        params={'limit': 2, 'cursor': first_page['next_cursor']})
+    assert response.status_code == 200, 'Неверный код ответа'
+    second_page = response.json()
+    assert [post['id'] for post in second_page['items']] == expected_ids[2:], (
+        'Вторая страница отличается от ожидаемой')
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+
+
+def test_posts_get_invalid_cursor_or_limit(test_client, posts_in_db):
+    for cursor in ('not-a-cursor', 'WzFd', 'e30'):
+        response = test_client.get('/api/v1/posts', params={'cursor': cursor})
+        assert response.status_code == 400, 'Неверный код ответа'
+    for limit in (0, 1000):
+        response = test_client.get('/api/v1/posts', params={'limit': limit})
+        assert response.status_code == 422, 'Неверный код ответа'
+
+
+def test_posts_get_liked_by_me(active_client2, posts_likes_in_db):
+    response = active_client2.get('/api/v1/posts')
+    assert response.status_code == 200, 'Неверный код ответа'
+    liked_by_me = {
+        post['id']: post['liked_by_me'] for post in response.json()['items']}
+    assert liked_by_me == {1: True, 2: True, 3: False}, (
+        'Неверные значения liked_by_me')
+
+    response = active_client2.get('/api/v1/posts/3')
+    assert response.status_code == 200, 'Неверный код ответа'
+    assert response.json()['liked_by_me'] is False, (
+        'Неверное значение liked_by_me')
+    response = active_client2.get('/api/v1/users/1/posts')
+    assert [post['liked_by_me'] for post in response.json()['items']] == [
+        False, True, True], 'Неверные значения liked_by_me'
+
+
+def test_posts_get_anonymous_without_liked_by_me(
+    test_client, posts_likes_in_db
+):
+    response = test_client.get('/api/v1/posts')
+    assert all(
+        'liked_by_me' not in post for post in response.json()['items']), (
+        'Анонимному пользователю не д.возвращаться liked_by_me')
+    response = test_client.get('/api/v1/posts/1')
+    assert 'liked_by_me' not in response.json(), (
+        'Анонимному пользователю не д.возвращаться liked_by_me')
+
+
+def test_posts_get_by_ids(test_client, posts_in_db):
+    response = test_client.get('/api/v1/posts', params={'ids': '3,100,1,3'})
+    assert response.status_code == 200, 'Неверный код ответа'
+    data = response.json()
+    assert [post['id'] for post in data['items']] == [3, 1], (
+        'Посты д.быть в порядке запроса')
+    assert data['missing_ids'] == [100], 'Неверный список ненайденных id'
+    assert data['next_cursor'] is None, 'Страница д.быть последней'
+
+    response = test_client.get('/api/v1/posts')
+    assert 'missing_ids' not in response.json(), (
+        'В обычном списке не д.быть missing_ids')
+
+
+def test_posts_get_by_ids_invalid(test_client, posts_in_db, monkeypatch):
+    for ids in ('', 'a,b', '1,,2', '-1'):
+        response = test_client.get('/api/v1/posts', params={'ids': ids})
+        assert response.status_code == 422, 'Неверный код ответа'
+    monkeypatch.setattr(settings, 'max_batch_ids', 2)
+    response = test_client.get('/api/v1/posts', params={'ids': '1,2,3'})
+    assert response.status_code == 422, 'Неверный код ответа'
+
+
+def test_posts_get_fields(active_client2, posts_likes_in_db):
+    response = active_client2.get(
+        '/api/v1/posts', params={'fields': 'like_count,id'})
+    assert response.status_code == 200, 'Неверный код ответа'
+    assert response.json()['items'] == [
+        {'id': 3, 'like_count': 0},
+        {'id': 2, 'like_count': 1},
+        {'id': 1, 'like_count': 2},
+    ], 'В ответе д.быть только запрошенные поля'
+
+    response = active_client2.get(
+        '/api/v1/posts', params={'fields': 'id,liked_by_me', 'ids': '1,3'})
+    assert response.json()['items'] == [
+        {'id': 1, 'liked_by_me': True},
+        {'id': 3, 'liked_by_me': False},
+    ], 'Неверные значения liked_by_me'
+
+    response = active_client2.get(
+        '/api/v1/users/1/posts', params={'fields': 'text', 'limit': 1})
+    data = response.json()
+    assert data['items'] == [{'text': 'Тестовый пост3'}], (
+        'В ответе д.быть только запрошенные поля')
+    assert data['next_cursor'] is not None, 'В ответе нет курсора'
+
+
+def test_posts_get_fields_invalid(test_client, posts_in_db):
+    for fields in ('', 'id,', 'id,password'):
+        response = test_client.get('/api/v1/posts', params={'fields': fields})
+        assert response.status_code in (400, 422), 'Неверный код ответа'
+    response = test_client.get(
+        '/api/v1/posts', params={'fields': 'id,password'})
+    assert response.status_code == 400, 'Неверный код ответа'
+    assert 'password' in response.json()['detail'], (
+        'В ошибке д.быть указано неизвестное поле')
+
+
+def test_posts_get_fields_etag(active_client1, posts_in_db):
+    response = active_client1.get('/api/v1/posts')
+    etag = response.headers['ETag']
+    response = active_client1.get(
+        '/api/v1/posts', params={'fields': 'id'},
+        headers={'If-None-Match': etag})
+    assert response.status_code == 200, (
+        'ETag ответа с другим набором полей не д.совпадать')
+    etag = response.headers['ETag']
+    response = active_client1.get(
+        '/api/v1/posts', params={'fields': 'id'},
+        headers={'If-None-Match': etag})
+    assert response.status_code == 304, 'Неверный код ответа'
+
+
+def test_posts_search(active_client1, create_users):
+    texts = [
+        'Кошка спит на диване',
+        'Собака и кошка, кошка и собака',
+        'Котенок играет',
+        'Про погоду',
+    ]
+    post_ids = [
+        active_client1.post('/api/v1/posts', json={'text': text}).json()['id']
+        for text in texts]
+
+    response = active_client1.get(
+        '/api/v1/posts/search', params={'q': 'КОШКА'})
+    assert response.status_code == 200, 'Неверный код ответа'
+    items = response.json()['items']
+    assert [post['id'] for post in items] == [post_ids[1], post_ids[0]], (
+        'Посты д.быть отсортированы по релевантности')
+    assert all(post['liked_by_me'] is False for post in items), (
+        'Неверные значения liked_by_me')
+
+    response = active_client1.get(
+        '/api/v1/posts/search', params={'q': 'ко*', 'limit': 2})
+    first_page = response.json()
+    assert first_page['next_cursor'] is not None, 'В ответе нет курсора'
+    response = active_client1.get(
+        '/api/v1/posts/search',
+        params={'q': 'ко*', 'limit': 2, 'cursor': first_page['next_cursor']})
+    second_page = response.json()
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+    assert sorted(
+        post['id'] for post in first_page['items'] + second_page['items']
+    ) == post_ids[:3], 'Префиксный поиск нашел не те посты'
+
+    active_client1.patch(
+        f'/api/v1/posts/{post_ids[3]}', json={'text': 'Кошка и погода'})
+    active_client1.delete(f'/api/v1/posts/{post_ids[0]}')
+    response = active_client1.get(
+        '/api/v1/posts/search', params={'q': 'кошка', 'fields': 'id'})
+    assert sorted(post['id'] for post in response.json()['items']) == [
+        post_ids[1], post_ids[3]], 'Индекс не обновился после изменений'
+
+
+def test_posts_search_invalid(test_client, posts_in_db):
+    for params in ({}, {'q': ''}, {'q': 'кошка', 'cursor': 'WzFd'}):
+        response = test_client.get('/api/v1/posts/search', params=params)
+        assert response.status_code in (400, 422), 'Неверный код ответа'
+    response = test_client.get(
+        '/api/v1/posts/search', params={'q': '"* OR NEAR('})
+    assert response.status_code == 200, (
+        'Синтаксис FTS5 в запросе не д.вызывать ошибку')
+    assert response.json()['items'] == [], 'Неверный результат поиска'
+    response = test_client.get('/api/v1/posts/search', params={'q': '"*('})
+    assert response.status_code == 400, 'Неверный код ответа'
+
+
+def test_posts_id_get_etag(active_client1, posts_in_db):
+    response = active_client1.get('/api/v1/posts/1')
+    etag = response.headers.get('ETag')
+    assert etag and not etag.startswith('W/'), 'В ответе нет сильного ETag'
+
+    response = active_client1.get(
+        '/api/v1/posts/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304, 'Неверный код ответа'
+    assert response.content == b'', 'Ответ 304 д.быть без тела'
+    assert response.headers['ETag'] == etag, 'ETag в ответе 304 изменился'
+
+    active_client1.patch('/api/v1/posts/1', json={'text': 'Новый текст'})
+    response = active_client1.get(
+        '/api/v1/posts/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200, 'Неверный код ответа'
+    assert response.json()['text'] == 'Новый текст', 'Пост не обновился'
+    assert response.headers['ETag'] != etag, 'ETag д.измениться'
+
+
+def test_posts_get_etag(active_client1, posts_in_db):
+    response = active_client1.get('/api/v1/posts', params={'limit': 2})
+    etag = response.headers.get('ETag')
+    assert etag and etag.startswith('W/'), 'В ответе нет слабого ETag'
+
+    response = active_client1.get(
+        '/api/v1/posts', params={'limit': 2},
+        headers={'If-None-Match': f'"other", {etag}'})
+    assert response.status_code == 304, 'Неверный код ответа'
+    assert response.content == b'', 'Ответ 304 д.быть без тела'
+
+    active_client1.post('/api/v1/posts', json={'text': 'Новый пост'})
+    response = active_client1.get(
+        '/api/v1/posts', params={'limit': 2},
+        headers={'If-None-Match': etag})
+    assert response.status_code == 200, 'Неверный код ответа'
+    assert response.headers['ETag'] != etag, 'ETag д.измениться'
+    assert response.json()['items'][0]['text'] == 'Новый пост', (
+        'Новый пост не попал на страницу')
+
+    response = active_client1.get(
+        '/api/v1/users/1/posts', params={'limit': 2},
+        headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304, 'Неверный код ответа'
+
+
+async def test_posts_get_one_query_without_etag(test_client, posts_in_db):
+    async with capture_statements(read_engine) as statements:
+        response = test_client.get('/api/v1/posts')
+    assert response.headers.get('ETag'), 'В ответе нет ETag'
+    page_queries = [
+        statement for statement, _ in statements
+        if 'FROM post' in statement]
+    assert len(page_queries) == 1, (
+        'Без If-None-Match страница д.читаться одним запросом')
+
+
+async def test_posts_get_not_modified_reads_versions(
+    test_client, posts_in_db
+):
+    etag = test_client.get('/api/v1/posts').headers['ETag']
+    async with capture_statements(read_engine) as statements:
+        response = test_client.get(
+            '/api/v1/posts', headers={'If-None-Match': etag})
+    assert response.status_code == 304, 'Неверный код ответа'
+    page_queries = [
+        statement for statement, _ in statements
+        if 'FROM post' in statement]
+    assert len(page_queries) == 1 and 'post.text' not in page_queries[0], (
+        'Для 304 д.читаться только версии постов')
+
+
+async def test_posts_get_etag_text_changed(test_client, posts_in_db):
+    response = test_client.get('/api/v1/posts')
+    etag = response.headers['ETag']
+    # Правка в ту же секунду не меняет update_timestamp, но меняет
+    # версию поста.
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(Post).where(Post.id == 1).values(text='Новый текст'))
+        await session.commit()
+    response = test_client.get(
+        '/api/v1/posts', headers={'If-None-Match': etag})
+    assert response.status_code == 200, 'Клиент получил устаревший 304'
+    assert response.headers['ETag'] != etag, (
+        'ETag д.меняться при изменении текста')
+
+
 def test_posts_post_correct_data(active_client1, create_users):
     new_post = {'text': 'Вот такой пост. не очень длинный'}
     response = active_client1.post('/api/v1/posts', json=new_post)
@@ -68,6 +354,7 @@ def test_posts_id_get(test_client, posts_in_db):
 
     post = posts_in_db[0][0].copy()
     post.pop('_sa_instance_state')
+    post.pop('version', None)
     expected_keys = sorted(list(post.keys()))
     response_keys = sorted(list(data.keys()))
     assert expected_keys == response_keys, (
@@ -37,6 +37,7 @@ def test_users_get(test_client, create_users):
         user = item[0].__dict__.copy()
         user.pop('_sa_instance_state')
         user.pop('password')
+        user.pop('fanout_on_read')
         expected_keys = sorted(list(user.keys()))
         response_keys = sorted(list(data[idx].keys()))
         assert expected_keys == response_keys, (
@@ -47,6 +48,18 @@ def test_users_get(test_client, create_users):
                 'отличается от ожидаемого')
 
 
+def test_users_get_fields(test_client, create_users):
+    response = test_client.get(
+        '/api/v1/users', params={'fields': 'username,id'})
+    assert response.status_code == 200, 'Неверный код ответа'
+    assert response.json() == [
+        {'username': item[0].username, 'id': item[0].id}
+        for item in create_users.values()
+    ], 'В ответе д.быть только запрошенные поля'
+    response = test_client.get('/api/v1/users', params={'fields': 'password'})
+    assert response.status_code == 400, 'Неверный код ответа'
+
+
 def test_users_signup_post_correct_data(test_client):
     new_user = {
         'username': 'User1001',
@@ -85,3 +98,39 @@ def test_users_signup_post_incorrect_data(test_client, create_users):
         data = response.json()
         assert response.status_code == 422, 'Неверный код ответа'
         assert list(data.keys()) == ['detail'], 'Неверные ключи в ответе'
+
+
+def test_users_id_posts_get_paginated(active_client2, posts_in_db):
+    response = active_client2.post(
+        '/api/v1/posts', json={'text': 'Пост второго пользователя'})
+    assert response.status_code == 201, 'Неверный код ответа'
+    other_post_id = response.json()['id']
+
+    expected_ids = [post['id'] for post in reversed(posts_in_db[0])]
+    response = active_client2.get('/api/v1/users/1/posts', params={'limit': 2})
+    assert response.status_code == 200, 'Неверный код ответа'
+    first_page = response.json()
+    assert [post['id'] for post in first_page['items']] == expected_ids[:2], (
+        'Первая страница отличается от ожидаемой')
+    assert first_page['next_cursor'] is not None, 'В ответе нет курсора'
+
+    response = active_client2.get(
+        '/api/v1/users/1/posts',
+        params={'limit': 2, 'cursor': first_page['next_cursor']})
+    assert response.status_code == 200, 'Неверный код ответа'
+    second_page = response.json()
+    assert [post['id'] for post in second_page['items']] == expected_ids[2:], (
+        'Вторая страница отличается от ожидаемой')
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+
+    response = active_client2.get('/api/v1/users/2/posts')
+    assert [post['id'] for post in response.json()['items']] == [
+        other_post_id], 'В ответе должны быть только посты автора'
+
+
+def test_users_id_posts_get_not_found(test_client, posts_in_db):
+    response = test_client.get('/api/v1/users/100/posts')
+    assert response.status_code == 404, 'Неверный код ответа'
+    response = test_client.get(
+        '/api/v1/users/1/posts', params={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400, 'Неверный код ответа'
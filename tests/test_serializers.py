@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from business_layer import serializers
+from config import settings
+from main import app
+
+LIST_URLS = (
+    '/api/v1/posts',
+    '/api/v1/posts?limit=2',
+    '/api/v1/users/1/posts',
+    '/api/v1/users',
+)
+
+
+def ordered(text: str):
+    return json.loads(text, object_pairs_hook=list)
+
+
+def get_lists(client) -> dict:
+    responses = {}
+    for url in LIST_URLS:
+        response = client.get(url)
+        assert response.status_code == 200, 'Неверный код ответа'
+        responses[url] = (response.text, response.headers.get('ETag'))
+    return responses
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_fast_json_lists_same_output(
+    active_client2, posts_likes_in_db, monkeypatch, use_orjson
+):
+    if not use_orjson:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    openapi = json.dumps(app.openapi())
+    expected = get_lists(active_client2)
+    monkeypatch.setattr(settings, 'fast_json_lists', True)
+    actual = get_lists(active_client2)
+    for url in LIST_URLS:
+        assert ordered(actual[url][0]) == ordered(expected[url][0]), (
+            f'{url}: быстрый путь д.возвращать те же поля в том же порядке')
+        assert actual[url][1] == expected[url][1], f'{url}: ETag изменился'
+    app.openapi_schema = None
+    assert json.dumps(app.openapi()) == openapi, 'OpenAPI изменился'
+
+
+def test_row_serializer_fields():
+    assert serializers.post_serializer.fields == (
+        'text', 'author_id', 'update_timestamp', 'id', 'create_timestamp',
+        'like_count'), 'Поля сериализатора д.совпадать с полями схемы'
+    assert serializers.user_serializer.dumps([
+        ('user', 'Имя', 'Фамилия', 'a@b.cc', 1, True, False)]) == (
+        '[{"username":"user","name":"Имя","surname":"Фамилия",'
+        '"email":"a@b.cc","id":1,"is_active":true,"is_superuser":false}]'
+    ).encode(), 'Неверный JSON'
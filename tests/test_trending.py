@@ -0,0 +1,131 @@
+import math
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from business_layer.like_buffer import LikeWriteBehind
+from config import settings
+from db_layer.crud import trending_crud
+from db_layer.models import PostTrending
+from db_layer.sql_functions import log2_add, log2_sub, log2_sum
+from tests.conftest import TestingSessionLocal
+
+NOW = int(datetime.utcnow().timestamp()) - 1000
+
+
+async def trending_scores() -> dict[int, float]:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(
+            select(PostTrending.id, PostTrending.score))
+        return dict(result.all())
+
+
+def test_log2_functions():
+    assert log2_add(3, 3) == 4, 'log2(8 + 8) д.быть 4'
+    assert log2_add(None, 5) == 5, 'None д.считаться нулем'
+    assert math.isclose(log2_sub(4, 3), 3), 'log2(16 - 8) д.быть 3'
+    assert log2_sub(3, 3) is None, 'Нулевая разность д.давать None'
+    assert math.isclose(log2_sum([1, 1, 2]), 3), 'log2(2 + 2 + 4) д.быть 3'
+    assert math.isclose(log2_add(10_000, 9_999), 10_000 + math.log2(1.5)), (
+        'Большие значения не д.переполнять float')
+
+
+async def test_trending_apply_decay(posts_in_db, monkeypatch):
+    monkeypatch.setattr(settings, 'trending_half_life', 100)
+    async with TestingSessionLocal() as session:
+        await trending_crud.apply(
+            session, added=[(1, NOW), (1, NOW), (2, NOW + 100)])
+        await trending_crud.apply(session, added=[(3, NOW + 150)])
+        await session.commit()
+    scores = await trending_scores()
+    assert math.isclose(scores[1], scores[2]), (
+        'Два лайка д.весить как один лайк через период полураспада')
+    assert scores[3] > scores[2], 'Более свежий лайк д.весить больше'
+
+    async with TestingSessionLocal() as session:
+        await trending_crud.apply(session, removed=[(1, NOW)])
+        await trending_crud.apply(session, removed=[(3, NOW + 150)])
+        await session.commit()
+    scores = await trending_scores()
+    assert math.isclose(scores[1], NOW / 100), 'Неверный рейтинг поста'
+    assert 3 not in scores, 'Пост без лайков д.удаляться из рейтинга'
+
+
+@pytest.mark.parametrize('fast_json_lists', [False, True])
+def test_trending_get(
+    active_client2, posts_in_db, monkeypatch, fast_json_lists
+):
+    monkeypatch.setattr(settings, 'fast_json_lists', fast_json_lists)
+    for post_id in (1, 2, 3):
+        active_client2.post(f'/api/v1/like/{post_id}')
+    active_client2.delete('/api/v1/like/3')
+    response = active_client2.get(
+        '/api/v1/posts/trending', params={'limit': 1})
+    assert response.status_code == 200, 'Неверный код ответа'
+    first_page = response.json()
+    assert first_page['next_cursor'] is not None, 'В ответе нет курсора'
+    response = active_client2.get(
+        '/api/v1/posts/trending',
+        params={'limit': 1, 'cursor': first_page['next_cursor']})
+    second_page = response.json()
+    assert second_page['next_cursor'] is None, 'Страница д.быть последней'
+    items = first_page['items'] + second_page['items']
+    assert sorted(post['id'] for post in items) == [1, 2], (
+        'В рейтинге д.быть только посты с лайками')
+    assert all(post['liked_by_me'] for post in items), (
+        'Неверные значения liked_by_me')
+    posts = {
+        post['id']: post
+        for post in active_client2.get('/api/v1/posts/').json()['items']}
+    for post in items:
+        assert post == posts[post['id']], (
+            'Поля поста в рейтинге д.совпадать с полями в списке постов')
+
+
+def test_trending_get_fields(active_client2, posts_in_db):
+    active_client2.post('/api/v1/like/2')
+    response = active_client2.get(
+        '/api/v1/posts/trending',
+        params={'fields': 'id,create_timestamp,text'})
+    assert response.status_code == 200, 'Неверный код ответа'
+    post = active_client2.get('/api/v1/posts/2').json()
+    assert response.json()['items'] == [{
+        'text': post['text'],
+        'id': 2,
+        'create_timestamp': post['create_timestamp'],
+    }], 'Значения полей д.соответствовать своим ключам'
+
+
+async def test_trending_window(posts_in_db, test_client, monkeypatch):
+    monkeypatch.setattr(settings, 'trending_window', 600)
+    async with TestingSessionLocal() as session:
+        await trending_crud.apply(session, added=[(1, NOW)])
+        await session.commit()
+    response = test_client.get('/api/v1/posts/trending')
+    assert response.json()['items'] == [], (
+        'Посты без лайков за окно не д.попадать в рейтинг')
+    async with TestingSessionLocal() as session:
+        await trending_crud.prune(session)
+        await session.commit()
+    assert await trending_scores() == {}, 'Устаревший пост не удален'
+
+
+async def test_trending_write_behind(posts_in_db, tmp_path):
+    buffer = LikeWriteBehind(
+        TestingSessionLocal, journal_path=tmp_path / 'likes.journal',
+        flush_interval=60)
+    await buffer.start()
+    async with TestingSessionLocal() as session:
+        await buffer.like(1, 2, session)
+        await buffer.like(1, 3, session)
+        await buffer.like(2, 2, session)
+    await buffer.flush()
+    scores = await trending_scores()
+    assert math.isclose(scores[1], scores[2] + 1), (
+        'Рейтинг д.учитывать все лайки пачки')
+    async with TestingSessionLocal() as session:
+        await buffer.unlike(2, 2, session)
+    await buffer.stop()
+    assert 2 not in await trending_scores(), (
+        'Отмена лайка д.убирать пост из рейтинга')
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from db_layer.crud import trending_crud
+from tests.conftest import engine
+
+
+@contextmanager
+def count_commits():
+    """Контекстный менеджер считает COMMIT пишущего движка."""
+    counts = {'commits': 0}
+
+    def on_commit(conn):
+        counts['commits'] += 1
+
+    event.listen(engine.sync_engine, 'commit', on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(engine.sync_engine, 'commit', on_commit)
+
+
+def test_write_endpoints_commit_once(active_client2, posts_in_db):
+    requests = [
+        ('post', '/api/v1/users/signup', {'json': {
+            'username': 'new_user', 'password': 'password123',
+            'name': 'Имя', 'surname': 'Фамилия',
+            'email': 'new@example.com'}}, 201),
+        ('post', '/api/v1/posts/', {'json': {'text': 'Новый пост'}}, 201),
+        ('patch', '/api/v1/posts/4', {'json': {'text': 'Текст'}}, 200),
+        ('post', '/api/v1/like/1', {}, 201),
+        ('delete', '/api/v1/like/1', {}, 404),
+        ('post', '/api/v1/follow/1', {}, 201),
+        ('delete', '/api/v1/follow/1', {}, 404),
+        ('delete', '/api/v1/posts/4', {}, 404),
+    ]
+    for method, url, kwargs, status_code in requests:
+        with count_commits() as counts:
+            response = getattr(active_client2, method)(url, **kwargs)
+        assert response.status_code == status_code, (
+            f'{method.upper()} {url}: неверный код ответа')
+        assert counts['commits'] == 1, (
+            f'{method.upper()} {url}: д.быть ровно один COMMIT, '
+            f'выполнено {counts["commits"]}')
+
+
+def test_failed_request_rolls_back(active_client2, posts_in_db, monkeypatch):
+    async def failing_apply(*args, **kwargs):
+        raise RuntimeError('сбой после записи лайка')
+
+    monkeypatch.setattr(trending_crud, 'apply', failing_apply)
+    with pytest.raises(RuntimeError):
+        active_client2.post('/api/v1/like/1')
+    monkeypatch.undo()
+
+    post = active_client2.get('/api/v1/posts/1').json()
+    likers = active_client2.get('/api/v1/like/1/users').json()['items']
+    assert (post['like_count'], likers) == (0, []), (
+        'Изменения запроса с ошибкой д.быть отменены целиком')
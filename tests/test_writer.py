@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+import main
+from business_layer.auth.authenticate import authenticate
+from business_layer.schemas import PostCreate
+from config import settings
+from db_layer import crud
+from db_layer.crud import like_crud, post_crud
+from db_layer.db_engine import configure_sqlite_engine
+from db_layer.models import Post
+from db_layer.writer import DBWriter
+from tests.conftest import (SQLALCHEMY_DATABASE_URL, TestingSessionLocal,
+                            active_user3, session_overrides)
+
+
+def create_test_writer(**engine_kwargs) -> tuple[DBWriter, list]:
+    engine = configure_sqlite_engine(
+        create_async_engine(SQLALCHEMY_DATABASE_URL, **engine_kwargs),
+        begin='IMMEDIATE')
+    commits = []
+    event.listen(engine.sync_engine, 'commit', lambda conn: commits.append(1))
+    writer = DBWriter(
+        sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    return writer, commits
+
+
+@pytest_asyncio.fixture
+async def test_writer(monkeypatch):
+    writer, commits = create_test_writer(
+        poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(crud, 'db_writer', writer)
+    await writer.start()
+    yield writer, commits
+    await writer.stop()
+    await writer.session_factory.kw['bind'].dispose()
+
+
+async def test_writer_group_commit(test_writer, create_users):
+    writer, commits = test_writer
+    posts_num = 100
+
+    async def create_post(idx):
+        async with TestingSessionLocal() as session:
+            return await post_crud.create(
+                new_obj=PostCreate(text=f'Пост {idx}', author_id=1),
+                session=session)
+
+    created = await asyncio.gather(*(create_post(i) for i in range(posts_num)))
+    assert len({post.id for post in created}) == posts_num, (
+        'Каждая операция д.быть выполнена')
+    assert all(post.create_timestamp for post in created), (
+        'Созданные объекты д.быть заполнены')
+    assert len(commits) < posts_num, 'Операции д.быть сгруппированы'
+    async with TestingSessionLocal() as session:
+        assert await session.scalar(
+            select(func.count()).select_from(Post)) == posts_num, (
+            'Неверное кол-во постов в БД')
+
+
+async def test_writer_isolates_failed_operation(test_writer, posts_in_db):
+    async def like(post_id, liker_id):
+        async with TestingSessionLocal() as session:
+            return await like_crud.add_like(
+                post_id=post_id, liker_id=liker_id, session=session)
+
+    results = await asyncio.gather(
+        like(1, 2), like(999, 2), like(1, 2), like(2, 3),
+        return_exceptions=True)
+    assert results[0] is True and results[3] is True, (
+        'Корректные операции д.быть выполнены')
+    assert isinstance(results[1], IntegrityError), (
+        'Ошибка д.быть передана вызвавшему операцию')
+    assert results[2] is False, 'Повторный лайк д.быть отклонен'
+    async with TestingSessionLocal() as session:
+        counts = (await session.scalars(
+            select(Post.like_count).order_by(Post.id))).all()
+    assert counts == [1, 1, 0], 'Неверные счетчики лайков'
+
+
+def test_writer_started_in_lifespan(monkeypatch, posts_in_db):
+    writer, commits = create_test_writer(poolclass=NullPool)
+    monkeypatch.setattr(settings, 'sqlite_single_writer', True)
+    monkeypatch.setattr(main, 'db_writer', writer)
+    monkeypatch.setattr(crud, 'db_writer', writer)
+    main.app.dependency_overrides = {
+        **session_overrides,
+        authenticate: lambda: active_user3,
+    }
+    with TestClient(main.app) as client:
+        assert writer.running, 'Писатель д.быть запущен'
+        response = client.post('/api/v1/like/1')
+        assert response.status_code == 201, 'Неверный код ответа'
+        response = client.get('/api/v1/posts/1')
+        assert response.json()['like_count'] == 1, 'Лайк не записан'
+    assert not writer.running, 'Писатель д.быть остановлен'
+    assert commits, 'Запись д.быть выполнена писателем'